@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
+from django.db.models import Count
 from django.utils.html import format_html
+from .busca import buscar
 from .models import Demanda
 import logging
 
@@ -27,6 +30,22 @@ class DemandaAdmin(admin.ModelAdmin):
             logger.error(f"ERRO no changelist_view: {type(e).__name__}: {str(e)}", exc_info=True)
             raise
     
+    def get_queryset(self, request):
+        """Conta os envios de cada demanda na própria consulta da listagem."""
+        return super().get_queryset(request).annotate(_total_tickets=Count('tickets'))
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Busca pelo índice de termos em vez de icontains em cada campo, com os
+        mais relevantes primeiro (salvo ordenação escolhida numa coluna).
+        """
+        if not search_term.strip():
+            return queryset, False
+        resultados = buscar(search_term, queryset)
+        if ORDER_VAR in request.GET:
+            resultados = resultados.order_by(*queryset.query.order_by)
+        return resultados, False
+    
     fieldsets = (
         ('📋 Informações do Concurso', {
             'fields': ('concurso', 'numero_edital', 'banca'),
@@ -98,11 +117,13 @@ class DemandaAdmin(admin.ModelAdmin):
     def total_tickets(self, obj):
         """Exibe total de tickets associados."""
         try:
-            if obj.pk:  # Só conta se já foi salvo
+            total = getattr(obj, '_total_tickets', None)
+            if total is None and obj.pk:  # Fora da listagem (sem anotação)
                 total = obj.tickets.count()
-                if total > 0:
-                    return format_html('<span style="color: #007bff; font-weight: bold;">{} envio(s)</span>', total)
+            if total:
+                return format_html('<span style="color: #007bff; font-weight: bold;">{} envio(s)</span>', total)
         except (AttributeError, ValueError):
             pass
         return format_html('<span style="color: #6c757d;">Nenhum</span>')
     total_tickets.short_description = 'Envios'
+    total_tickets.admin_order_field = '_total_tickets'
@@ -0,0 +1,167 @@
+"""
+Busca textual de concursos.
+
+Mantém um índice invertido (TermoBusca) com os termos normalizados de cada
+demanda: minúsculos, sem acentos e sem stopwords do português. A busca casa
+cada termo digitado como prefixo (consulta indexada em `termo`), exige que
+todos os termos estejam presentes e ordena pela soma dos pesos dos campos.
+Funciona igual no MySQL e no SQLite.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+import re
+import unicodedata
+
+# Campo da demanda -> peso na relevância
+CAMPOS_BUSCA = {
+    'concurso': 5,
+    'numero_edital': 4,
+    'cargo': 3,
+    'autarquia': 3,
+    'banca': 2,
+}
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no',
+    'nas', 'nos', 'para', 'por', 'com', 'um', 'uma',
+}
+
+TAMANHO_TERMO = 50
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """
+    Converte o texto em termos de busca: minúsculos, sem acentos e sem stopwords.
+    
+    >>> normalizar('Analista Judiciário - TJ/SP')
+    ['analista', 'judiciario', 'tj', 'sp']
+    """
+    if not texto:
+        return []
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    termos = _SEPARADORES.split(sem_acento.lower())
+    return [t[:TAMANHO_TERMO] for t in termos if t and t not in STOPWORDS]
+
+
+def termos_demanda(demanda):
+    """
+    Retorna o conjunto de (campo, termo, peso) de uma demanda.
+    """
+    return {
+        (campo, termo, peso)
+        for campo, peso in CAMPOS_BUSCA.items()
+        for termo in normalizar(getattr(demanda, campo))
+    }
+
+
+def indexar_demanda(demanda):
+    """
+    Atualiza os termos de busca da demanda (só grava se algo mudou).
+    """
+    from .models import TermoBusca
+    
+    novos = termos_demanda(demanda)
+    atuais = set(
+        TermoBusca.objects.filter(demanda=demanda).values_list('campo', 'termo', 'peso')
+    )
+    if novos == atuais:
+        return
+    
+    with transaction.atomic():
+        TermoBusca.objects.filter(demanda=demanda).delete()
+        TermoBusca.objects.bulk_create([
+            TermoBusca(demanda=demanda, campo=campo, termo=termo, peso=peso)
+            for campo, termo, peso in novos
+        ])
+
+
+def reindexar_todas(demandas=None, batch_size=500):
+    """
+    Reconstrói o índice de busca do zero.
+    
+    Returns:
+        int: número de demandas indexadas
+    """
+    from .models import Demanda, TermoBusca
+    
+    if demandas is None:
+        demandas = Demanda.objects.all()
+    
+    total = 0
+    with transaction.atomic():
+        TermoBusca.objects.filter(demanda__in=demandas).delete()
+        lote = []
+        for demanda in demandas.only('id', *CAMPOS_BUSCA).iterator(chunk_size=batch_size):
+            lote.extend(
+                TermoBusca(demanda_id=demanda.id, campo=campo, termo=termo, peso=peso)
+                for campo, termo, peso in termos_demanda(demanda)
+            )
+            total += 1
+            if len(lote) >= batch_size:
+                TermoBusca.objects.bulk_create(lote)
+                lote = []
+        TermoBusca.objects.bulk_create(lote)
+    return total
+
+
+def _base_termos(campos):
+    from .models import TermoBusca
+    
+    base = TermoBusca.objects.all()
+    if campos:
+        base = base.filter(campo__in=campos)
+    return base
+
+
+def filtrar(texto, queryset, campos=None):
+    """
+    Filtra as demandas que contêm todos os termos buscados, sem ordenar.
+    Se o texto não gerar termos, retorna o queryset sem alteração.
+    """
+    base = _base_termos(campos)
+    
+    # istartswith gera LIKE 'termo%' e usa o índice em (termo, demanda);
+    # os termos já estão normalizados em minúsculas
+    for termo in dict.fromkeys(normalizar(texto)):
+        queryset = queryset.filter(
+            id__in=base.filter(termo__istartswith=termo).values('demanda_id')
+        )
+    return queryset
+
+
+def buscar(texto, queryset=None, campos=None):
+    """
+    Filtra as demandas que contêm todos os termos buscados e ordena por relevância.
+    
+    Args:
+        texto: texto digitado pelo usuário
+        queryset: queryset de Demanda a filtrar (padrão: todas)
+        campos: lista opcional de campos onde buscar (padrão: CAMPOS_BUSCA)
+    
+    Returns:
+        QuerySet anotado com `relevancia`, do mais relevante para o menos.
+        Se o texto não gerar termos, retorna o queryset sem alteração.
+    """
+    from .models import Demanda
+    
+    if queryset is None:
+        queryset = Demanda.objects.all()
+    
+    termos = list(dict.fromkeys(normalizar(texto)))
+    if not termos:
+        return queryset
+    
+    qualquer_termo = Q()
+    for termo in termos:
+        qualquer_termo |= Q(termo__istartswith=termo)
+    
+    relevancia = _base_termos(campos).filter(qualquer_termo, demanda=OuterRef('pk')).order_by().values(
+        'demanda'
+    ).annotate(total=Sum('peso')).values('total')
+    
+    return filtrar(texto, queryset, campos).annotate(
+        relevancia=Coalesce(Subquery(relevancia), Value(0))
+    ).order_by('-relevancia', '-criado_em')
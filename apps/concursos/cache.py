@@ -0,0 +1,96 @@
+"""
+Cache da página pública de concursos (home).
+
+A resposta renderizada é guardada por combinação normalizada de filtros
+(search/banca/cargo). A chave inclui um carimbo de versão que é trocado
+sempre que uma Demanda ou um Ticket é salvo ou removido (ver signals.py),
+invalidando todas as páginas de uma vez. A troca acontece no commit da
+transação (transaction.on_commit), nunca antes de os dados ficarem visíveis.
+"""
+from django.conf import settings
+from django.core.cache import cache
+import hashlib
+import urllib.parse
+import uuid
+
+VERSAO_KEY = 'home:versao'
+HITS_KEY = 'home:hits'
+MISSES_KEY = 'home:misses'
+
+
+def normalizar_filtros(params):
+    """
+    Retorna (search, banca, cargo) sem espaços extras.
+    """
+    return tuple(
+        ' '.join(params.get(campo, '').split())
+        for campo in ('search', 'banca', 'cargo')
+    )
+
+
+def versao_atual():
+    """
+    Carimbo de versão dos dados de demandas e tickets; muda a cada escrita.
+    """
+    versao = cache.get(VERSAO_KEY)
+    if versao is None:
+        versao = uuid.uuid4().hex
+        cache.add(VERSAO_KEY, versao, None)
+        versao = cache.get(VERSAO_KEY, versao)
+    return versao
+
+
+def chave_home(filtros, pagina=''):
+    """
+    Monta a chave de cache para a combinação de filtros na versão atual.
+    `pagina` é o cursor das páginas seguintes (vazio para a primeira).
+    """
+    query = urllib.parse.urlencode(list(zip(('search', 'banca', 'cargo'), filtros)) + [('pagina', pagina)])
+    digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+    prefixo = 'home-mais' if pagina else 'home'
+    return f"{prefixo}:{versao_atual()}:{digest}"
+
+
+def obter_home(chave):
+    """
+    Retorna o conteúdo renderizado em cache (ou None) e atualiza os contadores.
+    """
+    conteudo = cache.get(chave)
+    _incrementar(HITS_KEY if conteudo is not None else MISSES_KEY)
+    return conteudo
+
+
+def guardar_home(chave, conteudo):
+    cache.set(chave, conteudo, settings.HOME_CACHE_TIMEOUT)
+
+
+def invalidar_cache_home():
+    """
+    Troca o carimbo de versão; as entradas antigas expiram pelo timeout.
+    """
+    cache.set(VERSAO_KEY, uuid.uuid4().hex, None)
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, 1, None)
+
+
+def estatisticas_cache_home():
+    """
+    Retorna hits, misses e taxa de acerto do cache da home.
+    """
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'taxa_acerto': round((hits / total) * 100, 1) if total else 0,
+    }
+
+
+def zerar_estatisticas_cache_home():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
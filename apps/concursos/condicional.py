@@ -0,0 +1,119 @@
+"""
+GET condicional (ETag / Last-Modified) para a API e páginas públicas.
+
+Os validadores vêm de uma consulta barata feita antes de serializar ou
+renderizar: COUNT e MAX(atualizado_em) do queryset filtrado nas listagens
+por número de página, ou o atualizado_em do próprio objeto nos detalhes.
+Na paginação por cursor não há agregado: os validadores saem das linhas da
+própria página (ids e maior atualizado_em). Se o cliente já tem a versão
+atual (If-None-Match / If-Modified-Since), recebe 304 sem que o serializer
+ou o template rodem.
+
+A fila da demanda anda sem tocar em atualizado_em. Quando a resposta
+depende dela, o ETag leva o carimbo de versão do cache da home (trocado a
+cada escrita em Demanda e Ticket) e o Last-Modified não é enviado, pois não
+seria confiável.
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .paginacao import PaginacaoApi
+
+
+def gerar_etag(*partes):
+    """
+    ETag forte a partir das partes que identificam a versão da resposta.
+    """
+    resumo = hashlib.md5('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return f'"{resumo}"'
+
+
+def responder_condicional(request, etag, ultima_modificacao, gerar_resposta):
+    """
+    Responde 304/412 se as pré-condições do request permitirem; senão chama
+    gerar_resposta(). Em GET/HEAD a resposta leva ETag e Last-Modified.
+    
+    Args:
+        etag: ETag já entre aspas (ver gerar_etag)
+        ultima_modificacao: datetime ou None para não enviar Last-Modified
+        gerar_resposta: callable que produz a resposta completa
+    """
+    timestamp = int(ultima_modificacao.timestamp()) if ultima_modificacao else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = gerar_resposta()
+    
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+    return response
+
+
+class RespostaCondicionalMixin:
+    """
+    Mixin para ModelViewSet: list e retrieve com GET condicional.
+    
+    O estado da listagem é o COUNT e o MAX(atualizado_em) do queryset
+    filtrado (ou, por cursor, as linhas da página); o do detalhe é o
+    atualizado_em do objeto. Subclasses estendem estado_lista/estado_pagina/
+    estado_objeto quando a resposta depende de outros dados e
+    retornam False em last_modified_confiavel quando esses dados mudam sem
+    atualizar atualizado_em.
+    """
+    
+    def estado_lista(self, queryset):
+        return queryset.aggregate(total=Count('pk'), ultima=Max('atualizado_em'))
+    
+    def estado_pagina(self, itens):
+        return {
+            'ids': ','.join(str(item.pk) for item in itens),
+            'ultima': max((item.atualizado_em for item in itens), default=None),
+        }
+    
+    def estado_objeto(self, obj):
+        return {'pk': obj.pk, 'ultima': obj.atualizado_em}
+    
+    def last_modified_confiavel(self):
+        return True
+    
+    def _responder(self, request, estado, gerar_resposta):
+        # A mesma versão dos dados rende respostas diferentes por página,
+        # ?fields=/?expand= e formato (JSON ou API navegável).
+        etag = gerar_etag(
+            request.get_full_path(), request.accepted_media_type,
+            *(f'{chave}={estado[chave]}' for chave in sorted(estado)),
+        )
+        ultima = estado.get('ultima') if self.last_modified_confiavel() else None
+        return responder_condicional(request, etag, ultima, gerar_resposta)
+    
+    def list(self, request, *args, **kwargs):
+        # ?contagem=estimada existe para evitar o COUNT(*) da tabela inteira
+        if request.query_params.get('contagem') == 'estimada':
+            return super().list(request, *args, **kwargs)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        # Por cursor a página já é barata; agregar a tabela custaria mais que ela
+        if isinstance(self.paginator, PaginacaoApi) and self.paginator.usa_cursor(request):
+            itens = self.paginate_queryset(queryset)
+            return self._responder(
+                request, self.estado_pagina(itens),
+                lambda: self.get_paginated_response(self.get_serializer(itens, many=True).data),
+            )
+        
+        return self._responder(
+            request, self.estado_lista(queryset),
+            lambda: super(RespostaCondicionalMixin, self).list(request, *args, **kwargs),
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        
+        def gerar_resposta():
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+        
+        return self._responder(request, self.estado_objeto(instance), gerar_resposta)
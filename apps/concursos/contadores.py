@@ -0,0 +1,188 @@
+"""
+Contadores da fila desnormalizados em Demanda.
+
+Cada transição de status de um Ticket ajusta os contadores da demanda com
+UPDATE ... SET campo = campo ± 1 na mesma transação da mudança do ticket.
+O comando `recalcular_contadores` reconstrói tudo a partir da tabela tickets.
+
+Cada ticket também recebe, ao ser criado, um número de ordem na fila da
+demanda (Ticket.sequencia_fila). A demanda guarda a cabeça da fila
+(cabeca_fila: menor sequência ainda ativa), então a posição de um ticket é
+sequencia_fila - cabeca_fila + 1, sem contar linhas.
+
+Para a conta ser exata, as sequências ativas ficam contíguas: só recebe
+sequência quem entra na fila, sempre no fim (inclusive quem volta para ela),
+e quando um ticket sai do meio, compactar_fila renumera os que estão atrás
+dele. Saídas pela cabeça não renumeram nada.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Demanda
+
+# Status que ocupam a fila (na fila + aguardando envio + em análise)
+STATUS_FILA = ['na_fila', 'notificado', 'aguardando', 'em_analise']
+# Status de envios aguardando análise
+STATUS_PENDENTES = ['aguardando', 'em_analise']
+# Status de prova aprovada ou paga
+STATUS_APROVADOS = ['aprovado', 'pago']
+
+CONTADORES = {
+    'total_na_fila': STATUS_FILA,
+    'total_pendentes': STATUS_PENDENTES,
+    'total_aprovadas': STATUS_APROVADOS,
+}
+
+
+def _deltas(status, sinal, deltas):
+    for campo, status_contados in CONTADORES.items():
+        if status in status_contados:
+            deltas[campo] = deltas.get(campo, 0) + sinal
+
+
+def reservar_sequencia_fila(demanda_id):
+    """
+    Incrementa e retorna a última sequência da fila da demanda.
+    O UPDATE bloqueia a linha da demanda até o fim da transação.
+    """
+    Demanda.objects.filter(pk=demanda_id).update(ultima_sequencia_fila=F('ultima_sequencia_fila') + 1)
+    return Demanda.objects.filter(pk=demanda_id).values_list('ultima_sequencia_fila', flat=True).get()
+
+
+def _cabeca_fila():
+    from apps.tickets.models import Ticket
+    
+    menor_ativa = Ticket.objects.filter(
+        demanda=OuterRef('pk'),
+        status__in=STATUS_FILA
+    ).order_by('sequencia_fila').values('sequencia_fila')[:1]
+    return Coalesce(Subquery(menor_ativa), F('ultima_sequencia_fila') + 1)
+
+
+def atualizar_cabeca_fila(demanda_id):
+    """
+    Move a cabeça da fila para a menor sequência ainda ativa da demanda.
+    """
+    Demanda.objects.filter(pk=demanda_id).update(cabeca_fila=_cabeca_fila())
+
+
+def compactar_fila(demanda_id):
+    """
+    Renumera as sequências ativas da demanda para ficarem contíguas a partir
+    da menor, na ordem atual, e ajusta ultima_sequencia_fila.
+    
+    Os tickets com o mesmo deslocamento são movidos em um único UPDATE (uma
+    saída do meio da fila desloca todos os de trás em -1).
+    """
+    from apps.tickets.models import Ticket
+    
+    ativos = list(
+        Ticket.objects.filter(demanda_id=demanda_id, status__in=STATUS_FILA)
+        .order_by('sequencia_fila', 'id')
+        .select_for_update()
+        .values_list('id', 'sequencia_fila')
+    )
+    if not ativos:
+        return
+    
+    inicio = ativos[0][1]
+    por_deslocamento = {}
+    for posicao, (ticket_id, sequencia) in enumerate(ativos):
+        deslocamento = inicio + posicao - sequencia
+        if deslocamento:
+            por_deslocamento.setdefault(deslocamento, []).append(ticket_id)
+    for deslocamento, ids in por_deslocamento.items():
+        Ticket.objects.filter(id__in=ids).update(sequencia_fila=F('sequencia_fila') + deslocamento)
+    
+    Demanda.objects.filter(pk=demanda_id).update(ultima_sequencia_fila=inicio + len(ativos) - 1)
+
+
+def aplicar_transicao(antes, depois):
+    """
+    Ajusta os contadores para a transição de um ticket.
+    
+    Args:
+        antes: (demanda_id, status) antes da mudança, ou None se o ticket é novo
+        depois: (demanda_id, status) após a mudança, ou None se foi removido
+    """
+    if antes == depois:
+        return
+    
+    por_demanda = {}
+    if antes:
+        _deltas(antes[1], -1, por_demanda.setdefault(antes[0], {}))
+    if depois:
+        _deltas(depois[1], 1, por_demanda.setdefault(depois[0], {}))
+    
+    for demanda_id, deltas in por_demanda.items():
+        saiu_da_fila = deltas.get('total_na_fila', 0) < 0
+        deltas = {campo: F(campo) + delta for campo, delta in deltas.items() if delta}
+        if deltas:
+            Demanda.objects.filter(pk=demanda_id).update(**deltas)
+        
+        # Ticket entrou ou saiu da fila: a cabeça pode ter mudado
+        if 'total_na_fila' in deltas:
+            # Entradas vão para o fim; uma saída do meio faz os de trás avançarem
+            if saiu_da_fila:
+                compactar_fila(demanda_id)
+            atualizar_cabeca_fila(demanda_id)
+
+
+def aplicar_transicao_em_lote(quantidades, status_antes, status_depois):
+    """
+    Ajusta os contadores para tickets movidos em massa (queryset.update(),
+    que não passa por Ticket.save) de status_antes para status_depois.
+    
+    Args:
+        quantidades: {demanda_id: número de tickets que mudaram}
+        status_antes: status anterior comum a todos os tickets
+        status_depois: novo status
+    """
+    deltas = {}
+    _deltas(status_antes, -1, deltas)
+    _deltas(status_depois, 1, deltas)
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    for demanda_id, quantidade in quantidades.items():
+        Demanda.objects.filter(pk=demanda_id).update(**{
+            campo: F(campo) + delta * quantidade for campo, delta in deltas.items()
+        })
+    
+    if 'total_na_fila' in deltas:
+        if deltas['total_na_fila'] < 0:
+            for demanda_id in quantidades:
+                compactar_fila(demanda_id)
+        Demanda.objects.filter(pk__in=list(quantidades)).update(cabeca_fila=_cabeca_fila())
+
+
+def recalcular_contadores(demandas=None):
+    """
+    Reconstrói os contadores a partir da tabela de tickets em um único UPDATE
+    e recompacta a fila das demandas com tickets ativos.
+    
+    Args:
+        demandas: queryset opcional para limitar as demandas recalculadas
+    
+    Returns:
+        int: número de demandas atualizadas
+    """
+    from apps.tickets.models import Ticket
+    
+    def contagem(status_contados):
+        subquery = Ticket.objects.filter(
+            demanda=OuterRef('pk'),
+            status__in=status_contados
+        ).order_by().values('demanda').annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(subquery), Value(0))
+    
+    if demandas is None:
+        demandas = Demanda.objects.all()
+    
+    total = demandas.update(**{
+        campo: contagem(status_contados) for campo, status_contados in CONTADORES.items()
+    })
+    for demanda_id in demandas.filter(total_na_fila__gt=0).values_list('id', flat=True):
+        compactar_fila(demanda_id)
+    demandas.update(cabeca_fila=_cabeca_fila())
+    return total
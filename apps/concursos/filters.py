@@ -0,0 +1,17 @@
+from rest_framework.filters import SearchFilter
+from .busca import buscar
+
+
+class BuscaDemandaFilter(SearchFilter):
+    """
+    Substitui o SearchFilter padrão (icontains em cada campo) pela busca
+    no índice de termos, ordenada por relevância.
+    
+    GET /api/demandas/?search=analista tj
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        texto = request.query_params.get(self.search_param, '')
+        if not texto.strip():
+            return queryset
+        return buscar(texto, queryset)
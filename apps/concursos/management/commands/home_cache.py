@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.concursos.cache import (
+    estatisticas_cache_home, zerar_estatisticas_cache_home, invalidar_cache_home
+)
+
+
+class Command(BaseCommand):
+    """
+    Mostra os contadores de hit/miss do cache da home pública.
+    
+    Uso: python manage.py home_cache [--zerar] [--invalidar]
+    """
+    help = 'Mostra estatísticas do cache da página pública de concursos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--zerar', action='store_true', help='Zera os contadores de hit/miss')
+        parser.add_argument('--invalidar', action='store_true', help='Invalida todas as páginas em cache')
+    
+    def handle(self, *args, **options):
+        stats = estatisticas_cache_home()
+        self.stdout.write(
+            f"Hits: {stats['hits']} | Misses: {stats['misses']} | Taxa de acerto: {stats['taxa_acerto']}%"
+        )
+        
+        if options['zerar']:
+            zerar_estatisticas_cache_home()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados.'))
+        
+        if options['invalidar']:
+            invalidar_cache_home()
+            self.stdout.write(self.style.SUCCESS('Cache da home invalidado.'))
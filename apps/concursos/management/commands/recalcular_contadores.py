@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.concursos.cache import invalidar_cache_home
+from apps.concursos.contadores import recalcular_contadores
+from apps.concursos.models import Demanda
+
+
+class Command(BaseCommand):
+    """
+    Reconstrói os contadores da fila (total_na_fila, total_pendentes,
+    total_aprovadas) de todas as demandas a partir da tabela de tickets.
+    
+    Uso: python manage.py recalcular_contadores [--demanda ID ...]
+    """
+    help = 'Recalcula os contadores da fila das demandas a partir dos tickets'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--demanda', type=int, nargs='+', help='IDs das demandas a recalcular (padrão: todas)')
+    
+    def handle(self, *args, **options):
+        demandas = Demanda.objects.all()
+        if options['demanda']:
+            demandas = demandas.filter(id__in=options['demanda'])
+        
+        with transaction.atomic():
+            total = recalcular_contadores(demandas)
+        invalidar_cache_home()
+        
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados para {total} demanda(s).'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.concursos.busca import reindexar_todas
+
+
+class Command(BaseCommand):
+    """
+    Reconstrói do zero o índice de busca (TermoBusca) de todas as demandas.
+    
+    Uso: python manage.py reindexar_busca
+    """
+    help = 'Reconstrói o índice de busca textual dos concursos'
+    
+    def handle(self, *args, **options):
+        total = reindexar_todas()
+        self.stdout.write(self.style.SUCCESS(f'{total} demanda(s) indexada(s).'))
@@ -0,0 +1,34 @@
+# Generated manually to reconcile the migration state with the model
+
+from django.db import migrations, models
+
+
+# A demanda ganhou valor_recompensa, novos status e novos rótulos sem
+# migração; os bancos existentes já têm essas colunas. Só o estado das
+# migrações é atualizado, nada é executado no banco (ver a 0002 dos tickets).
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterModelOptions(
+                    name='demanda',
+                    options={'ordering': ['-criado_em'], 'verbose_name': 'Concurso', 'verbose_name_plural': 'Concursos'},
+                ),
+                migrations.AddField(
+                    model_name='demanda',
+                    name='valor_recompensa',
+                    field=models.DecimalField(decimal_places=2, default=50.0, help_text='Valor a ser pago por prova válida', max_digits=10, verbose_name='Valor da Recompensa (R$)'),
+                ),
+                migrations.AlterField(
+                    model_name='demanda',
+                    name='status',
+                    field=models.CharField(choices=[('aberto', 'Aberto - Aguardando Prova'), ('em_analise', 'Em Análise'), ('concluido', 'Concluído - Prova Cadastrada'), ('cancelado', 'Cancelado')], default='aberto', max_length=20, verbose_name='Status'),
+                ),
+            ],
+        ),
+    ]
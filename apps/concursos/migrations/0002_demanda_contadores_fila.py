@@ -0,0 +1,50 @@
+# Generated manually for denormalized queue counters
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def popular_contadores(apps, schema_editor):
+    Demanda = apps.get_model('concursos', 'Demanda')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    
+    def contagem(status_contados):
+        subquery = Ticket.objects.filter(
+            demanda=OuterRef('pk'),
+            status__in=status_contados
+        ).order_by().values('demanda').annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(subquery), Value(0))
+    
+    Demanda.objects.update(
+        total_na_fila=contagem(['na_fila', 'notificado', 'aguardando', 'em_analise']),
+        total_pendentes=contagem(['aguardando', 'em_analise']),
+        total_aprovadas=contagem(['aprovado', 'pago']),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0001_demanda_estado_base'),
+        ('tickets', '0002_ticket_estado_base'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demanda',
+            name='total_na_fila',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tickets na Fila'),
+        ),
+        migrations.AddField(
+            model_name='demanda',
+            name='total_pendentes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Envios Pendentes'),
+        ),
+        migrations.AddField(
+            model_name='demanda',
+            name='total_aprovadas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Provas Aprovadas'),
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
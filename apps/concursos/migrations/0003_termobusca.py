@@ -0,0 +1,44 @@
+# Generated manually for concurso search index
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def popular_indice(apps, schema_editor):
+    from apps.concursos.busca import termos_demanda
+    
+    Demanda = apps.get_model('concursos', 'Demanda')
+    TermoBusca = apps.get_model('concursos', 'TermoBusca')
+    
+    TermoBusca.objects.bulk_create([
+        TermoBusca(demanda_id=demanda.id, campo=campo, termo=termo, peso=peso)
+        for demanda in Demanda.objects.iterator()
+        for campo, termo, peso in termos_demanda(demanda)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0002_demanda_contadores_fila'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermoBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(max_length=20, verbose_name='Campo')),
+                ('termo', models.CharField(max_length=50, verbose_name='Termo')),
+                ('peso', models.PositiveSmallIntegerField(default=1, verbose_name='Peso')),
+                ('demanda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termos_busca', to='concursos.demanda', verbose_name='Concurso')),
+            ],
+            options={
+                'verbose_name': 'Termo de Busca',
+                'verbose_name_plural': 'Termos de Busca',
+                'db_table': 'demandas_busca',
+                'indexes': [models.Index(fields=['termo', 'demanda'], name='demandas_bu_termo_bd2cb4_idx')],
+            },
+        ),
+        migrations.RunPython(popular_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated manually for keyset pagination of the public listing
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0003_termobusca'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='demanda',
+            index=models.Index(fields=['criado_em', 'id'], name='demandas_criado__e98097_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated manually for stored queue sequence numbers
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0004_demanda_criado_em_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demanda',
+            name='ultima_sequencia_fila',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Última Sequência da Fila'),
+        ),
+        migrations.AddField(
+            model_name='demanda',
+            name='cabeca_fila',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Cabeça da Fila'),
+        ),
+    ]
@@ -14,6 +14,11 @@ class Demanda(models.Model):
         ('cancelado', 'Cancelado'),
     ]
     
+    CAMPOS_CONTADORES = (
+        'total_na_fila', 'total_pendentes', 'total_aprovadas',
+        'ultima_sequencia_fila', 'cabeca_fila',
+    )
+    
     concurso = models.CharField(max_length=255, verbose_name='Nome do Concurso')
     numero_edital = models.CharField(max_length=50, verbose_name='Número do Edital')
     banca = models.CharField(max_length=100, verbose_name='Banca Examinadora')
@@ -27,6 +32,12 @@ class Demanda(models.Model):
         default='aberto',
         verbose_name='Status'
     )
+    # Contadores da fila mantidos pelo Ticket (ver apps/concursos/contadores.py)
+    total_na_fila = models.PositiveIntegerField(default=0, editable=False, verbose_name='Tickets na Fila')
+    total_pendentes = models.PositiveIntegerField(default=0, editable=False, verbose_name='Envios Pendentes')
+    total_aprovadas = models.PositiveIntegerField(default=0, editable=False, verbose_name='Provas Aprovadas')
+    ultima_sequencia_fila = models.PositiveIntegerField(default=0, editable=False, verbose_name='Última Sequência da Fila')
+    cabeca_fila = models.PositiveIntegerField(default=1, editable=False, verbose_name='Cabeça da Fila')
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
     
@@ -35,16 +46,61 @@ class Demanda(models.Model):
         verbose_name = 'Concurso'
         verbose_name_plural = 'Concursos'
         ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['criado_em', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.concurso} - {self.numero_edital}"
     
+    def save(self, *args, **kwargs):
+        """
+        Nunca sobrescreve os contadores da fila ao atualizar uma demanda existente:
+        eles são ajustados diretamente no banco a cada transição de ticket, então
+        o valor em memória pode estar desatualizado.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_CONTADORES
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def tem_prova_aprovada(self):
         """Verifica se já tem alguma prova aprovada/paga"""
-        return self.tickets.filter(status__in=['pago', 'aprovado']).exists()
+        return self.total_aprovadas > 0
     
     @property
     def envios_pendentes(self):
         """Conta envios aguardando análise"""
-        return self.tickets.filter(status__in=['aguardando', 'em_analise']).count()
+        return self.total_pendentes
+
+
+class TermoBusca(models.Model):
+    """
+    Índice invertido de busca das demandas.
+    Cada linha é um termo normalizado (minúsculo, sem acentos) de um campo da demanda.
+    Mantido por apps/concursos/busca.py a cada alteração da demanda.
+    """
+    
+    demanda = models.ForeignKey(
+        Demanda,
+        on_delete=models.CASCADE,
+        related_name='termos_busca',
+        verbose_name='Concurso'
+    )
+    campo = models.CharField(max_length=20, verbose_name='Campo')
+    termo = models.CharField(max_length=50, verbose_name='Termo')
+    peso = models.PositiveSmallIntegerField(default=1, verbose_name='Peso')
+    
+    class Meta:
+        db_table = 'demandas_busca'
+        verbose_name = 'Termo de Busca'
+        verbose_name_plural = 'Termos de Busca'
+        indexes = [
+            models.Index(fields=['termo', 'demanda']),
+        ]
+    
+    def __str__(self):
+        return f"{self.termo} ({self.campo})"
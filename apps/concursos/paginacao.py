@@ -0,0 +1,215 @@
+"""
+Paginação por chave (keyset) para listagens ordenadas por (criado_em, id).
+
+Em vez de OFFSET, cada página continua a partir do último item da anterior:
+WHERE criado_em < X OR (criado_em = X AND id < Y), usando o índice
+(criado_em, id). O custo de cada página independe de quantas vieram antes.
+
+Resultados de busca (anotados com `relevancia` por busca.buscar) são
+paginados por (relevancia, criado_em, id), e o cursor leva a relevância
+do último item.
+
+PaginacaoApi aplica o mesmo esquema às listagens da API (?paginacao=cursor)
+e, no modo por número de página, pode usar o total estimado pelas
+estatísticas do banco em vez de COUNT(*) (?contagem=estimada).
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Abaixo disso o COUNT exato é barato e a estimativa não compensa
+CONTAGEM_EXATA_ATE = 10000
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(obj):
+    valor = f"{obj.criado_em.isoformat()}|{obj.id}"
+    relevancia = getattr(obj, 'relevancia', None)
+    if relevancia is not None:
+        valor += f"|{relevancia}"
+    return urlsafe_base64_encode(valor.encode('utf-8'))
+
+
+def decodificar_cursor(cursor):
+    """
+    Retorna (criado_em, id, relevancia) a partir do cursor.
+    A relevância é None em cursores de listagens sem busca.
+    
+    Raises:
+        CursorInvalido: se o cursor estiver malformado
+    """
+    try:
+        criado_em, pk, *relevancia = force_str(urlsafe_base64_decode(cursor)).split('|')
+        criado_em = parse_datetime(criado_em)
+        pk = int(pk)
+        if len(relevancia) > 1:
+            raise ValueError(cursor)
+        relevancia = int(relevancia[0]) if relevancia else None
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise CursorInvalido(cursor)
+    if criado_em is None:
+        raise CursorInvalido(cursor)
+    return criado_em, pk, relevancia
+
+
+def paginar_por_chave(queryset, cursor=None, tamanho=20):
+    """
+    Retorna uma página do queryset em ordem decrescente de (criado_em, id),
+    precedida da relevância quando o queryset vem de busca.buscar.
+    
+    Args:
+        queryset: queryset com campos criado_em e id
+        cursor: cursor devolvido pela página anterior (None para a primeira)
+        tamanho: itens por página
+    
+    Returns:
+        tuple: (lista de itens, cursor da próxima página ou None)
+    
+    Raises:
+        CursorInvalido: se o cursor estiver malformado ou não for desta listagem
+    """
+    ranqueada = 'relevancia' in queryset.query.annotations
+    if ranqueada:
+        queryset = queryset.order_by('-relevancia', '-criado_em', '-id')
+    else:
+        queryset = queryset.order_by('-criado_em', '-id')
+    
+    if cursor:
+        criado_em, pk, relevancia = decodificar_cursor(cursor)
+        if ranqueada != (relevancia is not None):
+            raise CursorInvalido(cursor)
+        depois = Q(criado_em__lt=criado_em) | Q(criado_em=criado_em, id__lt=pk)
+        if ranqueada:
+            depois = Q(relevancia__lt=relevancia) | Q(depois, relevancia=relevancia)
+        queryset = queryset.filter(depois)
+    
+    itens = list(queryset[:tamanho + 1])
+    proximo = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        proximo = codificar_cursor(itens[-1])
+    return itens, proximo
+
+
+def estimar_total(queryset):
+    """
+    Total de linhas da tabela segundo as estatísticas do banco, sem COUNT(*).
+    
+    Só vale para listagens sem filtros (a estatística é da tabela inteira).
+    Retorna None quando não há estimativa confiável.
+    """
+    if queryset.query.has_filters() or queryset.query.distinct:
+        return None
+    
+    tabela = queryset.model._meta.db_table
+    conexao = connections[queryset.db]
+    
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [tabela]
+            )
+        elif conexao.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabela])
+        elif conexao.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx IS NULL', [tabela])
+            linha = cursor.fetchone()
+            return int(linha[0].split()[0]) if linha else None
+        else:
+            return None
+        linha = cursor.fetchone()
+    
+    if not linha or linha[0] is None or linha[0] < 0:
+        return None
+    return int(linha[0])
+
+
+class PaginatorEstimado(Paginator):
+    """Paginator que usa estimar_total() para tabelas grandes sem filtro."""
+    
+    estimado = False
+    
+    @cached_property
+    def count(self):
+        estimativa = estimar_total(self.object_list)
+        if estimativa is not None and estimativa > CONTAGEM_EXATA_ATE:
+            self.estimado = True
+            return estimativa
+        return super().count
+
+
+class PaginacaoApi(PageNumberPagination):
+    """
+    Paginação das listagens da API.
+    
+    - padrão: por número de página (?page=N), com COUNT exato;
+    - ?contagem=estimada: o total vem das estatísticas da tabela quando a
+      listagem não tem filtros (resposta traz "count_estimado": true);
+    - ?paginacao=cursor: por chave (criado_em, id), sem COUNT nem OFFSET;
+      com ?search= a relevância vem antes na chave; a resposta traz
+      "next" com o cursor da próxima página.
+    """
+    cursor_query_param = 'cursor'
+    
+    def usa_cursor(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get('paginacao') == 'cursor'
+        )
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.modo_cursor = self.usa_cursor(request)
+        if not self.modo_cursor:
+            if request.query_params.get('contagem') == 'estimada':
+                self.django_paginator_class = PaginatorEstimado
+            return super().paginate_queryset(queryset, request, view)
+        
+        self.request = request
+        try:
+            itens, self.proximo_cursor = paginar_por_chave(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request)
+            )
+        except CursorInvalido:
+            raise NotFound('Cursor inválido.')
+        return itens
+    
+    def get_next_link(self):
+        if not self.modo_cursor:
+            return super().get_next_link()
+        if not self.proximo_cursor:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.proximo_cursor)
+    
+    def get_paginated_response(self, data):
+        if self.modo_cursor:
+            return Response({
+                'next': self.get_next_link(),
+                'previous': None,
+                'results': data,
+            })
+        
+        response = super().get_paginated_response(data)
+        if getattr(self.page.paginator, 'estimado', False):
+            response.data['count_estimado'] = True
+        return response
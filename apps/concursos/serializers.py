@@ -2,7 +2,53 @@ from rest_framework import serializers
 from .models import Demanda
 
 
-class DemandaSerializer(serializers.ModelSerializer):
+def _lista_param(request, nome):
+    valor = request.query_params.get(nome, '') if request is not None else ''
+    return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+def campos_pedidos(serializer_class, request):
+    """
+    Campos de saída pedidos pelo cliente.
+    
+    ?fields=a,b limita aos campos listados; ?expand=x inclui o campo
+    expansível x (ver `campos_expansiveis`), que por padrão fica de fora.
+    """
+    todos = serializer_class.Meta.fields
+    expansiveis = getattr(serializer_class, 'campos_expansiveis', {})
+    
+    fields = _lista_param(request, 'fields')
+    if fields:
+        campos = {campo for campo in fields if campo in todos}
+    else:
+        campos = set(todos) - set(expansiveis.values())
+    
+    for nome in _lista_param(request, 'expand'):
+        if nome in expansiveis:
+            campos.add(expansiveis[nome])
+    return campos
+
+
+class CamposDinamicosMixin:
+    """
+    Aplica ?fields= e ?expand= (ver campos_pedidos) ao serializer raiz.
+    """
+    
+    campos_expansiveis = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        
+        campos = campos_pedidos(type(self), request)
+        for nome in list(self.fields):
+            if nome not in campos:
+                self.fields.pop(nome)
+
+
+class DemandaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Demanda.
     """
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .busca import indexar_demanda
+from .cache import invalidar_cache_home
+from .models import Demanda
+
+
+@receiver(post_save, sender=Demanda)
+@receiver(post_delete, sender=Demanda)
+@receiver(post_save, sender='tickets.Ticket')
+@receiver(post_delete, sender='tickets.Ticket')
+def invalidar_home(sender, **kwargs):
+    """
+    Qualquer alteração em Demanda ou Ticket invalida a home em cache.
+    
+    Só depois do commit: trocada antes, a versão nova poderia guardar uma
+    página renderizada com os dados ainda não confirmados.
+    """
+    transaction.on_commit(invalidar_cache_home)
+
+
+@receiver(post_save, sender=Demanda)
+def atualizar_indice_busca(sender, instance, **kwargs):
+    """Mantém os termos de busca da demanda sincronizados."""
+    indexar_demanda(instance)
@@ -1,3 +1,345 @@
-from django.test import TestCase
+import io
+from datetime import date
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.concursos.admin import DemandaAdmin
+from apps.concursos.busca import buscar
+from apps.concursos.cache import VERSAO_KEY, estatisticas_cache_home, zerar_estatisticas_cache_home
+from apps.concursos.models import Demanda
+from apps.concursos.paginacao import CursorInvalido, codificar_cursor, decodificar_cursor
+from apps.tickets import transicoes
+from apps.tickets.models import Ticket
+from apps.users.models import AdminUser
 
-# Create your tests here.
+
+def criar_demanda(**campos):
+    """Demanda aberta com dados de exemplo; `campos` sobrescreve os padrões."""
+    dados = {
+        'concurso': 'Concurso TRT', 'numero_edital': '01/2025', 'banca': 'FGV',
+        'data_concurso': date(2025, 5, 1), 'cargo': 'Analista', 'autarquia': 'TRT',
+    }
+    dados.update(campos)
+    return Demanda.objects.create(**dados)
+
+
+def criar_ticket(demanda, **campos):
+    """Ticket da demanda com dados de cliente de exemplo (entra na fila por padrão)."""
+    dados = {
+        'cliente_nome': 'Maria da Silva', 'cliente_whatsapp': '+5511966149003',
+        'cliente_pix': 'maria@exemplo.com',
+    }
+    dados.update(campos)
+    return Ticket.objects.create(demanda=demanda, **dados)
+
+
+class DemandaAdminChangelistTests(TestCase):
+    """
+    A listagem de demandas no admin deve custar o mesmo número de consultas
+    qualquer que seja o tamanho da página.
+    """
+    
+    def setUp(self):
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        for i in range(10):
+            criar_ticket(criar_demanda(concurso=f'Concurso {i}', numero_edital=f'{i}/2025'))
+    
+    def _consultas(self, por_pagina):
+        with mock.patch.object(DemandaAdmin, 'list_per_page', por_pagina):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse('admin:concursos_demanda_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '1 envio(s)', count=por_pagina)
+        return len(consultas)
+    
+    def test_consultas_nao_crescem_com_a_pagina(self):
+        self.assertEqual(self._consultas(2), self._consultas(10))
+
+
+class HomeCacheTests(TestCase):
+    """
+    Testes do cache da home: carimbo de versão e contadores de acerto.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.demanda = criar_demanda()
+    
+    def _home(self, url=None):
+        response = self.client.get(url or reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache']
+    
+    def test_escrita_troca_versao_e_invalida_a_home(self):
+        self.assertEqual(self._home(), 'MISS')
+        self.assertEqual(self._home(), 'HIT')
+        
+        for alterar in (
+            lambda: criar_ticket(self.demanda),
+            lambda: Ticket.objects.get().delete(),
+            lambda: Demanda.objects.get().save(),
+        ):
+            versao = cache.get(VERSAO_KEY)
+            with self.captureOnCommitCallbacks(execute=True):
+                alterar()
+                # Antes do commit a versão não muda
+                self.assertEqual(cache.get(VERSAO_KEY), versao)
+            self.assertNotEqual(cache.get(VERSAO_KEY), versao)
+            self.assertEqual(self._home(), 'MISS')
+            self.assertEqual(self._home(), 'HIT')
+    
+    def test_transicao_em_massa_troca_versao_so_no_commit(self):
+        criar_ticket(self.demanda, status='em_analise')
+        self._home()
+        versao = cache.get(VERSAO_KEY)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.assertEqual(len(transicoes.recusar(Ticket.objects.all(), 'Prova ilegível')), 1)
+                self.assertEqual(self._home(), 'HIT')
+            self.assertEqual(cache.get(VERSAO_KEY), versao)
+        
+        self.assertNotEqual(cache.get(VERSAO_KEY), versao)
+        self.assertEqual(self._home(), 'MISS')
+    
+    def test_filtros_normalizados_compartilham_entrada(self):
+        self.assertEqual(self._home(reverse('home') + '?search=trt&banca=FGV'), 'MISS')
+        self.assertEqual(self._home(reverse('home') + '?banca=FGV&search=+trt++'), 'HIT')
+        self.assertEqual(self._home(reverse('home') + '?search=tj'), 'MISS')
+    
+    def test_contadores_de_acerto(self):
+        self.assertEqual(estatisticas_cache_home(), {'hits': 0, 'misses': 0, 'taxa_acerto': 0})
+        self._home()
+        self._home()
+        self._home()
+        self.assertEqual(estatisticas_cache_home(), {'hits': 2, 'misses': 1, 'taxa_acerto': 66.7})
+        
+        zerar_estatisticas_cache_home()
+        self.assertEqual(estatisticas_cache_home()['hits'], 0)
+
+
+class ContadoresFilaTests(TestCase):
+    """
+    Testes dos contadores da fila desnormalizados em Demanda.
+    """
+    
+    def setUp(self):
+        self.demanda = criar_demanda()
+    
+    def _contadores(self, demanda=None):
+        return Demanda.objects.values(*Demanda.CAMPOS_CONTADORES).get(pk=(demanda or self.demanda).pk)
+    
+    def test_criacao_transicoes_e_exclusao(self):
+        primeiro, segundo, terceiro = (criar_ticket(self.demanda) for _ in range(3))
+        self.assertEqual(self._contadores(), {
+            'total_na_fila': 3, 'total_pendentes': 0, 'total_aprovadas': 0,
+            'ultima_sequencia_fila': 3, 'cabeca_fila': 1,
+        })
+        
+        primeiro.status = 'em_analise'
+        primeiro.save()
+        self.assertEqual(self._contadores()['total_pendentes'], 1)
+        self.assertEqual(self._contadores()['total_na_fila'], 3)
+        
+        primeiro.status = 'aprovado'
+        primeiro.save(update_fields=['status'])
+        contadores = self._contadores()
+        self.assertEqual(
+            (contadores['total_na_fila'], contadores['total_pendentes'], contadores['total_aprovadas']), (2, 0, 1)
+        )
+        self.assertEqual(contadores['cabeca_fila'], segundo.sequencia_fila)
+        
+        segundo.delete()
+        self.assertEqual(self._contadores()['total_na_fila'], 1)
+        self.assertEqual(self._contadores()['cabeca_fila'], terceiro.sequencia_fila)
+        
+        # Trocar de demanda: sai de uma fila e entra no fim da outra
+        outra = criar_demanda(concurso='Concurso TJ', numero_edital='02/2025')
+        terceiro.demanda = outra
+        terceiro.save()
+        self.assertEqual(self._contadores()['total_na_fila'], 0)
+        self.assertEqual(self._contadores()['cabeca_fila'], 4)
+        self.assertEqual(self._contadores(outra)['total_na_fila'], 1)
+        self.assertEqual(terceiro.sequencia_fila, 1)
+    
+    def test_salvar_demanda_desatualizada_preserva_contadores(self):
+        desatualizada = Demanda.objects.get(pk=self.demanda.pk)
+        criar_ticket(self.demanda)
+        
+        desatualizada.cargo = 'Técnico'
+        desatualizada.save()
+        self.assertEqual(self._contadores()['total_na_fila'], 1)
+        self.assertEqual(Demanda.objects.get(pk=self.demanda.pk).cargo, 'Técnico')
+    
+    def test_comando_recalcular_corrige_contadores(self):
+        criar_ticket(self.demanda)
+        criar_ticket(self.demanda, status='aguardando')
+        criar_ticket(self.demanda, status='pago')
+        outra = criar_demanda(concurso='Concurso TJ', numero_edital='02/2025')
+        criar_ticket(outra)
+        corretos = self._contadores()
+        
+        corrompidos = {'total_na_fila': 40, 'total_pendentes': 0, 'total_aprovadas': 0, 'cabeca_fila': 9}
+        Demanda.objects.update(**corrompidos)
+        
+        call_command('recalcular_contadores', demanda=[self.demanda.pk], stdout=io.StringIO())
+        self.assertEqual(self._contadores(), corretos)
+        self.assertEqual(self._contadores(outra)['total_na_fila'], 40)
+        
+        call_command('recalcular_contadores', stdout=io.StringIO())
+        self.assertEqual(self._contadores(outra)['total_na_fila'], 1)
+        self.assertEqual(self._contadores(outra)['cabeca_fila'], 1)
+
+
+class BuscaDemandasTests(TestCase):
+    """
+    Testes da busca por termos normalizados (acentos, prefixos e relevância).
+    """
+    
+    def setUp(self):
+        self.trf = criar_demanda(
+            concurso='Tribunal Regional Federal', numero_edital='01/2025', cargo='Técnico Judiciário', autarquia='TRF3',
+        )
+        self.receita = criar_demanda(
+            concurso='Receita', numero_edital='02/2025', cargo='Auditor Fiscal', autarquia='Receita Federal',
+        )
+        self.prefeitura = criar_demanda(
+            concurso='Prefeitura de São Paulo', numero_edital='03/2025', cargo='Técnico em Informática',
+            autarquia='PMSP',
+        )
+    
+    def _ids(self, texto):
+        return list(buscar(texto).values_list('id', flat=True))
+    
+    def test_acentos_e_maiusculas_sao_ignorados(self):
+        esperado = [self.trf.id]
+        self.assertEqual(self._ids('tecnico judiciario'), esperado)
+        self.assertEqual(self._ids('Técnico JUDICIÁRIO'), esperado)
+        self.assertEqual(self._ids('sao paulo'), [self.prefeitura.id])
+        self.assertEqual(self._ids('São Paulo'), [self.prefeitura.id])
+    
+    def test_relevancia_pelos_pesos_dos_campos(self):
+        # "federal" está no concurso (peso 5) do TRF e na autarquia (peso 3) da Receita
+        self.assertEqual(self._ids('federal'), [self.trf.id, self.receita.id])
+        
+        # Termos repetidos em vários campos somam pesos
+        self.assertEqual(self._ids('receita'), [self.receita.id])
+        relevancia = buscar('receita').values_list('relevancia', flat=True).get()
+        self.assertEqual(relevancia, 8)
+        
+        # Todos os termos precisam estar presentes
+        self.assertEqual(self._ids('tecnico informatica'), [self.prefeitura.id])
+        self.assertEqual(self._ids('tecnico auditor'), [])
+    
+    def test_texto_vazio_stopwords_e_termos_curtos(self):
+        todas = Demanda.objects.all()
+        self.assertIs(buscar('', todas), todas)
+        self.assertIs(buscar('  - / ', todas), todas)
+        self.assertIs(buscar('de da do', todas), todas)
+        
+        # Cada termo vale como prefixo, mesmo com uma ou duas letras
+        self.assertEqual(set(self._ids('tec')), {self.trf.id, self.prefeitura.id})
+        self.assertEqual(self._ids('t j'), [self.trf.id])
+        self.assertEqual(self._ids('x'), [])
+    
+    def test_api_e_home_usam_o_indice(self):
+        api = APIClient()
+        api.force_authenticate(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        response = api.get('/api/demandas/?search=Federal')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.trf.id, self.receita.id])
+        
+        cache.clear()
+        response = self.client.get(reverse('home') + '?search=Regional Federal&cargo=técnico')
+        self.assertContains(response, 'Tribunal Regional Federal')
+        self.assertNotContains(response, 'Prefeitura de São Paulo')
+    
+    @override_settings(HOME_PAGE_SIZE=1)
+    def test_home_e_admin_ordenam_por_relevancia(self):
+        # A Receita é mais recente: sem relevância viria primeiro
+        cache.clear()
+        response = self.client.get(reverse('home'), {'search': 'federal'})
+        self.assertEqual([d.id for d in response.context['demandas']], [self.trf.id])
+        
+        cursor = response.context['proximo_cursor']
+        response = self.client.get(reverse('home_mais'), {'search': 'federal', 'cursor': cursor})
+        self.assertEqual([d.id for d in response.context['demandas']], [self.receita.id])
+        self.assertNotIn('X-Proximo-Cursor', response)
+        
+        # Cursor de outra listagem (sem busca) não vale para a busca
+        sem_busca = codificar_cursor(self.receita)
+        response = self.client.get(reverse('home_mais'), {'search': 'federal', 'cursor': sem_busca})
+        self.assertEqual(response.status_code, 400)
+        
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        changelist = reverse('admin:concursos_demanda_changelist')
+        response = self.client.get(changelist, {'q': 'federal'})
+        self.assertEqual([d.id for d in response.context['cl'].result_list], [self.trf.id, self.receita.id])
+        
+        # Ordenação escolhida numa coluna (concurso, crescente) prevalece
+        coluna = DemandaAdmin.list_display.index('concurso_formatado')
+        response = self.client.get(changelist, {'q': 'federal', 'o': str(coluna + 1)})
+        self.assertEqual([d.id for d in response.context['cl'].result_list], [self.receita.id, self.trf.id])
+
+
+@override_settings(HOME_PAGE_SIZE=2)
+class PaginacaoHomeTests(TestCase):
+    """
+    Testes da paginação por chave da home e do fragmento /concursos/mais/.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.demandas = [
+            criar_demanda(concurso=f'Concurso {i}', numero_edital=f'{i:02d}/2025') for i in range(7)
+        ]
+        # Empates em criado_em: o id desempata
+        instante = timezone.now()
+        Demanda.objects.filter(id__in=[d.id for d in self.demandas[1:5]]).update(criado_em=instante)
+    
+    def _mais(self, cursor=None):
+        parametros = {'cursor': cursor} if cursor is not None else {}
+        return self.client.get(reverse('home_mais'), parametros)
+    
+    def test_paginas_sem_repetir_nem_pular_com_empates(self):
+        response = self.client.get(reverse('home'))
+        ids = [d.id for d in response.context['demandas']]
+        cursor = response.context['proximo_cursor']
+        paginas = 1
+        while cursor:
+            response = self._mais(cursor)
+            self.assertEqual(response.status_code, 200)
+            ids += [d.id for d in response.context['demandas']]
+            cursor = response.get('X-Proximo-Cursor')
+            paginas += 1
+        
+        esperado = list(Demanda.objects.order_by('-criado_em', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+        self.assertEqual(paginas, 4)
+    
+    def test_ultima_pagina_e_pedido_sem_cursor(self):
+        # Sem cursor: primeira página
+        response = self._mais()
+        self.assertEqual(len(response.context['demandas']), 2)
+        self.assertIn('X-Proximo-Cursor', response)
+        
+        ultima = Demanda.objects.order_by('criado_em', 'id')[:2]
+        cursor = codificar_cursor(list(ultima)[1])
+        response = self._mais(cursor)
+        self.assertEqual([d.id for d in response.context['demandas']], [ultima[0].id])
+        self.assertNotIn('X-Proximo-Cursor', response)
+        
+        # Página repetida vem do cache com o mesmo cabeçalho
+        self.assertEqual(self._mais(cursor)['X-Cache'], 'HIT')
+        self.assertNotIn('X-Proximo-Cursor', self._mais(cursor))
+    
+    def test_cursor_malformado(self):
+        for cursor in ('invalido', 'MjAyNS0wMS0wMQ', codificar_cursor(self.demandas[0])[:-3] + '!!!'):
+            self.assertEqual(self._mais(cursor).status_code, 400, cursor)
+        with self.assertRaises(CursorInvalido):
+            decodificar_cursor('bm9wZXxhYmM')
@@ -1,10 +1,15 @@
 from rest_framework import viewsets
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+from .condicional import RespostaCondicionalMixin
+from .filters import BuscaDemandaFilter
+from .paginacao import PaginacaoApi
 from .models import Demanda
 from .serializers import DemandaSerializer
 
 
-class DemandaViewSet(viewsets.ModelViewSet):
+class DemandaViewSet(RespostaCondicionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD completo de Demandas.
     
@@ -14,10 +19,15 @@ class DemandaViewSet(viewsets.ModelViewSet):
     PUT /api/demandas/{id}/ - Atualiza demanda
     PATCH /api/demandas/{id}/ - Atualização parcial
     DELETE /api/demandas/{id}/ - Remove demanda
+    
+    O parâmetro ?search= usa o índice de busca e ordena por relevância.
+    Listagem e detalhe respondem 304 a GETs condicionais (ETag/Last-Modified).
     """
     queryset = Demanda.objects.all()
     serializer_class = DemandaSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacaoApi
+    filter_backends = [DjangoFilterBackend, BuscaDemandaFilter, OrderingFilter]
     filterset_fields = ['status', 'banca', 'cargo']
     search_fields = ['concurso', 'numero_edital', 'cargo', 'autarquia']
     ordering_fields = ['criado_em', 'data_concurso', 'concurso']
@@ -1,60 +1,119 @@
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.conf import settings
 from django.db.models import Q, Count
+from apps.concursos.busca import buscar, filtrar
 from apps.concursos.models import Demanda
+from apps.concursos.cache import normalizar_filtros, chave_home, obter_home, guardar_home
+from apps.concursos.paginacao import paginar_por_chave, CursorInvalido
 from apps.tickets.models import Ticket
 
 
-def home_view(request):
+def _demandas_disponiveis(search, banca, cargo):
     """
-    View pública para listagem de concursos disponíveis para envio de provas.
-    Mostra concursos abertos ou em análise que ainda não têm prova aprovada.
+    Concursos abertos OU em análise (aguardando mais provas), sem prova
+    aprovada, com os filtros da home aplicados.
+    O total na fila vem do contador desnormalizado.
+    Com texto de busca, o resultado vem anotado com a relevância e a
+    paginação (paginar_por_chave) ordena por ela.
     """
-    # Filtros
-    search = request.GET.get('search', '')
-    banca = request.GET.get('banca', '')
-    cargo = request.GET.get('cargo', '')
+    demandas = Demanda.objects.filter(
+        status__in=['aberto', 'em_analise'],
+        total_aprovadas=0
+    )
     
-    # Query base - concursos abertos OU em análise (aguardando mais provas)
-    demandas = Demanda.objects.filter(status__in=['aberto', 'em_analise'])
-    
-    # Filtrar concursos que NÃO têm prova aprovada ou paga
-    demandas_list = []
-    for d in demandas:
-        if not d.tem_prova_aprovada:
-            # Adicionar informações de fila - contar todos os tickets ativos (fila + em análise)
-            d.total_na_fila = d.tickets.filter(status__in=['na_fila', 'notificado', 'aguardando', 'em_analise']).count()
-            demandas_list.append(d)
+    # Aplicar filtros de busca (índice de termos, ver apps/concursos/busca.py)
+    if banca:
+        demandas = demandas.filter(banca=banca)
     
-    demandas = demandas_list
+    # O cargo é um filtro; a ordem por relevância vem do campo de busca
+    if cargo:
+        demandas = filtrar(cargo, demandas, campos=['cargo'])
     
-    # Aplicar filtros de busca
     if search:
-        demandas = [d for d in demandas if (
-            search.lower() in d.concurso.lower() or
-            search.lower() in d.numero_edital.lower() or
-            search.lower() in d.autarquia.lower()
-        )]
+        demandas = buscar(search, demandas, campos=['concurso', 'numero_edital', 'autarquia'])
     
-    if banca:
-        demandas = [d for d in demandas if d.banca == banca]
+    return demandas
+
+
+def home_view(request):
+    """
+    View pública para listagem de concursos disponíveis para envio de provas.
+    Mostra concursos abertos ou em análise que ainda não têm prova aprovada.
+    Renderiza só a primeira página; as seguintes vêm de home_mais_view.
+    A página renderizada fica em cache por combinação de filtros.
+    """
+    # Filtros
+    search, banca, cargo = normalizar_filtros(request.GET)
     
-    if cargo:
-        demandas = [d for d in demandas if cargo.lower() in d.cargo.lower()]
+    chave = chave_home((search, banca, cargo))
+    conteudo = obter_home(chave)
+    if conteudo is not None:
+        response = HttpResponse(conteudo)
+        response['X-Cache'] = 'HIT'
+        return response
+    
+    filtradas = _demandas_disponiveis(search, banca, cargo)
+    demandas, proximo_cursor = paginar_por_chave(filtradas, tamanho=settings.HOME_PAGE_SIZE)
     
     # Lista de bancas para o filtro
-    bancas = Demanda.objects.filter(status__in=['aberto', 'em_analise']).values_list('banca', flat=True).distinct()
+    bancas = Demanda.objects.filter(status__in=['aberto', 'em_analise']).order_by('banca').values_list('banca', flat=True).distinct()
     
     # Estatísticas
-    total_concursos = len(demandas)
-    total_envios = Ticket.objects.count()
-    envios_em_analise = Ticket.objects.filter(status='em_analise').count()
+    total_concursos = len(demandas) if proximo_cursor is None else filtradas.count()
+    estatisticas = Ticket.objects.aggregate(
+        total_envios=Count('id'),
+        envios_em_analise=Count('id', filter=Q(status='em_analise'))
+    )
     
     context = {
         'demandas': demandas,
+        'proximo_cursor': proximo_cursor,
         'bancas': sorted(bancas),
         'total_concursos': total_concursos,
-        'total_envios': total_envios,
-        'envios_em_analise': envios_em_analise,
+        'total_envios': estatisticas['total_envios'],
+        'envios_em_analise': estatisticas['envios_em_analise'],
+        'search': search,
+        'banca_selecionada': banca,
+        'cargo': cargo,
     }
     
-    return render(request, 'public/home.html', context)
+    response = render(request, 'public/home.html', context)
+    guardar_home(chave, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def home_mais_view(request):
+    """
+    Fragmento HTML com a próxima página de concursos da home.
+    
+    GET /concursos/mais/?cursor=...&search=...&banca=...&cargo=...
+    O cursor da página seguinte vai no header X-Proximo-Cursor (ausente na última).
+    """
+    search, banca, cargo = normalizar_filtros(request.GET)
+    cursor = request.GET.get('cursor', '')
+    
+    chave = chave_home((search, banca, cargo), pagina=cursor)
+    conteudo = obter_home(chave)
+    if conteudo is not None:
+        proximo_cursor, html = conteudo
+        response = HttpResponse(html)
+        response['X-Cache'] = 'HIT'
+    else:
+        try:
+            demandas, proximo_cursor = paginar_por_chave(
+                _demandas_disponiveis(search, banca, cargo),
+                cursor=cursor,
+                tamanho=settings.HOME_PAGE_SIZE
+            )
+        except CursorInvalido:
+            return HttpResponseBadRequest('Cursor inválido')
+        
+        response = render(request, 'public/concursos_lista.html', {'demandas': demandas})
+        guardar_home(chave, (proximo_cursor, response.content))
+        response['X-Cache'] = 'MISS'
+    
+    if proximo_cursor:
+        response['X-Proximo-Cursor'] = proximo_cursor
+    return response
@@ -1,13 +1,22 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.html import format_html
 from django.db.models import Count
 from django.utils import timezone
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.shortcuts import render, redirect
-from django.urls import path
-from .models import Ticket
-from .notifications import notificar_proximo_da_fila, enviar_email_recusa, gerar_link_whatsapp_recusa
+from django.urls import path, reverse
+from .models import Ticket, Notificacao
+from .notifications import notificar_proximo_da_fila, enfileirar_mensagens
+from .mensagens import renderizar, renderizar_ticket
 from .forms import RecusarProvaForm
-import urllib.parse
+from .relatorios import relatorio_mensal
+from .exportacao import resposta_exportacao
+from .miniaturas import caminho_miniatura
+from . import transicoes
+from collections import Counter
+from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,30 +27,7 @@ def enviar_notificacao_encerramento(ticket):
     Gera link do WhatsApp para notificar participante sobre encerramento da demanda.
     Retorna URL que pode ser aberta para enviar mensagem via WhatsApp Web.
     """
-    mensagem = f"""🎯 *COMCURSANDO - Atualização*
-
-Olá, {ticket.cliente_nome.split()[0]}!
-
-Informamos que a demanda do concurso *{ticket.demanda.concurso}* (Edital: {ticket.demanda.numero_edital}) foi encerrada.
-
-📋 *Seu código de envio:* {ticket.codigo_ticket}
-
-✅ Outra prova foi aprovada e selecionada para esta demanda.
-
-Agradecemos muito pela sua disposição em colaborar! 
-Em uma próxima oportunidade será a sua vez. 🚀
-
-Obrigado pela compreensão!
-
----
-Continue acompanhando nossos concursos disponíveis em:
-https://comcursando.com.br"""
-    
-    mensagem_encoded = urllib.parse.quote(mensagem)
-    numero_limpo = ticket.cliente_whatsapp.replace('+', '').replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-    whatsapp_url = f"https://wa.me/{numero_limpo}?text={mensagem_encoded}"
-    
-    return whatsapp_url
+    return renderizar_ticket(ticket, 'encerramento').whatsapp_link
 
 
 @admin.register(Ticket)
@@ -50,13 +36,13 @@ class TicketAdmin(admin.ModelAdmin):
     Configuração do admin para Envios de Prova.
     """
     list_display = ['codigo_ticket_formatado', 'cliente_nome', 'whatsapp_link', 'concurso_info', 'pix_info', 'status_badge', 'arquivo_preview', 'valor_info', 'criado_em']
-    list_filter = ['status', 'demanda__banca', 'criado_em', 'analisado_em', 'pago_em']
+    list_filter = ['status', 'demanda__banca', ('arquivo_duplicado_de', admin.EmptyFieldListFilter), ('arquivo_semelhante_a', admin.EmptyFieldListFilter), 'criado_em', 'analisado_em', 'pago_em']
     search_fields = ['codigo_ticket', 'cliente_nome', 'cliente_whatsapp', 'cliente_pix', 'demanda__concurso', 'demanda__numero_edital']
     ordering = ['-criado_em']
     date_hierarchy = 'criado_em'
-    readonly_fields = ['codigo_ticket', 'criado_em', 'atualizado_em', 'analisado_em', 'pago_em']
+    readonly_fields = ['codigo_ticket', 'previa_arquivo', 'arquivo_duplicado_de', 'arquivo_sha256', 'arquivo_semelhante_a', 'arquivo_distancia', 'criado_em', 'atualizado_em', 'analisado_em', 'pago_em']
     list_per_page = 25
-    actions = ['aprovar_prova', 'recusar_prova', 'marcar_como_pago', 'excluir_tickets']
+    actions = ['aprovar_prova', 'recusar_prova', 'marcar_como_pago', 'exportar_csv', 'exportar_ndjson', 'excluir_tickets']
     
     fieldsets = (
         ('📄 Informações do Envio', {
@@ -64,7 +50,7 @@ class TicketAdmin(admin.ModelAdmin):
             'description': 'Dados do cliente e do envio'
         }),
         ('📎 Arquivo da Prova', {
-            'fields': ('arquivo_prova',)
+            'fields': ('arquivo_prova', 'previa_arquivo', 'arquivo_duplicado_de', 'arquivo_sha256', 'arquivo_semelhante_a', 'arquivo_distancia')
         }),
         ('📊 Análise e Pagamento', {
             'fields': ('status', 'observacoes_admin', 'valor_pago')
@@ -75,6 +61,10 @@ class TicketAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Carrega a demanda e os envios de arquivos duplicados/semelhantes junto (colunas da lista e __str__)."""
+        return super().get_queryset(request).select_related('demanda', 'arquivo_duplicado_de', 'arquivo_semelhante_a')
+    
     def codigo_ticket_formatado(self, obj):
         """Exibe o código do envio em destaque."""
         return format_html(
@@ -118,15 +108,53 @@ class TicketAdmin(admin.ModelAdmin):
     pix_info.short_description = 'Chave PIX'
     
     def arquivo_preview(self, obj):
-        """Exibe preview/link do arquivo."""
+        """Exibe miniatura/link do arquivo e avisa se é idêntico ou quase idêntico ao de outro envio."""
         if obj.arquivo_prova and hasattr(obj.arquivo_prova, 'url'):
-            return format_html(
-                '<a href="{}" target="_blank" style="background: #007bff; color: white; padding: 4px 12px; border-radius: 4px; text-decoration: none; font-size: 11px;">📄 Ver Prova</a>',
-                obj.arquivo_prova.url
-            )
+            if obj.miniatura_status == 'pronta':
+                # Miniatura gerada fora do request (gerar_miniaturas): a lista só monta a URL
+                link = format_html(
+                    '<a href="{}" target="_blank" title="Ver prova"><img src="{}" alt="Prova {}" loading="lazy" style="max-width: 80px; max-height: 80px; border: 1px solid #dee2e6; border-radius: 4px;"></a>',
+                    obj.arquivo_prova.url,
+                    default_storage.url(caminho_miniatura(obj.arquivo_sha256, '160')),
+                    obj.codigo_ticket
+                )
+            else:
+                link = format_html(
+                    '<a href="{}" target="_blank" style="background: #007bff; color: white; padding: 4px 12px; border-radius: 4px; text-decoration: none; font-size: 11px;">📄 Ver Prova</a>',
+                    obj.arquivo_prova.url
+                )
+            if obj.arquivo_duplicado_de:
+                link += format_html(
+                    '<br><a href="{}" title="Arquivo idêntico ao do envio {}" style="display: inline-block; margin-top: 4px; background: #dc3545; color: white; padding: 2px 8px; border-radius: 10px; text-decoration: none; font-size: 10px; font-weight: bold;">⚠ DUPLICADO de {}</a>',
+                    reverse('admin:tickets_ticket_change', args=[obj.arquivo_duplicado_de_id]),
+                    obj.arquivo_duplicado_de.codigo_ticket,
+                    obj.arquivo_duplicado_de.codigo_ticket
+                )
+            elif obj.arquivo_semelhante_a:
+                link += format_html(
+                    '<br><a href="{}" title="Imagem quase idêntica à do envio {} ({} de 64 bits diferentes)" style="display: inline-block; margin-top: 4px; background: #fd7e14; color: white; padding: 2px 8px; border-radius: 10px; text-decoration: none; font-size: 10px; font-weight: bold;">≈ SEMELHANTE a {}</a>',
+                    reverse('admin:tickets_ticket_change', args=[obj.arquivo_semelhante_a_id]),
+                    obj.arquivo_semelhante_a.codigo_ticket,
+                    obj.arquivo_distancia,
+                    obj.arquivo_semelhante_a.codigo_ticket
+                )
+            return link
         return format_html('<span style="color: #dc3545;">Sem arquivo</span>')
     arquivo_preview.short_description = 'Arquivo'
     
+    def previa_arquivo(self, obj):
+        """Exibe a prévia de 800px da primeira página na edição do envio."""
+        if obj.miniatura_status == 'pronta':
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" alt="Prévia da prova" style="max-width: 100%; border: 1px solid #dee2e6; border-radius: 4px;"></a>',
+                obj.arquivo_prova.url,
+                default_storage.url(caminho_miniatura(obj.arquivo_sha256, '800'))
+            )
+        if obj.miniatura_status == 'pendente' and obj.arquivo_prova:
+            return format_html('<span style="color: #6c757d;">Prévia ainda não gerada</span>')
+        return format_html('<span style="color: #6c757d;">-</span>')
+    previa_arquivo.short_description = 'Prévia'
+    
     def valor_info(self, obj):
         """Exibe informações de valor."""
         if obj.valor_pago:
@@ -162,13 +190,7 @@ class TicketAdmin(admin.ModelAdmin):
     # Actions personalizadas
     def aprovar_prova(self, request, queryset):
         """Aprova provas selecionadas."""
-        count = 0
-        for ticket in queryset:
-            if ticket.status in ['aguardando', 'em_analise']:
-                ticket.status = 'aprovado'
-                ticket.analisado_em = timezone.now()
-                ticket.save()
-                count += 1
+        count = transicoes.aprovar(queryset)
         self.message_user(request, f'{count} prova(s) aprovada(s). Agora marque como PAGO após enviar o PIX.')
     aprovar_prova.short_description = '✓ Aprovar Prova'
     
@@ -188,6 +210,7 @@ class TicketAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('recusar-prova/', self.admin_site.admin_view(self.recusar_prova_view), name='recusar_prova_form'),
+            path('relatorios/', self.admin_site.admin_view(self.relatorios_view), name='tickets_relatorios'),
         ]
         return custom_urls + urls
     
@@ -199,7 +222,7 @@ class TicketAdmin(admin.ModelAdmin):
             self.message_user(request, 'Nenhum ticket selecionado.', level='error')
             return redirect('admin:tickets_ticket_changelist')
         
-        tickets = Ticket.objects.filter(id__in=ticket_ids, status__in=['aguardando', 'em_analise'])
+        tickets = Ticket.objects.filter(id__in=ticket_ids, status__in=['aguardando', 'em_analise']).select_related('demanda')
         
         if request.method == 'POST':
             form = RecusarProvaForm(request.POST)
@@ -209,41 +232,42 @@ class TicketAdmin(admin.ModelAdmin):
                 notificados = []
                 links_whatsapp = []
                 
-                for ticket in tickets:
-                    # Atualizar ticket
-                    ticket.status = 'recusado'
-                    ticket.analisado_em = timezone.now()
-                    ticket.observacoes_admin = f"Recusado: {motivo}"
-                    ticket.save()
-                    
-                    # Retornar demanda para aberto
-                    ticket.demanda.status = 'aberto'
-                    ticket.demanda.save()
-                    count += 1
-                    
-                    # Enviar notificação de recusa
-                    try:
-                        enviar_email_recusa(ticket, motivo)
-                        if ticket.cliente_whatsapp:
-                            whatsapp_link = gerar_link_whatsapp_recusa(ticket, motivo)
-                            links_whatsapp.append({
-                                'nome': ticket.cliente_nome,
-                                'codigo': ticket.codigo_ticket,
-                                'link': whatsapp_link
-                            })
-                    except Exception as e:
-                        logger.error(f"Erro ao enviar notificação de recusa: {str(e)}")
-                    
-                    # Notificar próximo da fila
-                    try:
-                        proximo = notificar_proximo_da_fila(ticket.demanda)
-                        if proximo:
-                            notificados.append({
-                                'nome': proximo.cliente_nome,
-                                'codigo': proximo.codigo_ticket
-                            })
-                    except Exception as e:
-                        logger.error(f"Erro ao notificar próximo da fila: {str(e)}")
+                # Mensagens de recusa de todos os tickets renderizadas em uma passada
+                mensagens = renderizar(tickets, 'recusa', motivo=motivo)
+                
+                # Recusar tickets, reabrir demandas e enfileirar emails juntos
+                with transaction.atomic():
+                    recusados = transicoes.recusar(tickets, motivo)
+                    recusados_ids = {ticket_id for ticket_id, _, _ in recusados}
+                    mensagens = [m for m in mensagens if m.ticket.id in recusados_ids]
+                    enfileirar_mensagens(mensagens, 'recusa')
+                count = len(mensagens)
+                
+                # Links de WhatsApp da recusa
+                for mensagem in mensagens:
+                    ticket = mensagem.ticket
+                    if ticket.cliente_whatsapp:
+                        links_whatsapp.append({
+                            'nome': ticket.cliente_nome,
+                            'codigo': ticket.codigo_ticket,
+                            'link': mensagem.whatsapp_link
+                        })
+                
+                # Notificar próximo da fila (um por prova recusada)
+                demandas = {m.ticket.demanda_id: m.ticket.demanda for m in mensagens}
+                for demanda_id, quantidade in Counter(demanda_id for _, demanda_id, _ in recusados).items():
+                    for _ in range(quantidade):
+                        try:
+                            proximo = notificar_proximo_da_fila(demandas[demanda_id])
+                        except Exception as e:
+                            logger.error(f"Erro ao notificar próximo da fila: {str(e)}")
+                            break
+                        if not proximo:
+                            break
+                        notificados.append({
+                            'nome': proximo.cliente_nome,
+                            'codigo': proximo.codigo_ticket
+                        })
                 
                 # Limpar sessão
                 del request.session['tickets_to_refuse']
@@ -274,53 +298,52 @@ class TicketAdmin(admin.ModelAdmin):
             'title': 'Recusar Provas',
         }
         return render(request, 'admin/tickets/recusar_prova_form.html', context)
-
+    
+    
+    def relatorios_view(self, request):
+        """Relatório mensal de envios e pagamentos, lido dos resumos diários."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        
+        hoje = timezone.localdate()
+        try:
+            ano, mes = (int(parte) for parte in request.GET.get('mes', '').split('-'))
+            relatorio = relatorio_mensal(ano, mes)
+        except ValueError:
+            ano, mes = hoje.year, hoje.month
+            relatorio = relatorio_mensal(ano, mes)
+        
+        anterior = relatorio['inicio'] - timedelta(days=1)
+        proximo = relatorio['fim'] + timedelta(days=1)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            **relatorio,
+            'opts': self.model._meta,
+            'title': 'Relatórios',
+            'mes_anterior': f'{anterior:%Y-%m}',
+            'mes_proximo': f'{proximo:%Y-%m}' if proximo <= hoje else None,
+        }
+        return render(request, 'admin/tickets/relatorios.html', context)
     
     def marcar_como_pago(self, request, queryset):
         """
         Marca provas aprovadas como pagas e notifica outros participantes.
         Envia mensagem via WhatsApp para todos os outros que tiveram provas recusadas/aguardando.
         """
-        count = 0
         notificacoes = []
         
-        for ticket in queryset:
-            if ticket.status == 'aprovado':
-                # Buscar outros tickets da mesma demanda que NÃO foram aprovados
-                outros_tickets = Ticket.objects.filter(
-                    demanda=ticket.demanda,
-                    status__in=['aguardando', 'em_analise', 'recusado']
-                ).exclude(id=ticket.id)
-                
-                # Marcar ticket como pago
-                ticket.status = 'pago'
-                ticket.pago_em = timezone.now()
-                if not ticket.valor_pago:
-                    ticket.valor_pago = ticket.demanda.valor_recompensa
-                
-                # Marcar demanda como concluída
-                ticket.demanda.status = 'concluido'
-                ticket.demanda.save()
-                ticket.save()
-                
-                # Recusar automaticamente os outros tickets e gerar links de notificação
-                for outro_ticket in outros_tickets:
-                    if outro_ticket.status != 'recusado':
-                        outro_ticket.status = 'recusado'
-                        outro_ticket.analisado_em = timezone.now()
-                        outro_ticket.observacoes_admin = 'Demanda encerrada - outra prova foi selecionada'
-                        outro_ticket.save()
-                    
-                    # Gerar link de notificação
-                    if outro_ticket.cliente_whatsapp:
-                        whatsapp_link = enviar_notificacao_encerramento(outro_ticket)
-                        notificacoes.append({
-                            'nome': outro_ticket.cliente_nome,
-                            'codigo': outro_ticket.codigo_ticket,
-                            'link': whatsapp_link
-                        })
-                
-                count += 1
+        pagos, outros_tickets = transicoes.marcar_pagos(queryset)
+        count = len(pagos)
+        
+        # Gerar links de notificação de todos em uma passada
+        com_whatsapp = [t for t in outros_tickets if t.cliente_whatsapp]
+        for mensagem in renderizar(com_whatsapp, 'encerramento'):
+            notificacoes.append({
+                'nome': mensagem.ticket.cliente_nome,
+                'codigo': mensagem.ticket.codigo_ticket,
+                'link': mensagem.whatsapp_link
+            })
         
         # Mensagem de sucesso com links de WhatsApp
         if notificacoes:
@@ -338,6 +361,21 @@ class TicketAdmin(admin.ModelAdmin):
     
     marcar_como_pago.short_description = '💰 Marcar como Pago e Notificar'
     
+    def exportar_csv(self, request, queryset):
+        """
+        Baixa os tickets selecionados em CSV (chaves PIX, valores, datas).
+        Com "selecionar todos", exporta tudo o que os filtros da lista mostram.
+        """
+        return resposta_exportacao(queryset, 'csv')
+    
+    exportar_csv.short_description = '📥 Exportar CSV'
+    
+    def exportar_ndjson(self, request, queryset):
+        """Baixa os tickets selecionados em NDJSON (um objeto JSON por linha)."""
+        return resposta_exportacao(queryset, 'ndjson')
+    
+    exportar_ndjson.short_description = '📥 Exportar NDJSON'
+    
     def excluir_tickets(self, request, queryset):
         """
         Exclui tickets selecionados (útil para remover testes ou entradas inválidas).
@@ -365,3 +403,47 @@ class TicketAdmin(admin.ModelAdmin):
         messages.success(request, mark_safe(msg))
     
     excluir_tickets.short_description = '🗑️ Excluir Tickets Selecionados'
+
+
+
+@admin.register(Notificacao)
+class NotificacaoAdmin(admin.ModelAdmin):
+    """
+    Caixa de saída de e-mails. Permite acompanhar envios e reprocessar falhas.
+    """
+    list_display = ['tipo', 'destinatario', 'ticket', 'status_badge', 'tentativas', 'proxima_tentativa_em', 'criado_em', 'enviado_em']
+    list_filter = ['status', 'tipo', 'criado_em']
+    search_fields = ['destinatario', 'ticket__codigo_ticket']
+    list_select_related = ['ticket__demanda']
+    ordering = ['-criado_em']
+    readonly_fields = ['ticket', 'tipo', 'destinatario', 'assunto', 'mensagem', 'status', 'tentativas', 'proxima_tentativa_em', 'ultimo_erro', 'criado_em', 'enviado_em']
+    list_per_page = 50
+    actions = ['reprocessar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def status_badge(self, obj):
+        """Exibe badge colorido do status."""
+        cores = {
+            'pendente': '#ffc107',
+            'enviado': '#28a745',
+            'falhou': '#dc3545'
+        }
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 4px 12px; border-radius: 12px; font-size: 11px; font-weight: bold; text-transform: uppercase;">{}</span>',
+            cores.get(obj.status, '#6c757d'), obj.get_status_display()
+        )
+    status_badge.short_description = 'Status'
+    status_badge.admin_order_field = 'status'
+    
+    def reprocessar(self, request, queryset):
+        """Volta notificações com falha para a fila de envio."""
+        count = queryset.exclude(status='enviado').update(
+            status='pendente',
+            tentativas=0,
+            proxima_tentativa_em=timezone.now(),
+            ultimo_erro=''
+        )
+        self.message_user(request, f'{count} notificação(ões) reenfileirada(s).')
+    reprocessar.short_description = '↻ Reprocessar Envio'
@@ -0,0 +1,156 @@
+"""
+Exportação de tickets em CSV ou NDJSON para pagamento e financeiro.
+
+A resposta é um StreamingHttpResponse: as linhas são geradas à medida que
+o cliente lê, em lotes por chave (id > último id do lote anterior). Cada
+lote é uma consulta curta com select_related('demanda'), então a memória
+fica constante mesmo em exportações de centenas de milhares de linhas, e
+o primeiro byte sai logo após o primeiro lote. Os lotes são usados em vez
+de um único .iterator() porque o driver do MySQL carrega o resultado
+inteiro na memória do cliente.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import Ticket
+
+TAMANHO_LOTE = 2000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# (coluna, valor a partir do ticket)
+COLUNAS = [
+    ('codigo_ticket', lambda t: t.codigo_ticket),
+    ('status', lambda t: t.status),
+    ('cliente_nome', lambda t: t.cliente_nome),
+    ('cliente_whatsapp', lambda t: t.cliente_whatsapp),
+    ('cliente_pix', lambda t: t.cliente_pix),
+    ('concurso', lambda t: t.demanda.concurso),
+    ('numero_edital', lambda t: t.demanda.numero_edital),
+    ('banca', lambda t: t.demanda.banca),
+    ('cargo', lambda t: t.demanda.cargo),
+    ('valor_pago', lambda t: t.valor_pago),
+    ('criado_em', lambda t: t.criado_em),
+    ('analisado_em', lambda t: t.analisado_em),
+    ('pago_em', lambda t: t.pago_em),
+]
+
+CAMPOS_CARREGADOS = [
+    'id', 'codigo_ticket', 'status', 'cliente_nome', 'cliente_whatsapp', 'cliente_pix',
+    'valor_pago', 'criado_em', 'analisado_em', 'pago_em', 'demanda__concurso',
+    'demanda__numero_edital', 'demanda__banca', 'demanda__cargo',
+]
+
+# Texto digitado pelo participante que o Excel interpretaria como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de filtro da exportação inválido."""
+
+
+def filtrar_tickets(queryset, status=None, banca=None, de=None, ate=None):
+    """
+    Aplica os filtros da exportação.
+    
+    Args:
+        status: status separados por vírgula (ex.: 'aprovado,pago')
+        banca: banca exata da demanda
+        de, ate: datas AAAA-MM-DD (inclusivas) sobre criado_em
+    
+    Raises:
+        FiltroInvalido: status desconhecido ou data mal formada
+    """
+    if status:
+        validos = {valor for valor, _ in Ticket.STATUS_CHOICES}
+        pedidos = [parte.strip() for parte in status.split(',') if parte.strip()]
+        desconhecidos = [parte for parte in pedidos if parte not in validos]
+        if desconhecidos:
+            raise FiltroInvalido(f"Status inválido: {', '.join(desconhecidos)}")
+        queryset = queryset.filter(status__in=pedidos)
+    
+    if banca:
+        queryset = queryset.filter(demanda__banca=banca)
+    
+    if de:
+        queryset = queryset.filter(criado_em__gte=_inicio_do_dia(de, 'de'))
+    if ate:
+        queryset = queryset.filter(criado_em__lt=_inicio_do_dia(ate, 'ate') + timedelta(days=1))
+    return queryset
+
+
+def _inicio_do_dia(valor, nome):
+    try:
+        dia = parse_date(valor)
+    except ValueError:
+        dia = None
+    if dia is None:
+        raise FiltroInvalido(f"Data inválida em '{nome}': use AAAA-MM-DD")
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def iterar_em_lotes(queryset, tamanho=None):
+    """
+    Percorre o queryset em ordem de id, um lote por consulta.
+    """
+    tamanho = tamanho or TAMANHO_LOTE
+    # select_related(None): o queryset do admin já traz outros JOINs
+    queryset = queryset.select_related(None).select_related('demanda').only(*CAMPOS_CARREGADOS).order_by('id')
+    ultimo_id = 0
+    while True:
+        lote = list(queryset.filter(id__gt=ultimo_id)[:tamanho])
+        yield from lote
+        if len(lote) < tamanho:
+            return
+        ultimo_id = lote[-1].id
+
+
+def _celula_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S')
+    valor = str(valor)
+    if valor.startswith(_INICIO_FORMULA) and not valor[1:].replace(' ', '').isdigit():
+        # Telefones e chaves PIX como +5511... seguem intactos
+        return "'" + valor
+    return valor
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardar."""
+    
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv(queryset):
+    escritor = csv.writer(_Eco())
+    # BOM para o Excel abrir acentos corretamente
+    yield '\ufeff' + escritor.writerow([coluna for coluna, _ in COLUNAS])
+    for ticket in iterar_em_lotes(queryset):
+        yield escritor.writerow([_celula_csv(valor(ticket)) for _, valor in COLUNAS])
+
+
+def linhas_ndjson(queryset):
+    for ticket in iterar_em_lotes(queryset):
+        registro = {coluna: valor(ticket) for coluna, valor in COLUNAS}
+        yield json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def resposta_exportacao(queryset, formato='csv'):
+    """
+    StreamingHttpResponse com os tickets do queryset no formato pedido.
+    """
+    linhas = linhas_csv(queryset) if formato == 'csv' else linhas_ndjson(queryset)
+    response = StreamingHttpResponse(linhas, content_type=FORMATOS[formato])
+    nome = f"tickets_{timezone.localtime():%Y%m%d_%H%M}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
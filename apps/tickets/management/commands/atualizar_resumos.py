@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apps.tickets.relatorios import atualizar_resumos
+
+
+class Command(BaseCommand):
+    """
+    Atualiza os rollups diários de envios e pagamentos usados pelos relatórios.
+    Processa só os tickets alterados desde a última execução.
+    
+    Uso:
+        python manage.py atualizar_resumos              # incremental (cron)
+        python manage.py atualizar_resumos --completo   # reconstrói tudo
+    """
+    help = 'Atualiza os resumos diários de envios e pagamentos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Reconstrói os resumos do zero')
+    
+    def handle(self, *args, **options):
+        resultado = atualizar_resumos(completo=options['completo'])
+        modo = 'reconstrução completa' if resultado['completo'] else 'incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumos atualizados ({modo}): {resultado['linhas']} linha(s) gravada(s)."
+        ))
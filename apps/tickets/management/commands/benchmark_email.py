@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.core.management.base import BaseCommand
+from apps.tickets.outbox import enviar_lote
+import tempfile
+import time
+
+BACKENDS = {
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    """
+    Compara o envio de e-mails um a um (uma conexão por mensagem, como o
+    send_mail fazia) com o envio em lote por uma única conexão (enviar_lote).
+    
+    Uso: python manage.py benchmark_email [--quantidade 1000] [--backend locmem|file|configurado]
+    
+    Com --backend configurado usa settings.EMAIL_BACKEND (ex.: SMTP real).
+    """
+    help = 'Mede mensagens por segundo do envio individual vs. em lote'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=1000, help='Mensagens por rodada')
+        parser.add_argument('--backend', choices=[*BACKENDS, 'configurado'], default='locmem')
+        parser.add_argument('--destinatario', default='benchmark@example.com')
+    
+    def handle(self, *args, **options):
+        quantidade = options['quantidade']
+        backend = settings.EMAIL_BACKEND if options['backend'] == 'configurado' else BACKENDS[options['backend']]
+        
+        with tempfile.TemporaryDirectory() as pasta:
+            def mensagem(i):
+                return (f'Benchmark {i}', 'Mensagem de teste do benchmark.', settings.DEFAULT_FROM_EMAIL, [options['destinatario']])
+            
+            inicio = time.perf_counter()
+            for i in range(quantidade):
+                send_mail(*mensagem(i), connection=get_connection(backend, file_path=pasta))
+            individual = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            erros = enviar_lote([EmailMessage(*mensagem(i)) for i in range(quantidade)], backend=backend, file_path=pasta)
+            lote = time.perf_counter() - inicio
+        
+        falhas = sum(1 for erro in erros if erro is not None)
+        self.stdout.write(f'Backend: {backend} | Mensagens: {quantidade}')
+        self.stdout.write(f'Individual (1 conexão/mensagem): {quantidade / individual:,.0f} msg/s ({individual:.3f}s)')
+        self.stdout.write(f'Lote (1 conexão):                {quantidade / lote:,.0f} msg/s ({lote:.3f}s)')
+        if falhas:
+            self.stdout.write(self.style.WARNING(f'{falhas} mensagem(ns) falharam no envio em lote'))
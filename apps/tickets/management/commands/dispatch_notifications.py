@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.tickets.outbox import despachar_pendentes
+import time
+
+
+class Command(BaseCommand):
+    """
+    Envia os e-mails pendentes da caixa de saída (Notificacao).
+    
+    Uso:
+        python manage.py dispatch_notifications            # um lote e sai (cron)
+        python manage.py dispatch_notifications --loop     # roda continuamente (daemon)
+    """
+    help = 'Despacha as notificações pendentes da caixa de saída'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Roda continuamente')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre lotes vazios no modo --loop')
+        parser.add_argument('--lote', type=int, default=50, help='Notificações por lote')
+    
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            resultado = despachar_pendentes(limite=options['lote'])
+            processadas = sum(resultado.values())
+            
+            if processadas:
+                self.stdout.write(
+                    f"Enviadas: {resultado['enviadas']} | Reagendadas: {resultado['reagendadas']} | "
+                    f"Falharam: {resultado['falharam']}"
+                )
+            
+            if not options['loop']:
+                break
+            
+            # Lote cheio: provavelmente há mais pendentes, segue sem esperar
+            if processadas < options['lote']:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.tickets.prazos import expirar_vencidos
+import time
+
+
+class Command(BaseCommand):
+    """
+    Expira os tickets notificados cujo prazo de envio venceu e notifica o
+    próximo da fila de cada demanda afetada.
+    
+    Uso:
+        python manage.py expirar_prazos            # um ciclo e sai (cron)
+        python manage.py expirar_prazos --loop     # roda continuamente (daemon)
+    """
+    help = 'Expira prazos de envio vencidos e avança as filas'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Roda continuamente')
+        parser.add_argument('--intervalo', type=float, default=30, help='Segundos entre ciclos no modo --loop')
+        parser.add_argument('--lote', type=int, default=500, help='Máximo de tickets expirados por ciclo')
+    
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            resultado = expirar_vencidos(limite=options['lote'])
+            
+            if resultado['expirados']:
+                self.stdout.write(
+                    f"Expirados: {resultado['expirados']} | Próximos notificados: {resultado['notificados']}"
+                )
+            
+            if not options['loop']:
+                break
+            
+            # Lote cheio: provavelmente há mais vencidos, segue sem esperar
+            if resultado['expirados'] < options['lote']:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.tickets.miniaturas import processar_pendentes
+import os
+import time
+
+
+class Command(BaseCommand):
+    """
+    Gera as miniaturas e prévias das provas enviadas (lista e detalhe do
+    admin) num pool de processos, fora dos requests de envio.
+    
+    Uso:
+        python manage.py gerar_miniaturas                       # pendentes e sai (cron)
+        python manage.py gerar_miniaturas --loop --workers 2    # roda continuamente (daemon)
+    """
+    help = 'Gera miniaturas e prévias das provas pendentes'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Roda continuamente')
+        parser.add_argument('--intervalo', type=float, default=10, help='Segundos entre ciclos no modo --loop')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos que geram as imagens')
+        parser.add_argument('--lote', type=int, default=100, help='Arquivos por rodada')
+    
+    def handle(self, *args, **options):
+        # Os processos do pool só leem e gravam arquivos: não usam o banco
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                close_old_connections()
+                resultado = processar_pendentes(pool, lote=options['lote'])
+                
+                if resultado['prontas'] or resultado['indisponiveis']:
+                    self.stdout.write(
+                        f"Miniaturas geradas: {resultado['prontas']} | Sem imagem: {resultado['indisponiveis']}"
+                    )
+                
+                if not options['loop']:
+                    break
+                time.sleep(options['intervalo'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from apps.tickets.semelhanca import indexar_semelhanca_antigos
+from apps.tickets.uploads import indexar_arquivos_antigos
+
+
+class Command(BaseCommand):
+    """
+    Calcula o SHA-256 e o hash perceptual das provas enviadas antes dessas
+    verificações, para que reenvios desses arquivos (idênticos ou fotos
+    quase iguais) também sejam sinalizados. Rodar uma vez após o deploy;
+    pode ser repetido.
+    
+    Uso:
+        python manage.py indexar_provas
+    """
+    help = 'Indexa as provas antigas e marca as duplicadas e semelhantes'
+    
+    def handle(self, *args, **options):
+        resultado = indexar_arquivos_antigos()
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['indexados']} prova(s) indexada(s), {resultado['duplicados']} duplicada(s)."
+        ))
+        semelhanca = indexar_semelhanca_antigos()
+        self.stdout.write(self.style.SUCCESS(
+            f"{semelhanca['indexados']} hash(es) perceptual(is) calculado(s), {semelhanca['semelhantes']} semelhante(s)."
+        ))
+        if resultado['ausentes']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultado['ausentes']} arquivo(s) não encontrado(s) no storage."
+            ))
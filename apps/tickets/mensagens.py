@@ -0,0 +1,275 @@
+"""
+Renderização das mensagens enviadas aos participantes (e-mail e WhatsApp).
+
+Todos os textos ficam aqui, como modelos de str.format definidos uma única vez.
+`renderizar` processa um queryset inteiro de uma vez: carrega as demandas com
+select_related e monta os campos de cada demanda só uma vez, devolvendo para
+cada ticket o assunto/corpo do e-mail e o link wa.me juntos.
+"""
+from dataclasses import dataclass
+import pytz
+import re
+import urllib.parse
+
+FUSO_BRASILIA = pytz.timezone('America/Sao_Paulo')
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+@dataclass(frozen=True)
+class Modelo:
+    assunto: str = ''
+    email: str = ''
+    whatsapp: str = ''
+
+
+MODELOS = {
+    'fila': Modelo(
+        assunto='🎯 Você entrou na fila - {concurso}',
+        email="""
+Olá {cliente_nome}!
+
+Você entrou na fila de espera para enviar sua prova do concurso:
+📚 {concurso}
+📋 Edital: {numero_edital}
+💼 Cargo: {cargo}
+
+🎫 Código do seu envio: {codigo_ticket}
+
+Você será notificado por WhatsApp quando for sua vez de enviar a prova.
+Terá 1 hora para fazer o upload após ser notificado.
+
+💰 Recompensa: R$ {valor_recompensa}
+
+Aguarde! Entraremos em contato em breve.
+
+--
+COMCURSANDO
+https://comcursando.com.br
+    """,
+        whatsapp="""🎯 *COMCURSANDO - Fila de Espera*
+
+Olá *{cliente_nome}*!
+
+Você entrou na fila de espera para enviar sua prova:
+📚 *{concurso}*
+📋 Edital: {numero_edital}
+
+🎫 *Código:* {codigo_ticket}
+
+Você será notificado quando for sua vez de enviar a prova.
+Terá *1 hora* para fazer o upload.
+
+💰 Recompensa: *R$ {valor_recompensa}*
+
+Aguarde! 🚀""",
+    ),
+    'sua_vez': Modelo(
+        assunto='⏰ SUA VEZ! Envie sua prova agora - {concurso}',
+        email="""
+Olá {cliente_nome}!
+
+🎉 CHEGOU SUA VEZ de enviar a prova do concurso:
+📚 {concurso}
+📋 Edital: {numero_edital}
+
+⚠️ ATENÇÃO: Você tem 1 HORA para enviar sua prova!
+
+🔗 Clique no link abaixo para fazer o upload:
+{link_upload}
+
+⏱️ Prazo: {prazo} (horário de Brasília)
+
+💰 Recompensa: R$ {valor_recompensa}
+
+Não perca essa oportunidade!
+
+--
+COMCURSANDO
+https://comcursando.com.br
+    """,
+        whatsapp="""🎉 *SUA VEZ! ENVIE SUA PROVA AGORA*
+
+Olá *{cliente_nome}*!
+
+⏰ *ATENÇÃO: Você tem 1 HORA para enviar!*
+
+📚 Concurso: *{concurso}*
+📋 Edital: {numero_edital}
+
+🔗 *Link para upload:*
+{link_upload}
+
+⏱️ *Prazo:* {prazo} (horário de Brasília)
+💰 *Recompensa:* R$ {valor_recompensa}
+
+Não perca essa oportunidade! 🚀
+
+--
+COMCURSANDO
+comcursando.com.br""",
+    ),
+    'recusa': Modelo(
+        assunto='❌ Prova Recusada - {concurso}',
+        email="""
+Olá {cliente_nome}!
+
+Informamos que sua prova do concurso {concurso} foi analisada e infelizmente foi RECUSADA.
+
+📋 *Código do envio:* {codigo_ticket}
+📚 *Concurso:* {concurso}
+📋 *Edital:* {numero_edital}
+
+*Motivo da Recusa:*
+{motivo}
+
+A demanda foi reaberta e outras provas poderão ser enviadas.
+
+Agradecemos sua participação!
+
+--
+COMCURSANDO
+https://comcursando.com.br
+    """,
+        whatsapp="""❌ *PROVA RECUSADA*
+
+Olá *{cliente_nome}*!
+
+Sua prova do concurso foi analisada e infelizmente foi recusada.
+
+📋 *Código:* {codigo_ticket}
+📚 *Concurso:* {concurso}
+
+*Motivo da Recusa:*
+{motivo}
+
+A demanda foi reaberta e outras provas poderão ser enviadas.
+
+Agradecemos sua participação!
+
+--
+COMCURSANDO
+comcursando.com.br""",
+    ),
+    'encerramento': Modelo(
+        whatsapp="""🎯 *COMCURSANDO - Atualização*
+
+Olá, {primeiro_nome}!
+
+Informamos que a demanda do concurso *{concurso}* (Edital: {numero_edital}) foi encerrada.
+
+📋 *Seu código de envio:* {codigo_ticket}
+
+✅ Outra prova foi aprovada e selecionada para esta demanda.
+
+Agradecemos muito pela sua disposição em colaborar! 
+Em uma próxima oportunidade será a sua vez. 🚀
+
+Obrigado pela compreensão!
+
+---
+Continue acompanhando nossos concursos disponíveis em:
+https://comcursando.com.br""",
+    ),
+    'recebida': Modelo(
+        whatsapp="""🎯 *COMCURSANDO*
+
+Olá! Recebemos sua prova do concurso *{concurso}*.
+
+📋 *Código do envio:* {codigo_ticket}
+✅ *Status:* Aguardando análise
+
+Estamos analisando sua prova. Caso seja aprovada, entraremos em contato e enviaremos o pagamento via PIX.
+
+Qualquer dúvida, responda esta mensagem!
+
+Obrigado! 🚀""",
+    ),
+}
+
+
+@dataclass
+class MensagemRenderizada:
+    ticket: object
+    assunto: str
+    email: str
+    whatsapp: str
+    whatsapp_link: str
+
+
+def limpar_numero(numero):
+    """Mantém só os dígitos do WhatsApp (formato usado pelo wa.me)."""
+    return _NAO_DIGITOS.sub('', numero or '')
+
+
+def link_whatsapp(numero, texto):
+    return f"https://wa.me/{limpar_numero(numero)}?text={urllib.parse.quote(texto)}"
+
+
+def formatar_prazo(prazo):
+    if not prazo:
+        return ''
+    return prazo.astimezone(FUSO_BRASILIA).strftime('%d/%m/%Y às %H:%M')
+
+
+def _campos_demanda(demanda):
+    return {
+        'concurso': demanda.concurso,
+        'numero_edital': demanda.numero_edital,
+        'cargo': demanda.cargo,
+        'valor_recompensa': demanda.valor_recompensa,
+    }
+
+
+def _renderizar_um(modelo, ticket, campos_demanda, extra):
+    campos = {
+        **campos_demanda,
+        'cliente_nome': ticket.cliente_nome,
+        'primeiro_nome': (ticket.cliente_nome.split() or [''])[0],
+        'codigo_ticket': ticket.codigo_ticket,
+        'prazo': formatar_prazo(ticket.prazo_envio),
+        **extra,
+    }
+    if callable(campos.get('link_upload')):
+        campos['link_upload'] = campos['link_upload'](ticket)
+    
+    whatsapp = modelo.whatsapp.format(**campos)
+    return MensagemRenderizada(
+        ticket=ticket,
+        assunto=modelo.assunto.format(**campos),
+        email=modelo.email.format(**campos),
+        whatsapp=whatsapp,
+        whatsapp_link=link_whatsapp(ticket.cliente_whatsapp, whatsapp) if whatsapp else '',
+    )
+
+
+def renderizar(tickets, tipo, **extra):
+    """
+    Renderiza as mensagens de um tipo para vários tickets em uma passada.
+    
+    Args:
+        tickets: queryset (recebe select_related('demanda')) ou lista de tickets
+        tipo: chave de MODELOS ('fila', 'sua_vez', 'recusa', 'encerramento', 'recebida')
+        **extra: campos adicionais do modelo (ex.: motivo=...). `link_upload`
+            pode ser uma função que recebe o ticket.
+    
+    Returns:
+        list[MensagemRenderizada]
+    """
+    modelo = MODELOS[tipo]
+    if hasattr(tickets, 'select_related'):
+        tickets = tickets.select_related('demanda')
+    
+    por_demanda = {}
+    mensagens = []
+    for ticket in tickets:
+        campos_demanda = por_demanda.get(ticket.demanda_id)
+        if campos_demanda is None:
+            campos_demanda = por_demanda[ticket.demanda_id] = _campos_demanda(ticket.demanda)
+        mensagens.append(_renderizar_um(modelo, ticket, campos_demanda, extra))
+    return mensagens
+
+
+def renderizar_ticket(ticket, tipo, **extra):
+    """Atalho para renderizar as mensagens de um único ticket."""
+    return _renderizar_um(MODELOS[tipo], ticket, _campos_demanda(ticket.demanda), extra)
@@ -0,0 +1,89 @@
+# Generated manually to reconcile the migration state with the model
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Os campos do ticket criados antes do sistema de fila (atualizado_em,
+# analisado_em, PIX, WhatsApp, pagamento...) nunca tiveram migração, mas já
+# existem nos bancos em uso. Só o estado das migrações é atualizado, nada é
+# executado no banco. As migrações seguintes dependem desta: o índice em
+# atualizado_em (0007) e a recriação da tabela no SQLite a cada AddField
+# (que sem estes campos descartaria as colunas) precisam enxergá-los.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0001_demanda_estado_base'),
+        ('tickets', '0002_add_queue_system'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterModelOptions(
+                    name='ticket',
+                    options={'ordering': ['-criado_em'], 'verbose_name': 'Envio de Prova', 'verbose_name_plural': 'Envios de Provas'},
+                ),
+                migrations.RemoveField(
+                    model_name='ticket',
+                    name='finalizado_em',
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='analisado_em',
+                    field=models.DateTimeField(blank=True, null=True, verbose_name='Analisado em'),
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='atualizado_em',
+                    field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='cliente_pix',
+                    field=models.CharField(default=None, help_text='CPF, e-mail, telefone ou chave aleatória', max_length=255, verbose_name='Chave PIX'),
+                    preserve_default=False,
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='cliente_whatsapp',
+                    field=models.CharField(default=None, help_text='Número com código do país +55 e DDD (ex: +5511966149003)', max_length=20, verbose_name='WhatsApp'),
+                    preserve_default=False,
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='observacoes_admin',
+                    field=models.TextField(blank=True, help_text='Motivo da recusa ou observações', null=True, verbose_name='Observações do Admin'),
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='pago_em',
+                    field=models.DateTimeField(blank=True, null=True, verbose_name='Pago em'),
+                ),
+                migrations.AddField(
+                    model_name='ticket',
+                    name='valor_pago',
+                    field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Valor Pago'),
+                ),
+                migrations.AlterField(
+                    model_name='ticket',
+                    name='codigo_ticket',
+                    field=models.CharField(max_length=12, unique=True, verbose_name='Código do Envio'),
+                ),
+                migrations.AlterField(
+                    model_name='ticket',
+                    name='criado_em',
+                    field=models.DateTimeField(auto_now_add=True, verbose_name='Enviado em'),
+                ),
+                migrations.AlterField(
+                    model_name='ticket',
+                    name='demanda',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='concursos.demanda', verbose_name='Concurso'),
+                ),
+                migrations.AddIndex(
+                    model_name='ticket',
+                    index=models.Index(fields=['status'], name='tickets_status_fbbf05_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated manually for the daily ticket code allocator
+
+from datetime import datetime
+from django.db import migrations, models
+
+
+def popular_sequencias(apps, schema_editor):
+    """Inicia o contador de cada dia a partir dos códigos já emitidos."""
+    Ticket = apps.get_model('tickets', 'Ticket')
+    SequenciaTicket = apps.get_model('tickets', 'SequenciaTicket')
+    
+    ultimos = {}
+    for codigo in Ticket.objects.values_list('codigo_ticket', flat=True).iterator():
+        try:
+            dia = datetime.strptime(codigo[:6], '%d%m%y').date()
+            sequencial = int(codigo[6:])
+        except (TypeError, ValueError):
+            continue
+        ultimos[dia] = max(ultimos.get(dia, 0), sequencial)
+    
+    SequenciaTicket.objects.bulk_create([
+        SequenciaTicket(dia=dia, ultimo=ultimo) for dia, ultimo in ultimos.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_ticket_estado_base'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True, verbose_name='Dia')),
+                ('ultimo', models.PositiveIntegerField(default=0, verbose_name='Último Sequencial')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Tickets',
+                'verbose_name_plural': 'Sequências de Tickets',
+                'db_table': 'tickets_sequencia',
+            },
+        ),
+        migrations.RunPython(popular_sequencias, migrations.RunPython.noop),
+    ]
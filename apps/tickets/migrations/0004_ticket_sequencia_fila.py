@@ -0,0 +1,46 @@
+# Generated manually for stored queue sequence numbers
+
+from django.db import migrations, models
+
+STATUS_FILA = ['na_fila', 'notificado', 'aguardando', 'em_analise']
+
+
+def popular_sequencias_fila(apps, schema_editor):
+    """Numera os tickets de cada demanda por ordem de criação e posiciona a cabeça da fila."""
+    Demanda = apps.get_model('concursos', 'Demanda')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    
+    for demanda in Demanda.objects.iterator():
+        tickets = list(Ticket.objects.filter(demanda_id=demanda.id).order_by('criado_em', 'id').only('id', 'status'))
+        cabeca = None
+        for sequencia, ticket in enumerate(tickets, start=1):
+            ticket.sequencia_fila = sequencia
+            if cabeca is None and ticket.status in STATUS_FILA:
+                cabeca = sequencia
+        Ticket.objects.bulk_update(tickets, ['sequencia_fila'], batch_size=500)
+        
+        Demanda.objects.filter(pk=demanda.id).update(
+            ultima_sequencia_fila=len(tickets),
+            cabeca_fila=cabeca or len(tickets) + 1,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0005_demanda_sequencia_fila'),
+        ('tickets', '0003_sequenciaticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='sequencia_fila',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ordem na Fila'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['demanda', 'sequencia_fila'], name='tickets_demanda_9df76c_idx'),
+        ),
+        migrations.RunPython(popular_sequencias_fila, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated manually for the deadline scheduler
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_notificacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'prazo_envio'], name='tickets_status_9d0821_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated manually for the daily reporting rollups
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0005_demanda_sequencia_fila'),
+        ('tickets', '0002_ticket_estado_base'),
+        ('tickets', '0006_ticket_status_prazo_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['atualizado_em'], name='tickets_atualiz_6913b7_idx'),
+        ),
+        migrations.CreateModel(
+            name='MarcaResumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=50, unique=True, verbose_name='Chave')),
+                ('processado_ate', models.DateTimeField(blank=True, null=True, verbose_name='Processado até')),
+            ],
+            options={
+                'verbose_name': "Marca d'Água de Resumo",
+                'verbose_name_plural': "Marcas d'Água de Resumos",
+                'db_table': 'tickets_resumo_marca',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('banca', models.CharField(max_length=100, verbose_name='Banca')),
+                ('status', models.CharField(choices=[('na_fila', 'Na Fila de Espera'), ('notificado', 'Notificado - Aguardando Envio'), ('aguardando', 'Aguardando Análise'), ('em_analise', 'Em Análise'), ('aprovado', 'Aprovado - Aguardando Pagamento'), ('pago', 'Pago e Concluído'), ('recusado', 'Recusado'), ('expirado', 'Tempo Expirado')], max_length=20, verbose_name='Status')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Quantidade')),
+                ('demanda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concursos.demanda', verbose_name='Demanda')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Envios',
+                'verbose_name_plural': 'Resumos Diários de Envios',
+                'db_table': 'tickets_resumo_diario',
+                'indexes': [models.Index(fields=['dia', 'banca'], name='tickets_res_dia_f0206b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'demanda', 'status'), name='resumo_diario_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoPagamentoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('banca', models.CharField(max_length=100, verbose_name='Banca')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Pagamentos')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor Pago (R$)')),
+                ('demanda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='concursos.demanda', verbose_name='Demanda')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Pagamentos',
+                'verbose_name_plural': 'Resumos Diários de Pagamentos',
+                'db_table': 'tickets_resumo_pagamentos',
+                'indexes': [models.Index(fields=['dia', 'banca'], name='tickets_res_dia_c02833_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'demanda'), name='resumo_pagamento_unico')],
+            },
+        ),
+    ]
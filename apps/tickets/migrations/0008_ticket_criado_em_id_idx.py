@@ -0,0 +1,17 @@
+# Generated manually for cursor pagination of the API
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_resumos_diarios'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['criado_em', 'id'], name='tickets_criado__f0449a_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated manually for content-addressed storage of arquivo_prova
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_ticket_estado_base'),
+        ('tickets', '0008_ticket_criado_em_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64, verbose_name='SHA-256 do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_duplicado_de',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Envio anterior com exatamente o mesmo arquivo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.ticket', verbose_name='Arquivo Idêntico ao do Envio'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated manually for near-duplicate detection of arquivo_prova
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticket_arquivo_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_dhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Hash Perceptual do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_semelhante_a',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Envio com imagem quase idêntica (recomprimida, recortada)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.ticket', verbose_name='Arquivo Semelhante ao do Envio'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_distancia',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text='Bits diferentes entre os hashes (0 a 64)', null=True, verbose_name='Distância da Semelhança'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated manually for the admin thumbnail pipeline
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_ticket_arquivo_dhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='miniatura_status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('pronta', 'Pronta'), ('indisponivel', 'Indisponível')], db_index=True, default='pendente', editable=False, help_text='Gerada fora do request por: python manage.py gerar_miniaturas', max_length=20, verbose_name='Miniatura'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated manually to make the stored queue positions exact
+
+from django.db import migrations
+
+STATUS_FILA = ['na_fila', 'notificado', 'aguardando', 'em_analise']
+
+
+def compactar_filas(apps, schema_editor):
+    """
+    Renumera os tickets ativos de cada demanda em sequência contígua a partir
+    do primeiro (a 0004 numerou todos os tickets, inclusive os que já tinham
+    saído da fila, o que deixava buracos entre os ativos).
+    """
+    Demanda = apps.get_model('concursos', 'Demanda')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    
+    for demanda_id in Demanda.objects.filter(total_na_fila__gt=0).values_list('id', flat=True).iterator():
+        ativos = list(
+            Ticket.objects.filter(demanda_id=demanda_id, status__in=STATUS_FILA)
+            .order_by('sequencia_fila', 'id').only('id', 'sequencia_fila')
+        )
+        if not ativos:
+            continue
+        inicio = ativos[0].sequencia_fila
+        alterados = []
+        for posicao, ticket in enumerate(ativos):
+            if ticket.sequencia_fila != inicio + posicao:
+                ticket.sequencia_fila = inicio + posicao
+                alterados.append(ticket)
+        Ticket.objects.bulk_update(alterados, ['sequencia_fila'], batch_size=500)
+        Demanda.objects.filter(pk=demanda_id).update(
+            ultima_sequencia_fila=inicio + len(ativos) - 1,
+            cabeca_fila=inicio,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concursos', '0005_demanda_sequencia_fila'),
+        ('tickets', '0011_ticket_miniatura_status'),
+    ]
+    
+    operations = [
+        migrations.RunPython(compactar_filas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated manually to refresh the near-duplicate index by hash time
+
+from django.db import migrations, models
+
+
+def carimbar_hashes(apps, schema_editor):
+    """
+    Hashes já gravados recebem o atualizado_em do ticket como carimbo.
+    """
+    Ticket = apps.get_model('tickets', 'Ticket')
+    Ticket.objects.filter(arquivo_dhash__isnull=False).update(arquivo_dhash_em=models.F('atualizado_em'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_ticket_estado_base'),
+        ('tickets', '0012_compactar_filas'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='arquivo_dhash_em',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Hash Perceptual Calculado em'),
+        ),
+        migrations.RunPython(carimbar_hashes, migrations.RunPython.noop),
+    ]
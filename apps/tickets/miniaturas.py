@@ -0,0 +1,123 @@
+"""
+Miniaturas e prévias das provas para a triagem no admin.
+
+Fora do request: o comando `gerar_miniaturas` busca os tickets com
+miniatura_status 'pendente' e distribui a geração num pool de processos,
+já que decodificar e reduzir imagem é trabalho de CPU. Cada arquivo vira duas
+imagens WebP:
+
+    miniaturas/ab/<sha256>_160.webp   lista do admin
+    miniaturas/ab/<sha256>_800.webp   prévia da primeira página
+
+Os caminhos derivam do SHA-256 do arquivo (ver uploads.py): provas
+idênticas compartilham as mesmas miniaturas, e uma miniatura já gravada
+nunca é refeita. De um PDF, a prévia é a primeira imagem embutida (página
+escaneada ou fotografada). PDFs sem imagem ficam 'indisponivel' e o admin
+mostra só o link para o original.
+"""
+import io
+import logging
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from .semelhanca import carregar_imagem
+
+logger = logging.getLogger(__name__)
+
+PASTA_MINIATURAS = 'miniaturas'
+
+# (sufixo, maior lado em pixels, qualidade WebP)
+TAMANHOS = [
+    ('160', 160, 70),
+    ('800', 800, 80),
+]
+
+
+def caminho_miniatura(sha256, sufixo='160'):
+    return f'{PASTA_MINIATURAS}/{sha256[:2]}/{sha256}_{sufixo}.webp'
+
+
+def gerar_para_arquivo(caminho, sha256):
+    """
+    Gera as miniaturas de um arquivo que ainda não as tenha.
+    
+    Roda nos processos do pool: não acessa o banco.
+    
+    Returns:
+        bool: True se as miniaturas existem ao final, False se o arquivo
+        não tem imagem para mostrar
+    """
+    pendentes = [t for t in TAMANHOS if not default_storage.exists(caminho_miniatura(sha256, t[0]))]
+    if not pendentes:
+        return True
+    
+    maior = max(lado for _, lado, _ in pendentes)
+    imagem = carregar_imagem(caminho, modo='RGB', tamanho=(maior, maior))
+    if imagem is None:
+        return False
+    imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+    
+    for sufixo, lado, qualidade in pendentes:
+        reduzida = imagem.copy()
+        reduzida.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        saida = io.BytesIO()
+        reduzida.save(saida, 'WEBP', quality=qualidade, method=4)
+        destino = caminho_miniatura(sha256, sufixo)
+        # Outro worker pode ter gravado a mesma miniatura enquanto isso
+        if not default_storage.exists(destino):
+            default_storage.save(destino, ContentFile(saida.getvalue()))
+    return True
+
+
+def _gerar(item):
+    sha256, caminho = item
+    try:
+        return sha256, gerar_para_arquivo(caminho, sha256)
+    except Exception as e:
+        logger.error(f"Erro ao gerar miniaturas de {caminho}: {e}")
+        return sha256, False
+
+
+def processar_pendentes(pool=None, lote=100):
+    """
+    Gera as miniaturas dos tickets pendentes e atualiza miniatura_status.
+    
+    Args:
+        pool: executor (ProcessPoolExecutor) que gera as imagens; sem ele,
+            gera no próprio processo
+        lote: arquivos distintos por rodada
+    
+    Returns:
+        dict: {'prontas', 'indisponiveis'} em número de arquivos
+    """
+    from .models import Ticket
+    
+    mapear = pool.map if pool is not None else map
+    resultado = {'prontas': 0, 'indisponiveis': 0}
+    pendentes = (
+        Ticket.objects.filter(miniatura_status='pendente')
+        .exclude(arquivo_sha256='')
+        .order_by('arquivo_sha256')
+    )
+    
+    while True:
+        # Provas idênticas (mesmo hash) são geradas uma vez só
+        arquivos = {}
+        for caminho, sha256 in pendentes.values_list('arquivo_prova', 'arquivo_sha256')[:lote * 4]:
+            arquivos.setdefault(sha256, caminho)
+            if len(arquivos) == lote:
+                break
+        if not arquivos:
+            return resultado
+        
+        status = {}
+        for sha256, pronta in mapear(_gerar, arquivos.items()):
+            status[sha256] = 'pronta' if pronta else 'indisponivel'
+        
+        for novo_status, chave in (('pronta', 'prontas'), ('indisponivel', 'indisponiveis')):
+            hashes = [sha256 for sha256, valor in status.items() if valor == novo_status]
+            if hashes:
+                Ticket.objects.filter(arquivo_sha256__in=hashes, miniatura_status='pendente').update(
+                    miniatura_status=novo_status
+                )
+            resultado[chave] += len(hashes)
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from apps.concursos.models import Demanda
-from datetime import datetime
+from apps.concursos.contadores import STATUS_FILA, aplicar_transicao, reservar_sequencia_fila
 
 
 class Ticket(models.Model):
@@ -20,6 +21,12 @@ class Ticket(models.Model):
         ('expirado', 'Tempo Expirado'),
     ]
     
+    MINIATURA_STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('pronta', 'Pronta'),
+        ('indisponivel', 'Indisponível'),
+    ]
+    
     demanda = models.ForeignKey(
         Demanda,
         on_delete=models.CASCADE,
@@ -31,6 +38,39 @@ class Ticket(models.Model):
     cliente_whatsapp = models.CharField(max_length=20, verbose_name='WhatsApp', help_text='Número com código do país +55 e DDD (ex: +5511966149003)')
     cliente_pix = models.CharField(max_length=255, verbose_name='Chave PIX', help_text='CPF, e-mail, telefone ou chave aleatória')
     arquivo_prova = models.FileField(upload_to='provas/%Y/%m/', verbose_name='Arquivo da Prova', help_text='PDF ou imagem da prova', blank=True, null=True)
+    arquivo_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False, verbose_name='SHA-256 do Arquivo')
+    arquivo_duplicado_de = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False,
+        verbose_name='Arquivo Idêntico ao do Envio',
+        help_text='Envio anterior com exatamente o mesmo arquivo'
+    )
+    arquivo_dhash = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name='Hash Perceptual do Arquivo')
+    arquivo_dhash_em = models.DateTimeField(null=True, blank=True, db_index=True, editable=False, verbose_name='Hash Perceptual Calculado em')
+    arquivo_semelhante_a = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False,
+        verbose_name='Arquivo Semelhante ao do Envio',
+        help_text='Envio com imagem quase idêntica (recomprimida, recortada)'
+    )
+    arquivo_distancia = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, verbose_name='Distância da Semelhança', help_text='Bits diferentes entre os hashes (0 a 64)')
+    miniatura_status = models.CharField(
+        max_length=20,
+        choices=MINIATURA_STATUS_CHOICES,
+        default='pendente',
+        db_index=True,
+        editable=False,
+        verbose_name='Miniatura',
+        help_text='Gerada fora do request por: python manage.py gerar_miniaturas'
+    )
     codigo_ticket = models.CharField(
         max_length=12, 
         unique=True, 
@@ -42,6 +82,7 @@ class Ticket(models.Model):
         default='na_fila',
         verbose_name='Status'
     )
+    sequencia_fila = models.PositiveIntegerField(default=0, editable=False, verbose_name='Ordem na Fila')
     notificado_em = models.DateTimeField(null=True, blank=True, verbose_name='Notificado em')
     prazo_envio = models.DateTimeField(null=True, blank=True, verbose_name='Prazo para Envio')
     observacoes_admin = models.TextField(blank=True, null=True, verbose_name='Observações do Admin', help_text='Motivo da recusa ou observações')
@@ -60,33 +101,203 @@ class Ticket(models.Model):
             models.Index(fields=['demanda', 'status']),
             models.Index(fields=['codigo_ticket']),
             models.Index(fields=['status']),
+            models.Index(fields=['demanda', 'sequencia_fila']),
+            models.Index(fields=['status', 'prazo_envio']),
+            models.Index(fields=['atualizado_em']),
+            models.Index(fields=['criado_em', 'id']),
         ]
     
     def __str__(self):
         return f"{self.codigo_ticket} - {self.cliente_nome} ({self.demanda.concurso})"
     
+    @property
+    def posicao_fila(self):
+        """
+        Posição do ticket na fila da demanda (1 = próximo), ou None se não está na fila.
+        Exata: as sequências ativas são mantidas contíguas (ver compactar_fila).
+        """
+        if self.status not in STATUS_FILA:
+            return None
+        return max(1, self.sequencia_fila - self.demanda.cabeca_fila + 1)
+    
     def save(self, *args, **kwargs):
         """
         Gera código do ticket no formato DDMMYYnnnn se não existir.
         DDMMYY = data atual
-        nnnn = sequencial do dia (0001, 0002, etc.)
+        nnnn = sequencial do dia (0001, 0002, etc.), alocado em SequenciaTicket
         """
         if not self.codigo_ticket:
-            hoje = datetime.now()
-            prefixo = hoje.strftime('%d%m%y')
-            
-            # Busca o último ticket do dia para calcular sequencial
-            ultimo_ticket = Ticket.objects.filter(
-                codigo_ticket__startswith=prefixo
-            ).order_by('-codigo_ticket').first()
+            from .sequencia import gerar_codigo_ticket
+            self.codigo_ticket = gerar_codigo_ticket()
+        
+        # Contadores da demanda são ajustados na mesma transação do ticket
+        update_fields = kwargs.get('update_fields')
+        afeta_contadores = update_fields is None or {'status', 'demanda', 'demanda_id'} & set(update_fields)
+        
+        with transaction.atomic():
+            antes = None
+            if self.pk and not self._state.adding and afeta_contadores:
+                antes = Ticket.objects.select_for_update().filter(pk=self.pk).values_list('demanda_id', 'status').first()
             
-            if ultimo_ticket:
-                # Extrai os últimos 4 dígitos e incrementa
-                ultimo_seq = int(ultimo_ticket.codigo_ticket[-4:])
-                novo_seq = ultimo_seq + 1
+            # Quem entra na fila (novo, trocado de demanda ou de volta) vai para o fim
+            if antes is None:
+                entra_na_fila = self._state.adding
             else:
-                novo_seq = 1
+                entra_na_fila = antes[0] != self.demanda_id or antes[1] not in STATUS_FILA
+            if entra_na_fila and self.status in STATUS_FILA:
+                self.sequencia_fila = reservar_sequencia_fila(self.demanda_id)
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'sequencia_fila'}
             
-            self.codigo_ticket = f"{prefixo}{novo_seq:04d}"
-        
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
+            
+            if afeta_contadores:
+                aplicar_transicao(antes, (self.demanda_id, self.status))
+
+
+class SequenciaTicket(models.Model):
+    """
+    Contador do sequencial diário dos códigos de ticket.
+    Uma linha por dia; incrementada atomicamente por apps/tickets/sequencia.py.
+    """
+    
+    dia = models.DateField(unique=True, verbose_name='Dia')
+    ultimo = models.PositiveIntegerField(default=0, verbose_name='Último Sequencial')
+    
+    class Meta:
+        db_table = 'tickets_sequencia'
+        verbose_name = 'Sequência de Tickets'
+        verbose_name_plural = 'Sequências de Tickets'
+    
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y}: {self.ultimo}"
+
+
+class Notificacao(models.Model):
+    """
+    Caixa de saída (outbox) de e-mails para participantes.
+    Gravada na mesma transação da mudança do ticket e enviada em segundo plano
+    pelo comando `dispatch_notifications` (ver apps/tickets/outbox.py).
+    """
+    
+    TIPO_CHOICES = [
+        ('fila', 'Entrada na Fila'),
+        ('sua_vez', 'Sua Vez'),
+        ('recusa', 'Prova Recusada'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviado', 'Enviado'),
+        ('falhou', 'Falhou - Tentativas Esgotadas'),
+    ]
+    
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.CASCADE,
+        related_name='notificacoes',
+        verbose_name='Envio'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo')
+    destinatario = models.EmailField(max_length=255, verbose_name='Destinatário')
+    assunto = models.CharField(max_length=255, verbose_name='Assunto')
+    mensagem = models.TextField(verbose_name='Mensagem')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente', verbose_name='Status')
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    proxima_tentativa_em = models.DateTimeField(default=timezone.now, verbose_name='Próxima Tentativa')
+    ultimo_erro = models.TextField(blank=True, default='', verbose_name='Último Erro')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    enviado_em = models.DateTimeField(null=True, blank=True, verbose_name='Enviado em')
+    
+    class Meta:
+        db_table = 'notificacoes'
+        verbose_name = 'Notificação'
+        verbose_name_plural = 'Notificações'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa_em']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.destinatario} ({self.get_status_display()})"
+
+
+class ResumoDiario(models.Model):
+    """
+    Rollup de tickets por dia de envio × status × demanda (com a banca).
+    Mantido pelo comando `atualizar_resumos` (ver apps/tickets/relatorios.py).
+    """
+    
+    dia = models.DateField(verbose_name='Dia')
+    demanda = models.ForeignKey(
+        Demanda,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Demanda'
+    )
+    banca = models.CharField(max_length=100, verbose_name='Banca')
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES, verbose_name='Status')
+    quantidade = models.PositiveIntegerField(default=0, verbose_name='Quantidade')
+    
+    class Meta:
+        db_table = 'tickets_resumo_diario'
+        verbose_name = 'Resumo Diário de Envios'
+        verbose_name_plural = 'Resumos Diários de Envios'
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'demanda', 'status'], name='resumo_diario_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['dia', 'banca']),
+        ]
+    
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y} - {self.banca} - {self.status}: {self.quantidade}"
+
+
+class ResumoPagamentoDiario(models.Model):
+    """
+    Rollup de pagamentos por dia de pagamento × demanda (com a banca).
+    Mantido pelo comando `atualizar_resumos` (ver apps/tickets/relatorios.py).
+    """
+    
+    dia = models.DateField(verbose_name='Dia')
+    demanda = models.ForeignKey(
+        Demanda,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Demanda'
+    )
+    banca = models.CharField(max_length=100, verbose_name='Banca')
+    quantidade = models.PositiveIntegerField(default=0, verbose_name='Pagamentos')
+    valor_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Valor Pago (R$)')
+    
+    class Meta:
+        db_table = 'tickets_resumo_pagamentos'
+        verbose_name = 'Resumo Diário de Pagamentos'
+        verbose_name_plural = 'Resumos Diários de Pagamentos'
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'demanda'], name='resumo_pagamento_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['dia', 'banca']),
+        ]
+    
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y} - {self.banca}: R$ {self.valor_total}"
+
+
+class MarcaResumo(models.Model):
+    """
+    Marca d'água dos rollups: até que `atualizado_em` os tickets já foram processados.
+    """
+    
+    chave = models.CharField(max_length=50, unique=True, verbose_name='Chave')
+    processado_ate = models.DateTimeField(null=True, blank=True, verbose_name='Processado até')
+    
+    class Meta:
+        db_table = 'tickets_resumo_marca'
+        verbose_name = "Marca d'Água de Resumo"
+        verbose_name_plural = "Marcas d'Água de Resumos"
+    
+    def __str__(self):
+        return f"{self.chave}: {self.processado_ate}"
@@ -0,0 +1,174 @@
+"""
+Despacho da caixa de saída de notificações (Notificacao).
+
+As views e ações do admin apenas gravam a notificação na mesma transação da
+mudança do ticket; o envio SMTP acontece aqui, fora do request. Cada lote é
+enviado por uma única conexão SMTP autenticada (enviar_lote). Falhas são
+reagendadas com backoff exponencial e, após NOTIFICACAO_MAX_TENTATIVAS,
+a notificação vai para o status 'falhou' (dead letter) para análise no admin.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import smtplib
+
+logger = logging.getLogger(__name__)
+
+
+def enfileirar_email(ticket, tipo, assunto, mensagem):
+    """
+    Grava o e-mail na caixa de saída. Deve ser chamado dentro da transação
+    que altera o ticket, para que ambos sejam confirmados juntos.
+    """
+    from .models import Notificacao
+    
+    return Notificacao.objects.create(
+        ticket=ticket,
+        tipo=tipo,
+        destinatario=ticket.cliente_email,
+        assunto=assunto,
+        mensagem=mensagem,
+    )
+
+
+def enfileirar_emails(itens):
+    """
+    Versão em lote de enfileirar_email: grava vários e-mails com um único INSERT.
+    
+    Args:
+        itens: lista de (ticket, tipo, assunto, mensagem)
+    """
+    from .models import Notificacao
+    
+    return Notificacao.objects.bulk_create([
+        Notificacao(
+            ticket=ticket,
+            tipo=tipo,
+            destinatario=ticket.cliente_email,
+            assunto=assunto,
+            mensagem=mensagem,
+        )
+        for ticket, tipo, assunto, mensagem in itens
+    ])
+
+
+def enviar_lote(mensagens, backend=None, **kwargs):
+    """
+    Envia várias mensagens pela mesma conexão (um único handshake SMTP+TLS).
+    
+    Cada mensagem é enviada isoladamente: a falha de uma não impede as demais.
+    Se o servidor derrubar a conexão, ela é reaberta para as mensagens seguintes.
+    
+    Args:
+        mensagens: lista de EmailMessage
+        backend: caminho do backend de e-mail (padrão: settings.EMAIL_BACKEND)
+        **kwargs: opções repassadas ao backend (ex.: file_path)
+    
+    Returns:
+        list: para cada mensagem, None se enviada ou a exceção da falha
+    """
+    if not mensagens:
+        return []
+    
+    conexao = get_connection(backend, fail_silently=False, **kwargs)
+    try:
+        conexao.open()
+    except Exception as e:
+        logger.error(f"Erro ao abrir conexão de e-mail: {str(e)}")
+        return [e] * len(mensagens)
+    
+    resultados = []
+    try:
+        for mensagem in mensagens:
+            try:
+                conexao.send_messages([mensagem])
+                resultados.append(None)
+            except Exception as e:
+                resultados.append(e)
+                if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                    # Conexão perdida: reabre para as próximas mensagens
+                    conexao.close()
+                    try:
+                        conexao.open()
+                    except Exception as erro_conexao:
+                        restantes = len(mensagens) - len(resultados)
+                        resultados.extend([erro_conexao] * restantes)
+                        break
+    finally:
+        conexao.close()
+    
+    return resultados
+
+
+def calcular_backoff(tentativas):
+    """
+    Espera antes da próxima tentativa: base * 2^(tentativas-1), limitada a 1 dia.
+    """
+    base = settings.NOTIFICACAO_BACKOFF_SEGUNDOS
+    return timedelta(seconds=min(base * 2 ** max(tentativas - 1, 0), 24 * 60 * 60))
+
+
+def _registrar_falha(notificacao, erro, agora):
+    notificacao.tentativas += 1
+    notificacao.ultimo_erro = str(erro)
+    if notificacao.tentativas >= settings.NOTIFICACAO_MAX_TENTATIVAS:
+        notificacao.status = 'falhou'
+        logger.error(f"Notificação {notificacao.id} descartada após {notificacao.tentativas} tentativas: {erro}")
+    else:
+        notificacao.proxima_tentativa_em = agora + calcular_backoff(notificacao.tentativas)
+        logger.warning(f"Falha ao enviar notificação {notificacao.id} (tentativa {notificacao.tentativas}): {erro}")
+
+
+def despachar_pendentes(limite=50):
+    """
+    Envia um lote de notificações pendentes cujo horário de tentativa chegou.
+    
+    As linhas do lote ficam bloqueadas (SKIP LOCKED quando o banco suporta)
+    para que vários despachantes possam rodar em paralelo sem duplicar envios.
+    
+    Returns:
+        dict: quantidades de 'enviadas', 'reagendadas' e 'falharam'
+    """
+    from .models import Notificacao
+    
+    resultado = {'enviadas': 0, 'reagendadas': 0, 'falharam': 0}
+    agora = timezone.now()
+    
+    with transaction.atomic():
+        pendentes = Notificacao.objects.filter(
+            status='pendente',
+            proxima_tentativa_em__lte=agora
+        ).order_by('proxima_tentativa_em', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        
+        notificacoes = list(pendentes[:limite])
+        erros = enviar_lote([
+            EmailMessage(
+                notificacao.assunto,
+                notificacao.mensagem,
+                settings.DEFAULT_FROM_EMAIL,
+                [notificacao.destinatario],
+            )
+            for notificacao in notificacoes
+        ])
+        
+        for notificacao, erro in zip(notificacoes, erros):
+            if erro is not None:
+                _registrar_falha(notificacao, erro, agora)
+                resultado['falharam' if notificacao.status == 'falhou' else 'reagendadas'] += 1
+            else:
+                notificacao.status = 'enviado'
+                notificacao.enviado_em = timezone.now()
+                notificacao.tentativas += 1
+                resultado['enviadas'] += 1
+                logger.info(f"Email '{notificacao.tipo}' enviado para {notificacao.destinatario} - Notificação {notificacao.id}")
+            
+            notificacao.save(update_fields=[
+                'status', 'tentativas', 'proxima_tentativa_em', 'ultimo_erro', 'enviado_em'
+            ])
+    
+    return resultado
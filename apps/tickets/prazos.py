@@ -0,0 +1,69 @@
+"""
+Expiração dos prazos de envio.
+
+Um ticket 'notificado' tem 1 hora (prazo_envio) para enviar a prova. O
+comando `expirar_prazos` chama expirar_vencidos() periodicamente: os tickets
+vencidos são marcados como 'expirado' em um único UPDATE e o próximo da fila
+de cada demanda afetada é notificado. A busca usa o índice (status,
+prazo_envio), então um ciclo sem vencidos custa uma consulta indexada.
+"""
+from collections import Counter
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.concursos.cache import invalidar_cache_home
+from apps.concursos.contadores import aplicar_transicao_em_lote
+from apps.concursos.models import Demanda
+from apps.tickets.models import Ticket
+from apps.tickets.notifications import notificar_proximo_da_fila
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def expirar_vencidos(agora=None, limite=500):
+    """
+    Expira os tickets notificados com prazo vencido e avança as filas.
+    
+    Args:
+        agora: instante de referência (padrão: timezone.now())
+        limite: máximo de tickets expirados por chamada
+    
+    Returns:
+        dict: {'expirados': int, 'notificados': int}
+    """
+    agora = agora or timezone.now()
+    
+    with transaction.atomic():
+        vencidos = Ticket.objects.filter(
+            status='notificado',
+            prazo_envio__lt=agora
+        ).order_by('prazo_envio')
+        
+        # Vários processos podem rodar o agendador ao mesmo tempo
+        if connection.features.has_select_for_update_skip_locked:
+            vencidos = vencidos.select_for_update(skip_locked=True)
+        
+        vencidos = list(vencidos.values_list('id', 'demanda_id')[:limite])
+        if not vencidos:
+            return {'expirados': 0, 'notificados': 0}
+        
+        Ticket.objects.filter(id__in=[ticket_id for ticket_id, _ in vencidos]).update(
+            status='expirado',
+            atualizado_em=agora
+        )
+        quantidades = Counter(demanda_id for _, demanda_id in vencidos)
+        aplicar_transicao_em_lote(quantidades, 'notificado', 'expirado')
+    
+    # UPDATE em massa não dispara os signals do ticket
+    transaction.on_commit(invalidar_cache_home)
+    
+    notificados = 0
+    for demanda in Demanda.objects.filter(id__in=list(quantidades)):
+        try:
+            if notificar_proximo_da_fila(demanda):
+                notificados += 1
+        except Exception as e:
+            logger.error(f"Erro ao notificar próximo após expiração (demanda {demanda.id}): {str(e)}")
+    
+    logger.info(f"Prazos expirados: {len(vencidos)} ticket(s) - {notificados} próximo(s) notificado(s)")
+    return {'expirados': len(vencidos), 'notificados': notificados}
@@ -0,0 +1,217 @@
+"""
+Rollups diários para os relatórios de envios e pagamentos.
+
+ResumoDiario guarda quantos tickets foram enviados em cada dia × status ×
+demanda (com a banca); ResumoPagamentoDiario guarda quantidade e valor pago
+por dia de pagamento × demanda. O comando `atualizar_resumos` processa apenas
+os tickets alterados desde a última marca d'água (Ticket.atualizado_em) e
+recalcula somente os grupos (dia, demanda) que eles tocam. O relatório do
+admin lê apenas essas tabelas.
+
+Exclusões de tickets não alteram atualizado_em: use `--completo` para
+reconstruir tudo depois de remoções em massa.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from apps.concursos.contadores import STATUS_APROVADOS
+from apps.concursos.models import Demanda
+from .models import MarcaResumo, ResumoDiario, ResumoPagamentoDiario, Ticket
+import calendar
+
+CHAVE_MARCA = 'tickets'
+
+# Tickets gravados por transações ainda abertas podem ter atualizado_em um
+# pouco anterior à marca; reprocessar essa janela não tem custo de correção
+MARGEM = timedelta(minutes=5)
+
+
+def _resumir_envios(tickets):
+    linhas = (
+        tickets.order_by()
+        .annotate(dia=TruncDate('criado_em'))
+        .values('dia', 'demanda_id', 'demanda__banca', 'status')
+        .annotate(quantidade=Count('id'))
+    )
+    return [
+        ResumoDiario(
+            dia=linha['dia'],
+            demanda_id=linha['demanda_id'],
+            banca=linha['demanda__banca'],
+            status=linha['status'],
+            quantidade=linha['quantidade'],
+        )
+        for linha in linhas
+    ]
+
+
+def _resumir_pagamentos(tickets):
+    linhas = (
+        tickets.filter(status='pago', pago_em__isnull=False)
+        .order_by()
+        .annotate(dia=TruncDate('pago_em'))
+        .values('dia', 'demanda_id', 'demanda__banca')
+        .annotate(
+            quantidade=Count('id'),
+            valor_total=Coalesce(Sum('valor_pago'), Value(Decimal('0')), output_field=DecimalField()),
+        )
+    )
+    return [
+        ResumoPagamentoDiario(
+            dia=linha['dia'],
+            demanda_id=linha['demanda_id'],
+            banca=linha['demanda__banca'],
+            quantidade=linha['quantidade'],
+            valor_total=linha['valor_total'],
+        )
+        for linha in linhas
+    ]
+
+
+def _recalcular_grupos(pares, campo_dia, modelo, resumir):
+    """
+    Refaz as linhas do rollup para os pares (dia, demanda_id) informados.
+    Duas consultas por dia tocado, independente do tamanho da tabela.
+    """
+    por_dia = defaultdict(set)
+    for dia, demanda_id in pares:
+        por_dia[dia].add(demanda_id)
+    
+    total = 0
+    for dia, demanda_ids in por_dia.items():
+        modelo.objects.filter(dia=dia, demanda_id__in=demanda_ids).delete()
+        linhas = resumir(Ticket.objects.filter(**{f'{campo_dia}__date': dia}, demanda_id__in=demanda_ids))
+        modelo.objects.bulk_create(linhas)
+        total += len(linhas)
+    return total
+
+
+def _reconstruir(demanda_ids=None):
+    """Refaz os rollups de todas as demandas (ou das informadas)."""
+    tickets = Ticket.objects.all()
+    for modelo in (ResumoDiario, ResumoPagamentoDiario):
+        linhas = modelo.objects.all()
+        if demanda_ids is not None:
+            linhas = linhas.filter(demanda_id__in=demanda_ids)
+        linhas.delete()
+    if demanda_ids is not None:
+        tickets = tickets.filter(demanda_id__in=demanda_ids)
+    
+    envios = ResumoDiario.objects.bulk_create(_resumir_envios(tickets))
+    pagamentos = ResumoPagamentoDiario.objects.bulk_create(_resumir_pagamentos(tickets))
+    return len(envios) + len(pagamentos)
+
+
+def atualizar_resumos(completo=False, agora=None):
+    """
+    Atualiza os rollups com os tickets alterados desde a última execução.
+    
+    Args:
+        completo: reconstrói os rollups do zero
+        agora: instante usado como nova marca d'água (padrão: timezone.now())
+    
+    Returns:
+        dict: {'completo': bool, 'linhas': linhas de rollup gravadas}
+    """
+    agora = agora or timezone.now()
+    
+    with transaction.atomic():
+        marca, _ = MarcaResumo.objects.select_for_update().get_or_create(chave=CHAVE_MARCA)
+        
+        if completo or marca.processado_ate is None:
+            resultado = {'completo': True, 'linhas': _reconstruir()}
+        else:
+            desde = marca.processado_ate - MARGEM
+            alterados = Ticket.objects.filter(atualizado_em__gt=desde, atualizado_em__lte=agora)
+            
+            # Demanda editada (ex.: banca corrigida): refaz todas as suas linhas
+            demandas_alteradas = set(
+                Demanda.objects.filter(atualizado_em__gt=desde, atualizado_em__lte=agora).values_list('id', flat=True)
+            )
+            linhas = _reconstruir(demandas_alteradas) if demandas_alteradas else 0
+            
+            alterados = alterados.exclude(demanda_id__in=demandas_alteradas).order_by()
+            pares_envio = set(
+                alterados.annotate(dia=TruncDate('criado_em')).values_list('dia', 'demanda_id').distinct()
+            )
+            pares_pagamento = set(
+                alterados.filter(pago_em__isnull=False)
+                .annotate(dia=TruncDate('pago_em')).values_list('dia', 'demanda_id').distinct()
+            )
+            linhas += _recalcular_grupos(pares_envio, 'criado_em', ResumoDiario, _resumir_envios)
+            linhas += _recalcular_grupos(pares_pagamento, 'pago_em', ResumoPagamentoDiario, _resumir_pagamentos)
+            resultado = {'completo': False, 'linhas': linhas}
+        
+        marca.processado_ate = agora
+        marca.save(update_fields=['processado_ate'])
+    
+    return resultado
+
+
+def periodo_do_mes(ano, mes):
+    """Primeiro e último dia do mês."""
+    return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+
+def relatorio_mensal(ano, mes):
+    """
+    Monta o relatório do mês lendo apenas os rollups.
+    
+    Returns:
+        dict: totais, distribuição por status, por banca e série diária
+    """
+    inicio, fim = periodo_do_mes(ano, mes)
+    envios = ResumoDiario.objects.filter(dia__range=(inicio, fim)).order_by()
+    pagamentos = ResumoPagamentoDiario.objects.filter(dia__range=(inicio, fim)).order_by()
+    
+    rotulos = dict(Ticket.STATUS_CHOICES)
+    por_status = {
+        linha['status']: linha['total']
+        for linha in envios.values('status').annotate(total=Sum('quantidade'))
+    }
+    
+    por_banca = {
+        linha['banca']: {'banca': linha['banca'], 'envios': linha['envios'], 'aprovados': linha['aprovados'] or 0,
+                         'pagamentos': 0, 'valor_pago': Decimal('0')}
+        for linha in envios.values('banca').annotate(
+            envios=Sum('quantidade'),
+            aprovados=Sum('quantidade', filter=Q(status__in=STATUS_APROVADOS)),
+        )
+    }
+    for linha in pagamentos.values('banca').annotate(quantidade=Sum('quantidade'), valor=Sum('valor_total')):
+        item = por_banca.setdefault(linha['banca'], {
+            'banca': linha['banca'], 'envios': 0, 'aprovados': 0, 'pagamentos': 0, 'valor_pago': Decimal('0'),
+        })
+        item['pagamentos'] = linha['quantidade']
+        item['valor_pago'] = linha['valor']
+    
+    por_dia = {
+        inicio + timedelta(days=i): {'dia': inicio + timedelta(days=i), 'envios': 0, 'pagamentos': 0, 'valor_pago': Decimal('0')}
+        for i in range((fim - inicio).days + 1)
+    }
+    for linha in envios.values('dia').annotate(total=Sum('quantidade')):
+        por_dia[linha['dia']]['envios'] = linha['total']
+    for linha in pagamentos.values('dia').annotate(quantidade=Sum('quantidade'), valor=Sum('valor_total')):
+        por_dia[linha['dia']]['pagamentos'] = linha['quantidade']
+        por_dia[linha['dia']]['valor_pago'] = linha['valor']
+    
+    marca = MarcaResumo.objects.filter(chave=CHAVE_MARCA).values_list('processado_ate', flat=True).first()
+    
+    return {
+        'inicio': inicio,
+        'fim': fim,
+        'total_envios': sum(por_status.values()),
+        'total_pagamentos': sum(item['pagamentos'] for item in por_banca.values()),
+        'total_pago': sum((item['valor_pago'] for item in por_banca.values()), Decimal('0')),
+        'por_status': [
+            {'status': status, 'rotulo': rotulos[status], 'total': por_status.get(status, 0)}
+            for status in rotulos
+        ],
+        'por_banca': sorted(por_banca.values(), key=lambda item: (-item['envios'], item['banca'])),
+        'por_dia': list(por_dia.values()),
+        'atualizado_ate': marca,
+    }
@@ -0,0 +1,295 @@
+"""
+Detecção de provas quase idênticas (foto recomprimida, recortada, reenviada).
+
+Cada imagem enviada recebe um dHash de 64 bits (Pillow): a imagem vai para
+tons de cinza em 9x8 e cada bit diz se um pixel é mais claro que o vizinho
+da direita. Recompressão, redimensionamento e recortes pequenos mudam
+poucos bits, então a distância de Hamming entre os hashes mede a
+semelhança. PDFs não são renderizados (não há renderizador de PDF nas
+dependências). Quando o PDF embute uma foto JPEG, caso das provas
+escaneadas ou fotografadas, o hash é o dessa primeira imagem.
+
+O hash fica em Ticket.arquivo_dhash (8 bytes, BigInteger com sinal). A
+busca usa multi-index hashing: o hash é dividido em BLOCOS pedaços de 16
+bits, cada um indexado num dicionário. Se dois hashes diferem em até r
+bits, algum pedaço difere em no máximo r // BLOCOS bits (casa dos
+pombos). Basta consultar as variações próximas de cada pedaço e conferir a
+distância real dos poucos candidatos. Com centenas de milhares de provas,
+a consulta leva poucos milissegundos.
+
+O índice vive na memória de cada processo. É montado na primeira consulta
+e, a cada consulta, recebe os hashes gravados depois dele, inclusive por
+outros workers. O critério é o carimbo Ticket.arquivo_dhash_em (hora do
+banco), não o id: o hash de um ticket antigo pode ser gravado depois, no
+upload após a notificação ou pelo indexar_provas, e transações confirmam
+fora de ordem. Por isso cada consulta relê com FOLGA_CARIMBO de margem e
+ignora os tickets que já estão no índice com o mesmo hash.
+"""
+import io
+import logging
+import threading
+from datetime import timedelta
+from itertools import combinations
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models.functions import Now
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+BITS = 64
+BLOCOS = 4
+BITS_BLOCO = BITS // BLOCOS
+MASCARA_BLOCO = (1 << BITS_BLOCO) - 1
+
+# Não lê PDFs além disso procurando a imagem embutida
+LIMITE_BUSCA_PDF = 12 * 1024 * 1024
+
+# Margem ao reler os hashes recentes: uma transação que gravou o hash antes
+# de outra pode confirmar depois dela
+FOLGA_CARIMBO = timedelta(minutes=5)
+
+
+def dhash(imagem):
+    """
+    dHash de 64 bits de uma imagem PIL (int sem sinal), ou None se a
+    imagem for lisa (sem detalhe para comparar).
+    """
+    imagem = ImageOps.exif_transpose(imagem)
+    cinza = imagem.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = cinza.tobytes()
+    
+    valor = 0
+    for linha in range(8):
+        inicio = linha * 9
+        for coluna in range(8):
+            valor = (valor << 1) | (pixels[inicio + coluna] > pixels[inicio + coluna + 1])
+    # Imagem em branco (ou só um degradê na outra direção): todos os bits 0
+    return valor or None
+
+
+def _imagem_do_pdf(dados):
+    """Bytes da primeira imagem JPEG embutida no PDF, ou None."""
+    inicio = dados.find(b'\xff\xd8\xff', 0, LIMITE_BUSCA_PDF)
+    return dados[inicio:] if inicio >= 0 else None
+
+
+def carregar_imagem(caminho, modo='L', tamanho=(64, 64)):
+    """
+    Abre a prova do storage como imagem PIL (de um PDF, a primeira imagem
+    embutida), ou None se não houver imagem.
+    
+    JPEGs são decodificados já reduzidos pela escala da DCT (draft) para
+    no mínimo `tamanho`, bem mais rápido que decodificar a foto inteira.
+    """
+    with default_storage.open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    if dados.startswith(b'%PDF-'):
+        dados = _imagem_do_pdf(dados)
+        if dados is None:
+            return None
+    imagem = Image.open(io.BytesIO(dados))
+    imagem.draft(modo, tamanho)
+    imagem.load()
+    return imagem
+
+
+def hash_da_prova(caminho):
+    """
+    dHash do arquivo no storage, ou None se não for possível calcular.
+    """
+    try:
+        imagem = carregar_imagem(caminho)
+        return dhash(imagem) if imagem is not None else None
+    except Exception as e:
+        logger.warning(f"Não foi possível calcular o hash perceptual de {caminho}: {e}")
+        return None
+
+
+def para_banco(valor):
+    """int sem sinal de 64 bits -> BigIntegerField (com sinal)."""
+    return valor - (1 << BITS) if valor >= (1 << (BITS - 1)) else valor
+
+
+def do_banco(valor):
+    return valor + (1 << BITS) if valor < 0 else valor
+
+
+def _variacoes(raio):
+    """Máscaras de BITS_BLOCO bits com até `raio` bits ligados."""
+    mascaras = [0]
+    for quantidade in range(1, raio + 1):
+        for bits in combinations(range(BITS_BLOCO), quantidade):
+            mascara = 0
+            for bit in bits:
+                mascara |= 1 << bit
+            mascaras.append(mascara)
+    return mascaras
+
+
+class IndiceHamming:
+    """
+    Multi-index hashing para busca por distância de Hamming (ver módulo).
+    """
+    
+    def __init__(self):
+        self.tabelas = [{} for _ in range(BLOCOS)]
+        self._mascaras = {}
+    
+    def __len__(self):
+        return sum(len(itens) for itens in self.tabelas[0].values())
+    
+    def adicionar(self, valor, chave):
+        for bloco, tabela in enumerate(self.tabelas):
+            pedaco = (valor >> (bloco * BITS_BLOCO)) & MASCARA_BLOCO
+            tabela.setdefault(pedaco, []).append((valor, chave))
+    
+    def remover(self, valor, chave):
+        for bloco, tabela in enumerate(self.tabelas):
+            pedaco = (valor >> (bloco * BITS_BLOCO)) & MASCARA_BLOCO
+            tabela[pedaco].remove((valor, chave))
+    
+    def buscar(self, valor, raio):
+        """
+        Itens a até `raio` bits de distância, como [(distância, chave)] do
+        mais próximo para o mais distante.
+        """
+        raio_bloco = raio // BLOCOS
+        if raio_bloco not in self._mascaras:
+            self._mascaras[raio_bloco] = _variacoes(raio_bloco)
+        mascaras = self._mascaras[raio_bloco]
+        
+        encontrados = {}
+        for bloco, tabela in enumerate(self.tabelas):
+            pedaco = (valor >> (bloco * BITS_BLOCO)) & MASCARA_BLOCO
+            for mascara in mascaras:
+                for candidato, chave in tabela.get(pedaco ^ mascara, ()):
+                    if chave in encontrados:
+                        continue
+                    distancia = (candidato ^ valor).bit_count()
+                    if distancia <= raio:
+                        encontrados[chave] = distancia
+        return sorted((distancia, chave) for chave, distancia in encontrados.items())
+
+
+_indice = IndiceHamming()
+# ticket_id -> hash já no índice
+_indexados = {}
+_ultimo_em = None
+_lock = threading.Lock()
+
+
+def _atualizar_indice():
+    """
+    Acrescenta ao índice do processo os hashes gravados desde a última vez
+    (pelo carimbo arquivo_dhash_em, ver módulo).
+    """
+    global _ultimo_em
+    from .models import Ticket
+    
+    with _lock:
+        novos = Ticket.objects.filter(arquivo_dhash__isnull=False)
+        if _ultimo_em is not None:
+            novos = novos.filter(arquivo_dhash_em__gte=_ultimo_em - FOLGA_CARIMBO)
+        novos = novos.order_by('arquivo_dhash_em', 'id').values_list('id', 'arquivo_dhash', 'arquivo_dhash_em')
+        for ticket_id, valor, gravado_em in novos.iterator(chunk_size=5000):
+            if gravado_em is not None and (_ultimo_em is None or gravado_em > _ultimo_em):
+                _ultimo_em = gravado_em
+            
+            valor = do_banco(valor)
+            anterior = _indexados.get(ticket_id)
+            if anterior == valor:
+                continue
+            if anterior is not None:
+                # Prova trocada: o hash antigo sai do índice
+                _indice.remover(anterior, ticket_id)
+            _indice.adicionar(valor, ticket_id)
+            _indexados[ticket_id] = valor
+
+
+def semelhantes(valor, raio=None, exceto=None):
+    """
+    Tickets com dHash a até `raio` bits (padrão PROVA_SEMELHANCA_DISTANCIA),
+    como [(distância, ticket_id)] do mais próximo para o mais distante.
+    """
+    raio = settings.PROVA_SEMELHANCA_DISTANCIA if raio is None else raio
+    _atualizar_indice()
+    return [(distancia, chave) for distancia, chave in _indice.buscar(valor, raio) if chave != exceto]
+
+
+def registrar_semelhanca(ticket):
+    """
+    Calcula o dHash da prova do ticket e aponta o envio anterior mais
+    parecido (arquivo_semelhante_a). Envios com o mesmo arquivo exato não
+    contam: esses já são marcados por arquivo_duplicado_de.
+    
+    Falhas só vão para o log: nunca impedem o envio.
+    """
+    from .models import Ticket
+    
+    if not ticket.arquivo_prova:
+        return None
+    try:
+        valor = hash_da_prova(ticket.arquivo_prova.name)
+        if valor is None:
+            return None
+        
+        parecido, distancia = None, None
+        iguais = set(
+            Ticket.objects.filter(arquivo_sha256=ticket.arquivo_sha256).values_list('id', flat=True)
+        ) if ticket.arquivo_sha256 else {ticket.pk}
+        candidatos = [(d, chave) for d, chave in semelhantes(valor, exceto=ticket.pk) if chave not in iguais]
+        if candidatos:
+            # Confere no banco: tickets excluídos continuam no índice do processo
+            existentes = set(
+                Ticket.objects.filter(id__in=[chave for _, chave in candidatos]).values_list('id', flat=True)
+            )
+            for d, chave in candidatos:
+                if chave in existentes:
+                    parecido, distancia = chave, d
+                    break
+        
+        Ticket.objects.filter(pk=ticket.pk).update(
+            arquivo_dhash=para_banco(valor),
+            arquivo_dhash_em=Now(),
+            arquivo_semelhante_a=parecido,
+            arquivo_distancia=distancia,
+        )
+        ticket.arquivo_dhash = para_banco(valor)
+        ticket.arquivo_semelhante_a_id = parecido
+        ticket.arquivo_distancia = distancia
+        return parecido
+    except Exception as e:
+        logger.error(f"Erro ao verificar semelhança do ticket {ticket.pk}: {e}")
+        return None
+
+
+def indexar_semelhanca_antigos(lote=200):
+    """
+    Calcula o dHash das provas que ainda não têm (enviadas antes desta
+    verificação) e marca as semelhantes.
+    
+    Returns:
+        dict: {'indexados', 'semelhantes'}
+    """
+    from .models import Ticket
+    
+    resultado = {'indexados': 0, 'semelhantes': 0}
+    pendentes = (
+        Ticket.objects.filter(arquivo_dhash__isnull=True)
+        .exclude(arquivo_prova='').exclude(arquivo_prova__isnull=True)
+        .only('id', 'arquivo_prova', 'arquivo_sha256')
+        .order_by('id')
+    )
+    # Por chave: PDFs sem imagem continuam sem hash e não podem voltar ao lote
+    ultimo_id = 0
+    while True:
+        tickets = list(pendentes.filter(id__gt=ultimo_id)[:lote])
+        if not tickets:
+            return resultado
+        for ticket in tickets:
+            parecido = registrar_semelhanca(ticket)
+            resultado['indexados'] += ticket.arquivo_dhash is not None
+            resultado['semelhantes'] += parecido is not None
+        ultimo_id = tickets[-1].id
+
@@ -0,0 +1,112 @@
+"""
+Alocador do sequencial diário dos códigos de ticket (DDMMYYnnnn).
+
+Cada dia tem uma linha em SequenciaTicket. A alocação é um
+UPDATE ... SET ultimo = ultimo + N seguido da leitura do novo valor na
+mesma transação: o banco serializa os workers na linha do dia, sem ORDER BY
+sobre a tabela de tickets e sem códigos repetidos entre processos.
+
+Com TICKET_CODIGO_BLOCO > 1 cada processo reserva um bloco de sequenciais
+de uma vez e os distribui localmente (os não usados viram lacunas). O bloco
+é reservado numa conexão própria, confirmada na hora: um rollback de quem
+pediu o código não desfaz no banco uma reserva que continua no cache.
+O sequencial usa 4 dígitos e cresce até 6 (limite do campo) após 9999.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+import threading
+
+# codigo_ticket tem max_length=12: 6 da data + até 6 do sequencial
+SEQUENCIAL_MAXIMO = 999999
+
+# Alias temporário da conexão usada para reservar blocos
+ALIAS_RESERVA = 'sequencia_reserva'
+
+_lock = threading.Lock()
+_blocos = {}
+
+
+class SequenciaEsgotada(Exception):
+    """Todos os sequenciais do dia já foram usados."""
+
+
+def _reservar(dia, quantidade, using=DEFAULT_DB_ALIAS):
+    """
+    Reserva `quantidade` sequenciais no banco e retorna o último reservado.
+    """
+    from .models import SequenciaTicket
+    
+    sequencias = SequenciaTicket.objects.using(using)
+    
+    for _ in range(2):
+        with transaction.atomic(using=using):
+            atualizados = sequencias.filter(dia=dia).update(ultimo=F('ultimo') + quantidade)
+            if atualizados:
+                return sequencias.filter(dia=dia).values_list('ultimo', flat=True).get()
+        
+        # Primeiro ticket do dia: cria a linha (outro worker pode ter criado antes)
+        try:
+            with transaction.atomic(using=using):
+                sequencias.create(dia=dia, ultimo=quantidade)
+                return quantidade
+        except IntegrityError:
+            continue
+    
+    raise RuntimeError(f'Não foi possível reservar sequencial para {dia}')
+
+
+def _reservar_bloco(dia, quantidade):
+    """
+    Reserva um bloco fora da transação de quem chamou.
+    
+    O bloco fica em _blocos depois do request: se fosse reservado na transação
+    do chamador e ela sofresse rollback, o banco entregaria a mesma faixa a
+    outro processo enquanto este ainda a distribui.
+    """
+    conexao = connections.create_connection(DEFAULT_DB_ALIAS)
+    connections[ALIAS_RESERVA] = conexao
+    try:
+        return _reservar(dia, quantidade, using=ALIAS_RESERVA)
+    finally:
+        del connections[ALIAS_RESERVA]
+        conexao.close()
+
+
+def proximo_sequencial(dia=None):
+    """
+    Retorna o próximo sequencial livre do dia.
+    
+    Raises:
+        SequenciaEsgotada: se o dia já passou de SEQUENCIAL_MAXIMO
+    """
+    dia = dia or timezone.localdate()
+    tamanho_bloco = max(1, getattr(settings, 'TICKET_CODIGO_BLOCO', 1))
+    
+    with _lock:
+        proximo, fim = _blocos.get(dia, (1, 0))
+        if proximo > fim:
+            if tamanho_bloco > 1:
+                fim = _reservar_bloco(dia, tamanho_bloco)
+            else:
+                # Sem cache: a reserva pode acompanhar a transação do ticket
+                fim = _reservar(dia, tamanho_bloco)
+            proximo = fim - tamanho_bloco + 1
+            # Blocos de dias anteriores não serão mais usados
+            _blocos.clear()
+        
+        if proximo > SEQUENCIAL_MAXIMO:
+            raise SequenciaEsgotada(f'Limite de {SEQUENCIAL_MAXIMO} tickets em {dia:%d/%m/%Y} atingido')
+        
+        _blocos[dia] = (proximo + 1, fim)
+        return proximo
+
+
+def gerar_codigo_ticket(dia=None):
+    """
+    Gera um código de ticket único no formato DDMMYYnnnn.
+    Acima de 9999 tickets no dia o sequencial passa a ter 5 ou 6 dígitos.
+    """
+    dia = dia or timezone.localdate()
+    return f"{dia:%d%m%y}{proximo_sequencial(dia):04d}"
@@ -1,21 +1,30 @@
 from rest_framework import serializers
 from .models import Ticket
-from apps.concursos.serializers import DemandaSerializer
+from apps.concursos.serializers import CamposDinamicosMixin, DemandaSerializer
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Ticket.
+    Os dados da demanda (demanda_detalhes) só vêm com ?expand=demanda.
     """
     demanda_detalhes = DemandaSerializer(source='demanda', read_only=True)
-    posicao_fila = serializers.ReadOnlyField()
+    posicao_fila = serializers.IntegerField(read_only=True, allow_null=True)
+    
+    campos_expansiveis = {'demanda': 'demanda_detalhes'}
+    
+    # Colunas que cada campo calculado/aninhado lê (ver TicketViewSet.get_queryset)
+    colunas = {
+        'posicao_fila': ['status', 'sequencia_fila', 'demanda__cabeca_fila'],
+        'demanda_detalhes': [f'demanda__{campo}' for campo in DemandaSerializer.Meta.fields],
+    }
     
     class Meta:
         model = Ticket
         fields = ['id', 'demanda', 'demanda_detalhes', 'cliente_nome', 
-                  'codigo_ticket', 'status', 'posicao_fila', 
-                  'criado_em', 'finalizado_em']
-        read_only_fields = ['id', 'codigo_ticket', 'criado_em', 'finalizado_em']
+                  'codigo_ticket', 'status', 'sequencia_fila', 'posicao_fila', 
+                  'criado_em', 'analisado_em', 'pago_em']
+        read_only_fields = ['id', 'codigo_ticket', 'sequencia_fila', 'criado_em', 'analisado_em', 'pago_em']
 
 
 class TicketCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from apps.concursos.contadores import aplicar_transicao
+from .models import Ticket
+
+
+@receiver(post_delete, sender=Ticket)
+def descontar_ticket_removido(sender, instance, **kwargs):
+    """Remove o ticket excluído dos contadores da demanda (inclusive em queryset.delete())."""
+    aplicar_transicao((instance.demanda_id, instance.status), None)
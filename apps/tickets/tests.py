@@ -1,3 +1,1301 @@
-from django.test import TestCase
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import smtplib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.http import multipartparser
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Now
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageDraw
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from apps.concursos.models import Demanda
+from apps.concursos.contadores import CONTADORES, STATUS_FILA, recalcular_contadores
+from apps.concursos.tests import criar_demanda, criar_ticket
+from apps.tickets import miniaturas, outbox, semelhanca, sequencia, transicoes, uploads
+from apps.tickets.admin import NotificacaoAdmin, TicketAdmin
+from apps.tickets.mensagens import renderizar
+from apps.tickets.prazos import expirar_vencidos
+from apps.tickets.models import Notificacao, ResumoDiario, ResumoPagamentoDiario, SequenciaTicket, Ticket
+from apps.tickets.notifications import notificar_proximo_da_fila
+from apps.tickets.relatorios import atualizar_resumos, relatorio_mensal
+from apps.users.models import AdminUser
+from config import dashboard
 
-# Create your tests here.
+
+class SequenciaTicketTests(TestCase):
+    """
+    Testes do alocador de sequenciais diários dos códigos de ticket.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+    
+    def test_codigo_sequencial_por_dia(self):
+        dia = date(2025, 3, 4)
+        self.assertEqual(sequencia.gerar_codigo_ticket(dia), '0403250001')
+        self.assertEqual(sequencia.gerar_codigo_ticket(dia), '0403250002')
+        self.assertEqual(sequencia.gerar_codigo_ticket(date(2025, 3, 5)), '0503250001')
+    
+    def test_sequencial_acima_de_9999_ganha_digitos(self):
+        dia = date(2025, 3, 4)
+        SequenciaTicket.objects.create(dia=dia, ultimo=9999)
+        self.assertEqual(sequencia.gerar_codigo_ticket(dia), '04032510000')
+    
+    def test_sequencia_esgotada(self):
+        dia = date(2025, 3, 4)
+        SequenciaTicket.objects.create(dia=dia, ultimo=sequencia.SEQUENCIAL_MAXIMO)
+        with self.assertRaises(sequencia.SequenciaEsgotada):
+            sequencia.gerar_codigo_ticket(dia)
+
+
+
+@override_settings(TICKET_CODIGO_BLOCO=10)
+class SequenciaBlocoTests(TransactionTestCase):
+    """
+    Blocos de sequenciais reservados por processo. O bloco é confirmado numa
+    conexão própria, por isso os testes não rodam dentro de uma transação.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+    
+    def test_bloco_reservado_por_processo(self):
+        dia = date(2025, 3, 4)
+        with mock.patch.object(sequencia, '_reservar_bloco', wraps=sequencia._reservar_bloco) as reservar:
+            primeiros = [sequencia.proximo_sequencial(dia) for _ in range(10)]
+        reservar.assert_called_once_with(dia, 10)
+        self.assertEqual(primeiros, list(range(1, 11)))
+        
+        # Outro worker reserva o bloco seguinte
+        sequencia._blocos.clear()
+        self.assertEqual(sequencia.proximo_sequencial(dia), 11)
+        self.assertEqual(SequenciaTicket.objects.get(dia=dia).ultimo, 20)
+    
+    def test_rollback_do_chamador_nao_desfaz_a_reserva(self):
+        dia = date(2025, 3, 4)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                self.assertEqual(sequencia.proximo_sequencial(dia), 1)
+                raise IntegrityError('falha ao salvar o ticket')
+        
+        # O bloco em cache continua reservado no banco
+        self.assertEqual(SequenciaTicket.objects.get(dia=dia).ultimo, 10)
+        self.assertEqual(sequencia.proximo_sequencial(dia), 2)
+        
+        sequencia._blocos.clear()
+        self.assertEqual(sequencia.proximo_sequencial(dia), 11)
+
+
+class _BlocosPorThread:
+    """Dicionário de blocos separado por thread (um "processo" por thread)."""
+    
+    def __init__(self):
+        self._local = threading.local()
+    
+    def _dados(self):
+        if not hasattr(self._local, 'dados'):
+            self._local.dados = {}
+        return self._local.dados
+    
+    def get(self, *args):
+        return self._dados().get(*args)
+    
+    def clear(self):
+        self._dados().clear()
+    
+    def __setitem__(self, chave, valor):
+        self._dados()[chave] = valor
+
+
+class SequenciaTicketConcorrenciaTests(TransactionTestCase):
+    """
+    Vários threads (cada um com sua conexão) alocando ao mesmo tempo
+    não podem receber o mesmo sequencial.
+    """
+    
+    THREADS = 8
+    POR_THREAD = 25
+    
+    def setUp(self):
+        # No SQLite em memória (cache compartilhado) uma escrita concorrente
+        # falha na hora com "table is locked" em vez de esperar a vez
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('o banco de teste não serializa escritas concorrentes')
+        sequencia._blocos.clear()
+    
+    def _alocar(self, dia):
+        try:
+            return [sequencia.proximo_sequencial(dia) for _ in range(self.POR_THREAD)]
+        finally:
+            connection.close()
+    
+    def _martelar(self, dia):
+        # Sem o lock do processo: só o banco impede a repetição entre threads
+        with mock.patch.object(sequencia, '_lock', new=contextlib.nullcontext()), \
+                ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            resultados = list(executor.map(self._alocar, [dia] * self.THREADS))
+        return [n for lote in resultados for n in lote]
+    
+    def test_sem_repeticao_sob_concorrencia(self):
+        dia = date(2025, 3, 4)
+        alocados = self._martelar(dia)
+        total = self.THREADS * self.POR_THREAD
+        self.assertEqual(sorted(alocados), list(range(1, total + 1)))
+        self.assertEqual(SequenciaTicket.objects.get(dia=dia).ultimo, total)
+    
+    @override_settings(TICKET_CODIGO_BLOCO=5)
+    def test_blocos_sem_repeticao_sob_concorrencia(self):
+        dia = date(2025, 3, 4)
+        # Cada thread simula um worker com seu próprio cache de blocos
+        with mock.patch.object(sequencia, '_blocos', new=_BlocosPorThread()):
+            alocados = self._martelar(dia)
+        self.assertEqual(len(alocados), len(set(alocados)))
+
+
+class RenderizarMensagensTests(TestCase):
+    """
+    Testes do renderizador de notificações em lote.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        for i in range(3):
+            demanda = criar_demanda(concurso=f'Concurso {i}', numero_edital=f'0{i}/2025')
+            criar_ticket(demanda, cliente_whatsapp='+55 (11) 96614-9003')
+    
+    def test_queryset_renderizado_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            mensagens = renderizar(Ticket.objects.all(), 'recusa', motivo='Prova ilegível')
+        
+        self.assertEqual(len(mensagens), 3)
+        for mensagem in mensagens:
+            self.assertIn(mensagem.ticket.demanda.concurso, mensagem.email)
+            self.assertIn('Prova ilegível', mensagem.whatsapp)
+            self.assertTrue(mensagem.whatsapp_link.startswith('https://wa.me/5511966149003?text='))
+
+
+def smtp_recusando(*destinatarios):
+    """
+    Faz o backend locmem recusar as mensagens para os destinatários indicados.
+    """
+    enviar = locmem.EmailBackend.send_messages
+    
+    def send_messages(backend, mensagens):
+        for mensagem in mensagens:
+            recusados = set(mensagem.to) & set(destinatarios)
+            if recusados:
+                raise smtplib.SMTPRecipientsRefused({d: (550, b'Mailbox unavailable') for d in recusados})
+        return enviar(backend, mensagens)
+    
+    return mock.patch.object(locmem.EmailBackend, 'send_messages', send_messages)
+
+
+@override_settings(NOTIFICACAO_MAX_TENTATIVAS=3, NOTIFICACAO_BACKOFF_SEGUNDOS=60)
+class OutboxTests(TestCase):
+    """
+    Testes da caixa de saída de notificações e do seu despachante.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demanda = criar_demanda()
+    
+    def _notificacao(self, email='maria@exemplo.com', **campos):
+        ticket = criar_ticket(self.demanda, cliente_email=email)
+        return outbox.enfileirar_email(ticket, campos.pop('tipo', 'fila'), 'Assunto', 'Mensagem')
+    
+    def _vencer(self, notificacao):
+        """Antecipa a próxima tentativa para que o despachante a pegue agora."""
+        Notificacao.objects.filter(pk=notificacao.pk).update(proxima_tentativa_em=timezone.now() - timedelta(seconds=1))
+    
+    def test_despacha_em_lotes_na_ordem(self):
+        notificacoes = [self._notificacao(f'p{i}@exemplo.com') for i in range(3)]
+        futura = self._notificacao('futura@exemplo.com')
+        Notificacao.objects.filter(pk=futura.pk).update(proxima_tentativa_em=timezone.now() + timedelta(hours=1))
+        
+        self.assertEqual(outbox.despachar_pendentes(limite=2), {'enviadas': 2, 'reagendadas': 0, 'falharam': 0})
+        self.assertEqual([m.to for m in mail.outbox], [['p0@exemplo.com'], ['p1@exemplo.com']])
+        
+        self.assertEqual(outbox.despachar_pendentes(limite=2), {'enviadas': 1, 'reagendadas': 0, 'falharam': 0})
+        self.assertEqual(outbox.despachar_pendentes(limite=2), {'enviadas': 0, 'reagendadas': 0, 'falharam': 0})
+        
+        for notificacao in notificacoes:
+            notificacao.refresh_from_db()
+            self.assertEqual(notificacao.status, 'enviado')
+            self.assertEqual(notificacao.tentativas, 1)
+            self.assertIsNotNone(notificacao.enviado_em)
+        self.assertEqual(Notificacao.objects.get(pk=futura.pk).status, 'pendente')
+        self.assertEqual(len(mail.outbox), 3)
+    
+    def test_falha_reagenda_com_backoff_exponencial(self):
+        notificacao = self._notificacao()
+        
+        for tentativa, espera in [(1, 60), (2, 120)]:
+            antes = timezone.now()
+            with smtp_recusando('maria@exemplo.com'):
+                self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 0, 'reagendadas': 1, 'falharam': 0})
+            notificacao.refresh_from_db()
+            self.assertEqual(notificacao.status, 'pendente')
+            self.assertEqual(notificacao.tentativas, tentativa)
+            self.assertIn('Mailbox unavailable', notificacao.ultimo_erro)
+            self.assertGreaterEqual(notificacao.proxima_tentativa_em, antes + timedelta(seconds=espera))
+            self.assertLessEqual(notificacao.proxima_tentativa_em, timezone.now() + timedelta(seconds=espera))
+            
+            # Antes do horário agendado ninguém tenta de novo
+            self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 0, 'reagendadas': 0, 'falharam': 0})
+            self._vencer(notificacao)
+        
+        self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 1, 'reagendadas': 0, 'falharam': 0})
+        notificacao.refresh_from_db()
+        self.assertEqual(notificacao.status, 'enviado')
+        self.assertEqual(notificacao.tentativas, 3)
+    
+    def test_dead_letter_apos_esgotar_tentativas(self):
+        notificacao = self._notificacao()
+        
+        with smtp_recusando('maria@exemplo.com'):
+            for _ in range(2):
+                self.assertEqual(outbox.despachar_pendentes()['reagendadas'], 1)
+                self._vencer(notificacao)
+            self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 0, 'reagendadas': 0, 'falharam': 1})
+        
+        notificacao.refresh_from_db()
+        self.assertEqual(notificacao.status, 'falhou')
+        self.assertEqual(notificacao.tentativas, 3)
+        
+        # Dead letter: não volta a ser despachada
+        self._vencer(notificacao)
+        self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 0, 'reagendadas': 0, 'falharam': 0})
+        self.assertEqual(mail.outbox, [])
+    
+    def test_falha_de_um_destinatario_nao_afeta_o_lote(self):
+        primeira, recusada, terceira = [self._notificacao(f'p{i}@exemplo.com') for i in range(3)]
+        
+        with smtp_recusando('p1@exemplo.com'):
+            self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 2, 'reagendadas': 1, 'falharam': 0})
+        
+        self.assertEqual([m.to for m in mail.outbox], [['p0@exemplo.com'], ['p2@exemplo.com']])
+        for notificacao in (primeira, recusada, terceira):
+            notificacao.refresh_from_db()
+        self.assertEqual((primeira.status, terceira.status), ('enviado', 'enviado'))
+        self.assertEqual((recusada.status, recusada.tentativas, recusada.enviado_em), ('pendente', 1, None))
+        self.assertIn('p1@exemplo.com', recusada.ultimo_erro)
+    
+    def test_rollback_da_transacao_nao_enfileira(self):
+        ticket = criar_ticket(self.demanda, cliente_email='maria@exemplo.com')
+        
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertEqual(notificar_proximo_da_fila(self.demanda), ticket)
+                self.assertTrue(Notificacao.objects.filter(ticket=ticket, tipo='sua_vez').exists())
+                raise RuntimeError('falha depois de notificar')
+        
+        self.assertFalse(Notificacao.objects.exists())
+        self.assertEqual(Ticket.objects.get(pk=ticket.pk).status, 'na_fila')
+        self.assertEqual(outbox.despachar_pendentes(), {'enviadas': 0, 'reagendadas': 0, 'falharam': 0})
+    
+    def test_changelist_do_admin_nao_cresce_com_a_pagina(self):
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        for i in range(10):
+            demanda = criar_demanda(concurso=f'Concurso {i}', numero_edital=f'{i}/2025')
+            ticket = criar_ticket(demanda, cliente_email=f'p{i}@exemplo.com')
+            outbox.enfileirar_email(ticket, 'fila', 'Assunto', 'Mensagem')
+        
+        def consultas(por_pagina):
+            with mock.patch.object(NotificacaoAdmin, 'list_per_page', por_pagina):
+                with CaptureQueriesContext(connection) as capturadas:
+                    response = self.client.get(reverse('admin:tickets_notificacao_changelist'))
+            self.assertEqual(response.status_code, 200)
+            return len(capturadas)
+        
+        self.assertEqual(consultas(2), consultas(10))
+
+
+class ExpirarPrazosTests(TestCase):
+    """
+    Testes do agendador de expiração de prazos.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demanda = criar_demanda()
+    
+    def _ticket(self, status, prazo_envio=None):
+        return criar_ticket(self.demanda, status=status, prazo_envio=prazo_envio)
+    
+    def test_expira_vencido_e_notifica_proximo(self):
+        vencido = self._ticket('notificado', timezone.now() - timedelta(minutes=1))
+        no_prazo = self._ticket('notificado', timezone.now() + timedelta(minutes=30))
+        proximo = self._ticket('na_fila')
+        
+        self.assertEqual(expirar_vencidos(), {'expirados': 1, 'notificados': 1})
+        
+        vencido.refresh_from_db()
+        no_prazo.refresh_from_db()
+        proximo.refresh_from_db()
+        self.demanda.refresh_from_db()
+        self.assertEqual(vencido.status, 'expirado')
+        self.assertEqual(no_prazo.status, 'notificado')
+        self.assertEqual(proximo.status, 'notificado')
+        self.assertEqual(self.demanda.total_na_fila, 2)
+        self.assertEqual(self.demanda.cabeca_fila, no_prazo.sequencia_fila)
+    
+    def test_ciclo_sem_vencidos_custa_uma_consulta(self):
+        self._ticket('notificado', timezone.now() + timedelta(minutes=30))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(expirar_vencidos(), {'expirados': 0, 'notificados': 0})
+        
+        # Desconsidera os SAVEPOINTs do transaction.atomic dentro do TestCase
+        sql = [q['sql'] for q in consultas.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(sql), 1)
+
+
+class TransicoesEmMassaTests(TestCase):
+    """
+    Testes das transições em massa usadas pelas ações do admin.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demandas = [
+            criar_demanda(concurso=f'Concurso {i}', numero_edital=f'0{i}/2025', status='em_analise')
+            for i in range(2)
+        ]
+    
+    def _ticket(self, demanda, status, **campos):
+        return criar_ticket(demanda, status=status, **campos)
+    
+    def assertContadoresConsistentes(self):
+        antes = list(Demanda.objects.order_by('id').values_list(*CONTADORES))
+        recalcular_contadores()
+        depois = list(Demanda.objects.order_by('id').values_list(*CONTADORES))
+        self.assertEqual(antes, depois)
+    
+    def test_aprovar_somente_pendentes(self):
+        for demanda in self.demandas:
+            self._ticket(demanda, 'aguardando')
+            self._ticket(demanda, 'em_analise')
+            self._ticket(demanda, 'na_fila')
+        
+        self.assertEqual(transicoes.aprovar(Ticket.objects.all()), 4)
+        self.assertEqual(Ticket.objects.filter(status='aprovado', analisado_em__isnull=False).count(), 4)
+        self.assertEqual(Ticket.objects.filter(status='na_fila').count(), 2)
+        self.assertContadoresConsistentes()
+    
+    def test_recusar_reabre_demandas(self):
+        recusado = self._ticket(self.demandas[0], 'em_analise')
+        self._ticket(self.demandas[1], 'aprovado')
+        
+        linhas = transicoes.recusar(Ticket.objects.all(), 'Prova ilegível')
+        
+        self.assertEqual(linhas, [(recusado.id, self.demandas[0].id, 'em_analise')])
+        recusado.refresh_from_db()
+        self.assertEqual(recusado.observacoes_admin, 'Recusado: Prova ilegível')
+        self.assertEqual(
+            dict(Demanda.objects.values_list('id', 'status')),
+            {self.demandas[0].id: 'aberto', self.demandas[1].id: 'em_analise'}
+        )
+        self.assertContadoresConsistentes()
+    
+    def test_marcar_pagos_encerra_demanda(self):
+        demanda = self.demandas[0]
+        pago = self._ticket(demanda, 'aprovado')
+        pago_com_valor = self._ticket(self.demandas[1], 'aprovado', valor_pago=30)
+        pendente = self._ticket(demanda, 'aguardando')
+        ja_recusado = self._ticket(demanda, 'recusado')
+        
+        pagos, outros = transicoes.marcar_pagos(Ticket.objects.filter(id__in=[pago.id, pago_com_valor.id]))
+        
+        self.assertEqual({t.id for t in pagos}, {pago.id, pago_com_valor.id})
+        self.assertEqual({t.id for t in outros}, {pendente.id, ja_recusado.id})
+        pago.refresh_from_db()
+        pago_com_valor.refresh_from_db()
+        pendente.refresh_from_db()
+        self.assertEqual((pago.status, pago.valor_pago), ('pago', demanda.valor_recompensa))
+        self.assertEqual(pago_com_valor.valor_pago, 30)
+        self.assertEqual(pendente.status, 'recusado')
+        self.assertEqual(pendente.observacoes_admin, 'Demanda encerrada - outra prova foi selecionada')
+        self.assertEqual(set(Demanda.objects.values_list('status', flat=True)), {'concluido'})
+        self.assertContadoresConsistentes()
+
+
+class PosicaoFilaTests(TestCase):
+    """
+    A posição na fila (sequência - cabeça + 1) deve continuar igual à contagem
+    de quem está na frente depois de saídas do meio da fila.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demanda = criar_demanda(status='em_analise')
+        self.tickets = [criar_ticket(self.demanda) for _ in range(6)]
+    
+    def _sair(self, ticket, status='expirado'):
+        ticket.refresh_from_db()
+        ticket.status = status
+        ticket.save()
+    
+    def assertPosicoesExatas(self):
+        ativos = list(Ticket.objects.filter(status__in=STATUS_FILA).select_related('demanda').order_by('sequencia_fila'))
+        self.assertEqual([ticket.posicao_fila for ticket in ativos], list(range(1, len(ativos) + 1)))
+        self.demanda.refresh_from_db()
+        self.assertEqual(self.demanda.total_na_fila, len(ativos))
+    
+    def test_saidas_do_meio_da_fila(self):
+        primeiro, segundo, terceiro, quarto, quinto, sexto = self.tickets
+        
+        self._sair(terceiro)
+        self.assertPosicoesExatas()
+        self.assertEqual(Ticket.objects.get(pk=quarto.pk).posicao_fila, 3)
+        
+        # Em massa: recusa de um envio em análise no meio da fila
+        Ticket.objects.filter(pk=quinto.pk).update(status='em_analise')
+        recalcular_contadores()
+        transicoes.recusar(Ticket.objects.filter(pk=quinto.pk), 'Prova ilegível')
+        self.assertPosicoesExatas()
+        
+        Ticket.objects.filter(pk=segundo.pk).delete()
+        self.assertPosicoesExatas()
+        self.assertEqual(Ticket.objects.get(pk=sexto.pk).posicao_fila, 3)
+        
+        # Pela cabeça: ninguém é renumerado
+        sequencias = dict(Ticket.objects.values_list('id', 'sequencia_fila'))
+        self._sair(primeiro, 'aprovado')
+        self.assertPosicoesExatas()
+        self.assertEqual(dict(Ticket.objects.values_list('id', 'sequencia_fila')), sequencias)
+        
+        # Novo ticket entra no fim
+        novo = criar_ticket(self.demanda)
+        self.assertPosicoesExatas()
+        self.assertEqual(Ticket.objects.select_related('demanda').get(pk=novo.pk).posicao_fila, 3)
+    
+    def test_expiracao_no_meio_e_retorno_a_fila(self):
+        notificado = self.tickets[2]
+        Ticket.objects.filter(pk=notificado.pk).update(status='notificado', prazo_envio=timezone.now() - timedelta(minutes=1))
+        Ticket.objects.filter(pk=self.tickets[0].pk).update(status='aguardando')
+        
+        expirar_vencidos()
+        self.assertPosicoesExatas()
+        
+        # Quem volta para a fila entra no fim
+        self._sair(notificado, 'na_fila')
+        self.assertPosicoesExatas()
+        self.assertEqual(Ticket.objects.select_related('demanda').get(pk=notificado.pk).posicao_fila, len(self.tickets))
+    
+    def test_proximo_notificado_segue_a_ordem_da_fila(self):
+        primeiro, segundo = self.tickets[:2]
+        
+        # O primeiro a ser criado expira e volta: agora está no fim da fila
+        self._sair(primeiro)
+        self._sair(primeiro, 'na_fila')
+        
+        self.assertEqual(notificar_proximo_da_fila(self.demanda), segundo)
+        self.assertEqual(Ticket.objects.get(pk=segundo.pk).status, 'notificado')
+        self.assertEqual(Ticket.objects.get(pk=primeiro.pk).status, 'na_fila')
+
+
+class TicketAdminChangelistTests(TestCase):
+    """
+    A listagem de envios no admin deve custar o mesmo número de consultas
+    qualquer que seja o tamanho da página.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        for i in range(10):
+            demanda = criar_demanda(concurso=f'Concurso {i}', numero_edital=f'{i}/2025')
+            criar_ticket(demanda)
+    
+    def _consultas(self, por_pagina):
+        with mock.patch.object(TicketAdmin, 'list_per_page', por_pagina):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(reverse('admin:tickets_ticket_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Edital: ', count=por_pagina)
+        return len(consultas)
+    
+    def test_consultas_nao_crescem_com_a_pagina(self):
+        self.assertEqual(self._consultas(2), self._consultas(10))
+
+
+class DashboardAdminTests(TestCase):
+    """
+    Testes do retrato em cache das estatísticas do dashboard do admin.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        cache.clear()
+        demanda = criar_demanda()
+        for status in ['na_fila', 'aguardando', 'pago', 'recusado']:
+            criar_ticket(demanda, status=status)
+    
+    def _vencer_retrato(self):
+        retrato = cache.get(dashboard.SNAPSHOT_KEY)
+        retrato['expira_em'] = 0
+        cache.set(dashboard.SNAPSHOT_KEY, retrato)
+    
+    def test_retrato_valido_nao_consulta_o_banco(self):
+        self.assertEqual(dashboard.obter_estatisticas()['total_tickets'], 4)
+        criar_ticket(criar_demanda(numero_edital='02/2025'))
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.obter_estatisticas()['total_tickets'], 4)
+    
+    def test_retrato_vencido_recalcula_uma_vez_e_libera_a_trava(self):
+        dashboard.obter_estatisticas()
+        criar_ticket(criar_demanda(numero_edital='02/2025'))
+        self._vencer_retrato()
+        
+        with mock.patch.object(dashboard, 'calcular_estatisticas', wraps=dashboard.calcular_estatisticas) as calcular:
+            self.assertEqual(dashboard.obter_estatisticas()['total_tickets'], 5)
+            self.assertEqual(dashboard.obter_estatisticas()['total_tickets'], 5)
+        
+        self.assertEqual(calcular.call_count, 1)
+        self.assertIsNone(cache.get(dashboard.TRAVA_KEY))
+    
+    def test_com_a_trava_ocupada_serve_o_retrato_anterior(self):
+        dashboard.obter_estatisticas()
+        criar_ticket(criar_demanda(numero_edital='02/2025'))
+        self._vencer_retrato()
+        
+        # Outro processo está recalculando
+        cache.add(dashboard.TRAVA_KEY, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.obter_estatisticas()['total_tickets'], 4)
+    
+    def test_sem_retrato_aguarda_o_calculo_em_andamento(self):
+        cache.add(dashboard.TRAVA_KEY, 1)
+        retrato = {'dados': {'total_tickets': 42}, 'expira_em': 0}
+        
+        # O outro processo grava o retrato durante a espera
+        def dormir(segundos):
+            cache.set(dashboard.SNAPSHOT_KEY, retrato)
+        
+        with mock.patch.object(dashboard.time, 'sleep', dormir), self.assertNumQueries(0):
+            self.assertEqual(dashboard.obter_estatisticas(), {'total_tickets': 42})
+    
+    def test_destaques_pelos_contadores_da_demanda(self):
+        outra = criar_demanda(numero_edital='02/2025', status='em_analise')
+        for _ in range(4):
+            criar_ticket(outra)
+        criar_demanda(numero_edital='03/2025', status='concluido')
+        
+        # Totais de tickets, destaques com abertos, usuários e últimos tickets
+        with self.assertNumQueries(4):
+            dados = dashboard.calcular_estatisticas()
+        
+        self.assertEqual([demanda.total_tickets for demanda in dados['top_demandas']], [4, 3, 0])
+        self.assertEqual(dados['top_demandas'][0], outra)
+        self.assertEqual(dados['concursos_abertos'], 1)
+    
+    def test_sem_retrato_e_sem_resposta_calcula_sozinho(self):
+        cache.add(dashboard.TRAVA_KEY, 1)
+        with mock.patch.object(dashboard.time, 'sleep'):
+            self.assertEqual(dashboard.obter_estatisticas(espera=0.01)['total_tickets'], 4)
+
+
+class ResumosDiariosTests(TestCase):
+    """
+    Testes dos rollups incrementais usados pelos relatórios.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demanda = criar_demanda()
+        self.tickets = [
+            criar_ticket(self.demanda, status='aguardando')
+            for _ in range(3)
+        ]
+    
+    def _linhas(self):
+        return (
+            sorted(ResumoDiario.objects.values_list('dia', 'demanda_id', 'banca', 'status', 'quantidade')),
+            sorted(ResumoPagamentoDiario.objects.values_list('dia', 'demanda_id', 'banca', 'quantidade', 'valor_total')),
+        )
+    
+    def test_incremental_igual_a_reconstrucao(self):
+        self.assertTrue(atualizar_resumos()['completo'])
+        
+        transicoes.aprovar(Ticket.objects.filter(id=self.tickets[0].id))
+        transicoes.marcar_pagos(Ticket.objects.filter(id=self.tickets[0].id))
+        
+        self.assertFalse(atualizar_resumos()['completo'])
+        incremental = self._linhas()
+        atualizar_resumos(completo=True)
+        self.assertEqual(incremental, self._linhas())
+        
+        hoje = timezone.localdate()
+        relatorio = relatorio_mensal(hoje.year, hoje.month)
+        self.assertEqual(relatorio['total_envios'], 3)
+        self.assertEqual(relatorio['total_pagamentos'], 1)
+        self.assertEqual(relatorio['total_pago'], self.demanda.valor_recompensa)
+        self.assertEqual(
+            {item['status']: item['total'] for item in relatorio['por_status'] if item['total']},
+            {'pago': 1, 'recusado': 2}
+        )
+    
+    def test_relatorio_admin_le_apenas_resumos(self):
+        atualizar_resumos()
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('admin:tickets_relatorios'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'FGV')
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if 'FROM "tickets"' in q['sql']])
+
+
+class PaginacaoApiTests(TestCase):
+    """
+    Testes da paginação por cursor e da contagem estimada da API.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        demanda = criar_demanda()
+        for _ in range(25):
+            criar_ticket(demanda)
+        self.api = APIClient()
+        self.api.force_authenticate(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+    
+    def _get(self, url):
+        return self.api.get(url)
+    
+    def test_cursor_percorre_tudo_sem_repetir(self):
+        ids = []
+        url = '/api/tickets/?paginacao=cursor'
+        while url:
+            response = self._get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        
+        esperado = list(Ticket.objects.order_by('-criado_em', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+    
+    def test_cursor_invalido(self):
+        self.assertEqual(self._get('/api/tickets/?cursor=invalido').status_code, 404)
+    
+    def test_contagem_estimada_com_filtro_e_exata(self):
+        response = self._get('/api/tickets/?contagem=estimada&status=na_fila')
+        self.assertEqual(response.data['count'], 25)
+        self.assertNotIn('count_estimado', response.data)
+
+
+class TicketSerializerCamposTests(TestCase):
+    """
+    Testes de ?fields= / ?expand= da API de tickets e do número de queries da listagem.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+    
+    def _criar_tickets(self, quantidade):
+        for i in range(quantidade):
+            demanda = criar_demanda(concurso=f'Concurso {i}', numero_edital=f'{i:02d}/2025')
+            criar_ticket(demanda)
+    
+    def _contar_queries(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len([q for q in contexto.captured_queries if 'SAVEPOINT' not in q['sql']])
+    
+    def test_queries_nao_crescem_com_as_linhas(self):
+        self._criar_tickets(2)
+        poucas = {url: self._contar_queries(url) for url in (
+            '/api/tickets/', '/api/tickets/?expand=demanda', '/api/tickets/?paginacao=cursor',
+        )}
+        self._criar_tickets(8)
+        for url, esperado in poucas.items():
+            self.assertEqual(self._contar_queries(url), esperado, url)
+    
+    def test_expand_e_fields(self):
+        self._criar_tickets(1)
+        
+        item = self.api.get('/api/tickets/').data['results'][0]
+        self.assertNotIn('demanda_detalhes', item)
+        self.assertIn('posicao_fila', item)
+        
+        item = self.api.get('/api/tickets/?expand=demanda').data['results'][0]
+        self.assertEqual(item['demanda_detalhes']['concurso'], 'Concurso 0')
+        
+        with CaptureQueriesContext(connection) as contexto:
+            item = self.api.get('/api/tickets/?fields=id,codigo_ticket,status').data['results'][0]
+        self.assertEqual(set(item), {'id', 'codigo_ticket', 'status'})
+        sql = [q['sql'] for q in contexto.captured_queries if 'tickets' in q['sql'] and 'COUNT' not in q['sql']]
+        self.assertNotIn('JOIN', sql[-1])
+        self.assertNotIn('cliente_nome', sql[-1])
+
+
+class RespostaCondicionalTests(TestCase):
+    """
+    Testes de ETag/Last-Modified na API e na página de sucesso do ticket.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.demanda = criar_demanda()
+        self.tickets = [
+            criar_ticket(self.demanda)
+            for _ in range(2)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+    
+    def _tirar_da_fila(self, ticket):
+        ticket.status = 'expirado'
+        ticket.save()
+    
+    def test_listagem_304_sem_serializar(self):
+        response = self.api.get('/api/demandas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        
+        with mock.patch('apps.concursos.serializers.DemandaSerializer.to_representation') as serializar:
+            repetida = self.api.get('/api/demandas/', HTTP_IF_NONE_MATCH=response['ETag'])
+            por_data = self.api.get('/api/demandas/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(repetida['ETag'], response['ETag'])
+        self.assertEqual(por_data.status_code, 304)
+        serializar.assert_not_called()
+        
+        self.demanda.cargo = 'Técnico'
+        self.demanda.save()
+        self.assertEqual(self.api.get('/api/demandas/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+    
+    def test_etag_muda_com_filtro_exclusao_e_fila(self):
+        etag = self.api.get('/api/tickets/')['ETag']
+        self.assertNotIn('Last-Modified', self.api.get('/api/tickets/'))
+        self.assertNotEqual(self.api.get('/api/tickets/?status=pago')['ETag'], etag)
+        
+        # O primeiro sai da fila: a posição do segundo muda
+        self._tirar_da_fila(self.tickets[0])
+        segundo = f'/api/tickets/{self.tickets[1].pk}/'
+        etag_segundo = self.api.get(segundo)['ETag']
+        nova_etag = self.api.get('/api/tickets/')['ETag']
+        self.assertNotEqual(nova_etag, etag)
+        
+        Ticket.objects.filter(pk=self.tickets[0].pk).delete()
+        self.assertNotEqual(self.api.get('/api/tickets/')['ETag'], nova_etag)
+        self.assertEqual(self.api.get(segundo, HTTP_IF_NONE_MATCH=etag_segundo).status_code, 304)
+    
+    def test_listagem_com_posicao_fila_nao_junta_a_demanda_no_agregado(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.api.get('/api/tickets/')
+        etag = response['ETag']
+        agregados = [q['sql'] for q in consultas.captured_queries if 'MAX(' in q['sql']]
+        self.assertEqual(len(agregados), 1)
+        self.assertNotIn('SUM(', agregados[0])
+        self.assertNotIn('JOIN', agregados[0])
+        
+        # Renumerar a fila não toca atualizado_em, mas troca o carimbo de versão
+        terceiro = criar_ticket(self.demanda)
+        etag = self.api.get('/api/tickets/')['ETag']
+        detalhe = f'/api/tickets/{terceiro.pk}/'
+        etag_detalhe = self.api.get(detalhe)['ETag']
+        self._tirar_da_fila(self.tickets[1])
+        self.assertNotEqual(self.api.get('/api/tickets/')['ETag'], etag)
+        self.assertEqual(self.api.get(detalhe, HTTP_IF_NONE_MATCH=etag_detalhe).status_code, 200)
+    
+    def test_pagina_por_cursor_usa_as_linhas_da_pagina(self):
+        url = '/api/tickets/?paginacao=cursor'
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        sql = ' '.join(q['sql'] for q in consultas.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('MAX(', sql)
+        
+        with mock.patch('apps.tickets.serializers.TicketSerializer.to_representation') as serializar:
+            repetida = self.api.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        serializar.assert_not_called()
+        
+        # Só campos do próprio ticket: Last-Modified da página vale
+        campos = self.api.get(f'{url}&fields=id,status')
+        self.assertEqual(
+            self.api.get(f'{url}&fields=id,status', HTTP_IF_MODIFIED_SINCE=campos['Last-Modified']).status_code, 304
+        )
+        
+        self.tickets[1].cliente_nome = 'Ana'
+        self.tickets[1].save()
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+    
+    def test_last_modified_sem_posicao_fila(self):
+        response = self.api.get('/api/tickets/?fields=id,status')
+        self.assertIn('Last-Modified', response)
+        repetida = self.api.get('/api/tickets/?fields=id,status', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repetida.status_code, 304)
+    
+    def test_pagina_de_sucesso_304_sem_renderizar(self):
+        url = reverse('ticket_success', args=[self.tickets[1].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        
+        repetida = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertTemplateNotUsed(repetida, 'public/ticket_success.html')
+        
+        self._tirar_da_fila(self.tickets[0])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class ExportacaoTicketsTests(TestCase):
+    """
+    Testes da exportação em streaming (CSV/NDJSON) pela API e pelo admin.
+    """
+    
+    def setUp(self):
+        sequencia._blocos.clear()
+        self.fgv = criar_demanda()
+        cespe = criar_demanda(
+            concurso='Concurso TJ', numero_edital='02/2025', banca='CESPE', cargo='Técnico', autarquia='TJ',
+        )
+        for demanda, nome, status in [
+            (self.fgv, 'Maria da Silva', 'pago'), (self.fgv, '=HYPERLINK("x")', 'aprovado'),
+            (self.fgv, 'João Souza', 'na_fila'), (cespe, 'Ana Lima', 'pago'),
+        ]:
+            criar_ticket(demanda, cliente_nome=nome, cliente_pix='+5511966149003', status=status)
+        self.admin = AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+    
+    def _conteudo(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig')
+    
+    def test_csv_filtrado_em_lotes(self):
+        with mock.patch('apps.tickets.exportacao.TAMANHO_LOTE', 1), \
+                CaptureQueriesContext(connection) as contexto:
+            response = self.api.get('/api/tickets/exportar/?status=pago,aprovado&banca=FGV')
+            linhas = list(csv.DictReader(io.StringIO(self._conteudo(response))))
+        
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual({linha['cliente_nome'] for linha in linhas}, {'Maria da Silva', '\'=HYPERLINK("x")'})
+        self.assertEqual({linha['cliente_pix'] for linha in linhas}, {'+5511966149003'})
+        # Um lote por linha mais o lote vazio que encerra; nenhuma query por ticket
+        lotes = [q for q in contexto.captured_queries if 'FROM "tickets"' in q['sql']]
+        self.assertEqual(len(lotes), 3)
+        self.assertTrue(all('JOIN' in q['sql'] for q in lotes))
+    
+    def test_ndjson_e_intervalo_de_datas(self):
+        hoje = timezone.localdate()
+        response = self.api.get(f'/api/tickets/exportar/?formato=ndjson&de={hoje}&ate={hoje}&banca=CESPE')
+        registros = [json.loads(linha) for linha in self._conteudo(response).splitlines()]
+        self.assertEqual([r['cliente_nome'] for r in registros], ['Ana Lima'])
+        self.assertEqual(registros[0]['banca'], 'CESPE')
+        
+        ontem = hoje - timedelta(days=1)
+        vazio = self.api.get(f'/api/tickets/exportar/?formato=ndjson&ate={ontem}')
+        self.assertEqual(self._conteudo(vazio), '')
+    
+    def test_parametros_invalidos(self):
+        for query in ('formato=xml', 'status=finalizado', 'de=31/01/2025'):
+            self.assertEqual(self.api.get(f'/api/tickets/exportar/?{query}').status_code, 400, query)
+    
+    def test_acao_do_admin(self):
+        self.client.force_login(self.admin)
+        selecionados = Ticket.objects.filter(status='pago')
+        response = self.client.post(reverse('admin:tickets_ticket_changelist'), {
+            'action': 'exportar_csv',
+            '_selected_action': [str(pk) for pk in selecionados.values_list('pk', flat=True)],
+        })
+        linhas = list(csv.DictReader(io.StringIO(self._conteudo(response))))
+        self.assertEqual(sorted(linha['codigo_ticket'] for linha in linhas),
+                         sorted(selecionados.values_list('codigo_ticket', flat=True)))
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+
+class MidiaTemporariaMixin:
+    """
+    MEDIA_ROOT num diretório temporário, apagado ao fim de cada teste.
+    """
+    
+    def setUp(self):
+        super().setUp()
+        sequencia._blocos.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+    
+    def _arquivos(self):
+        return [os.path.join(raiz, nome) for raiz, _, nomes in os.walk(self.media) for nome in nomes]
+
+
+def _enviar_prova(client, demanda, conteudo, nome='prova.pdf', content_type='application/octet-stream'):
+    """POST do formulário público de envio com a prova anexada."""
+    return client.post(reverse('ticket_novo', args=[demanda.id]), {
+        'cliente_nome': 'Maria da Silva',
+        'cliente_whatsapp': '+5511966149003',
+        'cliente_pix': 'maria@exemplo.com',
+        'aceito_termos': 'on',
+        'arquivo_prova': SimpleUploadedFile(nome, conteudo, content_type=content_type),
+    })
+
+
+class UploadProvaTests(MidiaTemporariaMixin, TestCase):
+    """
+    Testes do upload handler do arquivo da prova (tipo pelos bytes, limite de tamanho).
+    """
+    
+    def setUp(self):
+        super().setUp()
+        self.demanda = criar_demanda()
+    
+    def _enviar(self, conteudo, nome='prova.pdf', content_type='application/pdf'):
+        return _enviar_prova(self.client, self.demanda, conteudo, nome, content_type)
+    
+    def test_tipo_pelos_bytes_iniciais(self):
+        conteudo = b'\x89PNG\r\n\x1a\n' + b'x' * 1000
+        response = self._enviar(conteudo, nome='../foto.pdf', content_type='application/octet-stream')
+        
+        ticket = Ticket.objects.get()
+        self.assertRedirects(response, reverse('ticket_success', args=[ticket.id]), fetch_redirect_response=False)
+        sha256 = hashlib.sha256(conteudo).hexdigest()
+        self.assertEqual(ticket.arquivo_sha256, sha256)
+        self.assertEqual(ticket.arquivo_prova.name, f'provas/sha256/{sha256[:2]}/{sha256[2:4]}/{sha256}.png')
+        with ticket.arquivo_prova.open('rb') as arquivo:
+            self.assertEqual(arquivo.read(), conteudo)
+        self.assertEqual(len(self._arquivos()), 1)
+    
+    def test_arquivo_fica_temporario_ate_a_view_aceitar(self):
+        promover = uploads.ProvaRecebida.promover
+        antes = []
+        
+        def espiar(prova):
+            antes.extend(os.path.relpath(caminho, self.media) for caminho in self._arquivos())
+            return promover(prova)
+        
+        with mock.patch.object(uploads.ProvaRecebida, 'promover', espiar):
+            self._enviar(b'%PDF-1.4 prova nova')
+        
+        self.assertEqual(len(antes), 1)
+        self.assertTrue(antes[0].startswith(uploads.PASTA_PARCIAIS + os.sep) and antes[0].endswith('.part'))
+        ticket = Ticket.objects.get()
+        self.assertEqual(self._arquivos(), [os.path.join(self.media, ticket.arquivo_prova.name)])
+    
+    def test_reenvio_identico_guardado_uma_vez_e_sinalizado(self):
+        conteudo = b'%PDF-1.4 mesma prova'
+        self._enviar(conteudo)
+        original = Ticket.objects.get()
+        
+        outra = criar_demanda(concurso='Concurso TJ', numero_edital='02/2025', cargo='Técnico', autarquia='TJ')
+        self.demanda = outra
+        self._enviar(conteudo, nome='outro_nome.pdf')
+        
+        copia = Ticket.objects.get(demanda=outra)
+        self.assertEqual(copia.arquivo_prova.name, original.arquivo_prova.name)
+        self.assertEqual(copia.arquivo_duplicado_de, original)
+        self.assertIsNone(Ticket.objects.get(pk=original.pk).arquivo_duplicado_de)
+        self.assertEqual(len(self._arquivos()), 1)
+        
+        admin_user = AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:tickets_ticket_changelist') + '?arquivo_duplicado_de__isempty=0')
+        self.assertContains(response, f'DUPLICADO de {original.codigo_ticket}')
+        self.assertContains(response, copia.codigo_ticket)
+    
+    def test_indexar_provas_antigas(self):
+        from django.core.files.base import ContentFile
+        antigos = []
+        for _ in range(2):
+            ticket = criar_ticket(self.demanda)
+            ticket.arquivo_prova.save('antiga.pdf', ContentFile(b'%PDF-1.4 antiga'))
+            antigos.append(ticket)
+        
+        self.assertEqual(uploads.indexar_arquivos_antigos(lote=1), {'indexados': 2, 'duplicados': 1, 'ausentes': 0})
+        primeiro, segundo = (Ticket.objects.get(pk=t.pk) for t in antigos)
+        self.assertEqual(primeiro.arquivo_sha256, hashlib.sha256(b'%PDF-1.4 antiga').hexdigest())
+        self.assertEqual(segundo.arquivo_duplicado_de, primeiro)
+    
+    def test_limite_diario_de_codigos_volta_ao_formulario(self):
+        SequenciaTicket.objects.create(dia=timezone.localdate(), ultimo=sequencia.SEQUENCIAL_MAXIMO)
+        response = self._enviar(b'%PDF-1.4 prova nova')
+        self.assertContains(response, 'O limite de envios de hoje foi atingido')
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(self._arquivos(), [])
+    
+    def test_arquivo_falso_rejeitado(self):
+        response = self._enviar(b'MZ\x90\x00 executavel', content_type='application/pdf')
+        self.assertContains(response, 'Tipo de arquivo inválido')
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(self._arquivos(), [])
+    
+    @override_settings(PROVA_TAMANHO_MAXIMO_MB=1)
+    def test_arquivo_grande_interrompido(self):
+        escritas = []
+        original = uploads.ProvaUploadHandler.receive_data_chunk
+        
+        def receber(handler, raw_data, start):
+            escritas.append(start)
+            return original(handler, raw_data, start)
+        
+        with mock.patch.object(uploads.ProvaUploadHandler, 'receive_data_chunk', receber), \
+                mock.patch.object(multipartparser, 'exhaust', wraps=multipartparser.exhaust) as exhaust:
+            response = self._enviar(b'%PDF-1.4' + b'0' * (3 * 1024 * 1024))
+        
+        self.assertContains(response, 'Arquivo muito grande. Tamanho máximo: 1MB.')
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(self._arquivos(), [])
+        # Parou no primeiro pedaço acima do limite, sem ler o resto do corpo
+        self.assertLessEqual(max(escritas), 1024 * 1024)
+        exhaust.assert_not_called()
+    
+    def test_arquivo_descartado_quando_envio_tem_erro(self):
+        response = self.client.post(reverse('ticket_novo', args=[self.demanda.id]), {
+            'cliente_nome': '',
+            'arquivo_prova': SimpleUploadedFile('prova.pdf', b'%PDF-1.4 ok', content_type='application/pdf'),
+        })
+        self.assertContains(response, 'informe seu nome')
+        self.assertEqual(self._arquivos(), [])
+    
+    def test_arquivo_descartado_nos_retornos_antecipados(self):
+        self.demanda.status = 'cancelado'
+        self.demanda.save()
+        self.assertContains(self._enviar(b'%PDF-1.4 ok'), 'não está mais aceitando envios')
+        self.assertEqual(self._arquivos(), [])
+        
+        self.demanda.status = 'aberto'
+        self.demanda.save()
+        criar_ticket(self.demanda, status='aprovado')
+        self.assertContains(self._enviar(b'%PDF-1.4 ok'), 'já possui uma prova aprovada')
+        self.assertEqual(self._arquivos(), [])
+        
+        # Link de upload que não vale mais e prazo vencido
+        for status, prazo in [('na_fila', None), ('notificado', timezone.now() - timedelta(minutes=1))]:
+            ticket = criar_ticket(criar_demanda(numero_edital=f'{status}/2025'), status=status, prazo_envio=prazo)
+            response = self.client.post(reverse('ticket_upload', args=[ticket.id]), {
+                'arquivo_prova': SimpleUploadedFile('prova.pdf', b'%PDF-1.4 ok', content_type='application/pdf'),
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self._arquivos(), [])
+    
+    def test_recusa_nao_apaga_o_mesmo_conteudo_de_outro_envio(self):
+        conteudo = b'%PDF-1.4 mesma prova'
+        self._enviar(conteudo)
+        guardado = self._arquivos()
+        
+        # Mesmo arquivo num envio com erro: só o .part deste request some
+        response = self.client.post(reverse('ticket_novo', args=[self.demanda.id]), {
+            'cliente_nome': '',
+            'arquivo_prova': SimpleUploadedFile('prova.pdf', conteudo, content_type='application/pdf'),
+        })
+        self.assertContains(response, 'informe seu nome')
+        self.assertEqual(self._arquivos(), guardado)
+    
+    def test_upload_apos_notificacao(self):
+        ticket = criar_ticket(self.demanda, status='notificado', prazo_envio=timezone.now() + timedelta(hours=1))
+        response = self.client.post(reverse('ticket_upload', args=[ticket.id]), {
+            'arquivo_prova': SimpleUploadedFile('prova.jpg', b'\xff\xd8\xff\xe0 jpeg', content_type='image/png'),
+        })
+        self.assertEqual(response.status_code, 302)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'em_analise')
+        self.assertTrue(ticket.arquivo_prova.name.endswith('.jpg'))
+
+
+def _foto(semente, tamanho=(400, 300)):
+    """JPEG sintético com formas aleatórias (determinístico pela semente)."""
+    aleatorio = random.Random(semente)
+    imagem = Image.new('RGB', tamanho, 'white')
+    desenho = ImageDraw.Draw(imagem)
+    for _ in range(40):
+        x, y = aleatorio.randrange(tamanho[0]), aleatorio.randrange(tamanho[1])
+        cor = tuple(aleatorio.randrange(256) for _ in range(3))
+        desenho.rectangle([x, y, x + aleatorio.randrange(20, 150), y + aleatorio.randrange(20, 150)], fill=cor)
+    return imagem
+
+
+def _jpeg(imagem, qualidade=90):
+    saida = io.BytesIO()
+    imagem.save(saida, 'JPEG', quality=qualidade)
+    return saida.getvalue()
+
+
+class SemelhancaProvasTests(MidiaTemporariaMixin, TestCase):
+    """
+    Testes do hash perceptual (dHash) e do índice por distância de Hamming.
+    """
+    
+    def setUp(self):
+        super().setUp()
+        semelhanca._indice = semelhanca.IndiceHamming()
+        semelhanca._indexados = {}
+        semelhanca._ultimo_em = None
+    
+    def _distancia(self, a, b):
+        return (a ^ b).bit_count()
+    
+    def test_dhash_tolera_recompressao_e_recorte(self):
+        original = _foto(1)
+        base = semelhanca.dhash(Image.open(io.BytesIO(_jpeg(original))))
+        
+        recomprimida = Image.open(io.BytesIO(_jpeg(original.resize((300, 225)), qualidade=30)))
+        recortada = original.crop((6, 4, 394, 296))
+        self.assertLessEqual(self._distancia(base, semelhanca.dhash(recomprimida)), 8)
+        self.assertLessEqual(self._distancia(base, semelhanca.dhash(recortada)), 8)
+        self.assertGreater(self._distancia(base, semelhanca.dhash(_foto(2))), 8)
+        self.assertIsNone(semelhanca.dhash(Image.new('RGB', (50, 50), 'white')))
+    
+    def test_indice_igual_a_busca_exaustiva(self):
+        aleatorio = random.Random(7)
+        valores = [aleatorio.getrandbits(64) for _ in range(3000)]
+        # Vizinhos plantados a 1..10 bits do primeiro valor
+        for bits in range(1, 11):
+            vizinho = valores[0]
+            for bit in aleatorio.sample(range(64), bits):
+                vizinho ^= 1 << bit
+            valores.append(vizinho)
+        
+        indice = semelhanca.IndiceHamming()
+        for chave, valor in enumerate(valores):
+            indice.adicionar(valor, chave)
+        
+        for consulta in (valores[0], valores[5], aleatorio.getrandbits(64)):
+            for raio in (0, 3, 8, 10):
+                esperado = sorted(
+                    (self._distancia(consulta, valor), chave)
+                    for chave, valor in enumerate(valores)
+                    if self._distancia(consulta, valor) <= raio
+                )
+                self.assertEqual(indice.buscar(consulta, raio), esperado)
+    
+    def test_indice_recebe_hash_gravado_depois_em_ticket_antigo(self):
+        demanda = criar_demanda()
+        antigo, recente = criar_ticket(demanda), criar_ticket(demanda)
+        
+        def gravar_hash(ticket, valor):
+            Ticket.objects.filter(pk=ticket.pk).update(arquivo_dhash=semelhanca.para_banco(valor), arquivo_dhash_em=Now())
+        
+        gravar_hash(recente, 0xF0F0F0F0F0F0F0F0)
+        self.assertEqual(semelhanca.semelhantes(0xF0F0F0F0F0F0F0F0, raio=0), [(0, recente.pk)])
+        
+        # O índice já passou do id do antigo quando o hash dele é gravado
+        gravar_hash(antigo, 0x0F0F0F0F0F0F0F0F)
+        self.assertEqual(semelhanca.semelhantes(0x0F0F0F0F0F0F0F0F, raio=0), [(0, antigo.pk)])
+        
+        # Prova trocada: o hash antigo sai do índice
+        gravar_hash(recente, 0xFF00FF00FF00FF00)
+        self.assertEqual(semelhanca.semelhantes(0xF0F0F0F0F0F0F0F0, raio=0), [])
+        self.assertEqual(semelhanca.semelhantes(0xFF00FF00FF00FF00, raio=0), [(0, recente.pk)])
+        self.assertEqual(len(semelhanca._indice), 2)
+    
+    def test_conversao_para_bigint_com_sinal(self):
+        for valor in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+            armazenado = semelhanca.para_banco(valor)
+            self.assertTrue(-(1 << 63) <= armazenado < (1 << 63))
+            self.assertEqual(semelhanca.do_banco(armazenado), valor)
+    
+    def test_reenvio_de_foto_recomprimida_e_em_pdf(self):
+        demandas = [
+            criar_demanda(concurso=f'Concurso {i}', numero_edital=f'0{i}/2025')
+            for i in range(4)
+        ]
+        foto = _foto(3)
+        _enviar_prova(self.client, demandas[0], _jpeg(foto), 'prova.jpg')
+        _enviar_prova(self.client, demandas[1], _jpeg(foto.resize((320, 240)), qualidade=35), 'prova2.jpg')
+        pdf = b'%PDF-1.4\n1 0 obj << /Filter /DCTDecode >> stream\n' + _jpeg(foto, qualidade=60) + b'\nendstream\n%%EOF'
+        _enviar_prova(self.client, demandas[2], pdf, 'prova.pdf')
+        _enviar_prova(self.client, demandas[3], _jpeg(_foto(4)), 'outra.jpg')
+        
+        original, recomprimida, em_pdf, outra = (Ticket.objects.get(demanda=d) for d in demandas)
+        self.assertIsNotNone(original.arquivo_dhash)
+        self.assertIsNone(original.arquivo_semelhante_a)
+        self.assertEqual(recomprimida.arquivo_semelhante_a, original)
+        self.assertLessEqual(recomprimida.arquivo_distancia, 8)
+        self.assertIn(em_pdf.arquivo_semelhante_a, (original, recomprimida))
+        self.assertIsNone(outra.arquivo_semelhante_a)
+        
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        response = self.client.get(reverse('admin:tickets_ticket_changelist'))
+        self.assertContains(response, f'SEMELHANTE a {original.codigo_ticket}')
+
+
+class MiniaturasTests(MidiaTemporariaMixin, TestCase):
+    """
+    Testes da geração de miniaturas fora do request e da exibição no admin.
+    """
+    
+    def setUp(self):
+        super().setUp()
+        self.demandas = [
+            criar_demanda(concurso=f'Concurso {i}', numero_edital=f'0{i}/2025')
+            for i in range(3)
+        ]
+    
+    def _enviar(self, demanda, conteudo, nome):
+        _enviar_prova(self.client, demanda, conteudo, nome)
+        return Ticket.objects.get(demanda=demanda)
+    
+    def _miniatura(self, sha256, sufixo):
+        return os.path.join(self.media, miniaturas.caminho_miniatura(sha256, sufixo))
+    
+    def test_gera_fora_do_request_e_reaproveita_arquivo_identico(self):
+        foto = _jpeg(_foto(5, tamanho=(1600, 1200)))
+        ticket = self._enviar(self.demandas[0], foto, 'prova.jpg')
+        sem_imagem = self._enviar(self.demandas[1], b'%PDF-1.4\n' + b'x' * 500 + b'\n%%EOF', 'prova.pdf')
+        
+        # O envio só deixa a miniatura pendente
+        self.assertEqual(ticket.miniatura_status, 'pendente')
+        self.assertFalse(os.path.exists(self._miniatura(ticket.arquivo_sha256, '160')))
+        
+        resultado = miniaturas.processar_pendentes()
+        self.assertEqual(resultado, {'prontas': 1, 'indisponiveis': 1})
+        ticket.refresh_from_db()
+        sem_imagem.refresh_from_db()
+        self.assertEqual(ticket.miniatura_status, 'pronta')
+        self.assertEqual(sem_imagem.miniatura_status, 'indisponivel')
+        for sufixo, lado in (('160', 160), ('800', 800)):
+            with Image.open(self._miniatura(ticket.arquivo_sha256, sufixo)) as imagem:
+                self.assertEqual(imagem.format, 'WEBP')
+                self.assertEqual(max(imagem.size), lado)
+        
+        # Mesmo arquivo em outro envio: as miniaturas já existem
+        gravadas = os.path.getmtime(self._miniatura(ticket.arquivo_sha256, '160'))
+        reenvio = self._enviar(self.demandas[2], foto, 'copia.jpg')
+        self.assertEqual(reenvio.arquivo_sha256, ticket.arquivo_sha256)
+        with mock.patch.object(miniaturas, 'carregar_imagem') as carregar:
+            self.assertEqual(miniaturas.processar_pendentes(), {'prontas': 1, 'indisponiveis': 0})
+        carregar.assert_not_called()
+        reenvio.refresh_from_db()
+        self.assertEqual(reenvio.miniatura_status, 'pronta')
+        self.assertEqual(os.path.getmtime(self._miniatura(ticket.arquivo_sha256, '160')), gravadas)
+    
+    def test_admin_mostra_miniatura_e_previa(self):
+        ticket = self._enviar(self.demandas[0], _jpeg(_foto(6)), 'prova.jpg')
+        self.client.force_login(AdminUser.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        
+        response = self.client.get(reverse('admin:tickets_ticket_changelist'))
+        self.assertNotContains(response, '_160.webp')
+        self.assertContains(response, 'Ver Prova')
+        
+        miniaturas.processar_pendentes()
+        response = self.client.get(reverse('admin:tickets_ticket_changelist'))
+        self.assertContains(response, miniaturas.caminho_miniatura(ticket.arquivo_sha256, '160'))
+        response = self.client.get(reverse('admin:tickets_ticket_change', args=[ticket.id]))
+        self.assertContains(response, miniaturas.caminho_miniatura(ticket.arquivo_sha256, '800'))
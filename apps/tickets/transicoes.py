@@ -0,0 +1,152 @@
+"""
+Transições de status em massa para as ações do admin.
+
+Em vez de ticket.save() / demanda.save() linha a linha, cada transição é um
+UPDATE por grupo de tickets, com os contadores das demandas ajustados por
+demanda (aplicar_transicao_em_lote). Como queryset.update() e bulk_update()
+não disparam signals, a home em cache é invalidada aqui.
+"""
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from apps.concursos.cache import invalidar_cache_home
+from apps.concursos.contadores import STATUS_PENDENTES, aplicar_transicao_em_lote
+from apps.concursos.models import Demanda
+from .models import Ticket
+
+
+def _ajustar_contadores(linhas, novo_status):
+    """
+    Ajusta os contadores das demandas para as linhas (id, demanda_id, status)
+    que passaram para novo_status, agrupando por status anterior.
+    """
+    por_status = {}
+    for _, demanda_id, status in linhas:
+        por_status.setdefault(status, Counter())[demanda_id] += 1
+    for status, quantidades in por_status.items():
+        aplicar_transicao_em_lote(quantidades, status, novo_status)
+
+
+def transicionar(queryset, status_origem, novo_status, **campos):
+    """
+    Move para novo_status os tickets do queryset que estão em status_origem.
+    
+    Args:
+        queryset: tickets candidatos
+        status_origem: lista de status aceitos para a transição
+        novo_status: status de destino
+        **campos: demais campos gravados no mesmo UPDATE (ex.: analisado_em)
+    
+    Returns:
+        list: (id, demanda_id, status_anterior) dos tickets alterados
+    """
+    with transaction.atomic():
+        linhas = list(
+            queryset.filter(status__in=status_origem)
+            .order_by()
+            .select_for_update()
+            .values_list('id', 'demanda_id', 'status')
+        )
+        if not linhas:
+            return []
+        
+        Ticket.objects.filter(id__in=[linha[0] for linha in linhas]).update(
+            status=novo_status,
+            atualizado_em=timezone.now(),
+            **campos
+        )
+        _ajustar_contadores(linhas, novo_status)
+    
+    transaction.on_commit(invalidar_cache_home)
+    return linhas
+
+
+def atualizar_status_demandas(demanda_ids, status):
+    """Altera o status de várias demandas em um único UPDATE."""
+    if not demanda_ids:
+        return 0
+    total = Demanda.objects.filter(id__in=list(demanda_ids)).update(
+        status=status,
+        atualizado_em=timezone.now()
+    )
+    transaction.on_commit(invalidar_cache_home)
+    return total
+
+
+def aprovar(queryset):
+    """
+    Aprova os envios aguardando ou em análise.
+    
+    Returns:
+        int: número de provas aprovadas
+    """
+    return len(transicionar(queryset, STATUS_PENDENTES, 'aprovado', analisado_em=timezone.now()))
+
+
+def recusar(queryset, motivo):
+    """
+    Recusa os envios aguardando ou em análise e devolve suas demandas para 'aberto'.
+    
+    Returns:
+        list: (id, demanda_id, status_anterior) dos tickets recusados
+    """
+    with transaction.atomic():
+        linhas = transicionar(
+            queryset,
+            STATUS_PENDENTES,
+            'recusado',
+            analisado_em=timezone.now(),
+            observacoes_admin=f"Recusado: {motivo}"
+        )
+        atualizar_status_demandas({demanda_id for _, demanda_id, _ in linhas}, 'aberto')
+    return linhas
+
+
+def marcar_pagos(queryset):
+    """
+    Marca como pagos os tickets aprovados, conclui suas demandas e recusa os
+    demais envios (aguardando, em análise) dessas demandas.
+    
+    Returns:
+        tuple: (tickets pagos, outros tickets das demandas concluídas). Os
+        outros incluem os já recusados, que também recebem o aviso de encerramento.
+    """
+    agora = timezone.now()
+    
+    with transaction.atomic():
+        pagos = list(
+            queryset.filter(status='aprovado')
+            .order_by()
+            .select_for_update()
+            .select_related('demanda')
+        )
+        if not pagos:
+            return [], []
+        
+        # aprovado -> pago não altera contadores (ambos contam como aprovados)
+        for ticket in pagos:
+            ticket.status = 'pago'
+            ticket.pago_em = agora
+            ticket.atualizado_em = agora
+            if not ticket.valor_pago:
+                ticket.valor_pago = ticket.demanda.valor_recompensa
+        Ticket.objects.bulk_update(pagos, ['status', 'pago_em', 'valor_pago', 'atualizado_em'])
+        
+        demanda_ids = {ticket.demanda_id for ticket in pagos}
+        atualizar_status_demandas(demanda_ids, 'concluido')
+        
+        outros = list(
+            Ticket.objects.filter(
+                demanda_id__in=demanda_ids,
+                status__in=STATUS_PENDENTES + ['recusado']
+            ).select_related('demanda')
+        )
+        transicionar(
+            Ticket.objects.filter(id__in=[ticket.id for ticket in outros]),
+            STATUS_PENDENTES,
+            'recusado',
+            analisado_em=agora,
+            observacoes_admin='Demanda encerrada - outra prova foi selecionada'
+        )
+    
+    return pagos, outros
@@ -0,0 +1,315 @@
+"""
+Recebimento do arquivo da prova durante o parsing do multipart.
+
+O ProvaUploadHandler valida o arquivo_prova enquanto os bytes chegam:
+identifica PDF/JPEG/PNG pelos bytes iniciais (o content_type enviado pelo
+navegador é ignorado) e interrompe ao passar de PROVA_TAMANHO_MAXIMO_MB.
+Arquivo falso ou grande demais é descartado no primeiro pedaço inválido,
+sem ocupar memória nem disco. Do arquivo falso, o resto é lido e jogado
+fora (os campos seguintes do formulário continuam sendo lidos). Já o arquivo
+grande demais encerra a leitura do corpo (StopUpload com connection_reset):
+os bytes restantes não são lidos, nem os campos que vierem depois dele.
+
+Os pedaços aceitos são gravados num arquivo .part em provas/tmp e entram
+no SHA-256 ao mesmo tempo. O arquivo só sai de lá quando a view aceita o
+envio: ProvaRecebida.promover() o move (rename, sem cópia) para o endereço
+do conteúdo:
+
+    provas/sha256/ab/cd/abcd...<hash>.pdf
+
+Se a view não promove o arquivo (erro de validação, retorno antecipado ou
+exceção), o decorator receber_prova chama descartar() ao fim do request,
+que apaga apenas o .part deste request. Nada é apagado do endereço do
+conteúdo, então não há corrida com outro envio do mesmo arquivo.
+Um arquivo reenviado (mesma prova para vários concursos ou por várias
+pessoas) já existe nesse caminho e não é gravado de novo. O hash fica em
+Ticket.arquivo_sha256 (indexado), e `original_da_prova` encontra o
+primeiro envio com o mesmo arquivo para o admin sinalizar a duplicata.
+
+As views públicas usam o decorator `receber_prova` e, ao final, chamam
+`erro_da_prova(request)` para exibir o motivo da rejeição.
+"""
+import hashlib
+import os
+import uuid
+from functools import wraps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers, StopUpload
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+CAMPO_PROVA = 'arquivo_prova'
+
+PASTA_CONTEUDO = 'provas/sha256'
+PASTA_PARCIAIS = 'provas/tmp'
+
+# (bytes iniciais, content type, extensão)
+ASSINATURAS = [
+    (b'%PDF-', 'application/pdf', '.pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+]
+BYTES_ASSINATURA = max(len(assinatura) for assinatura, _, _ in ASSINATURAS)
+
+ERRO_TIPO = 'Tipo de arquivo inválido. Envie PDF, JPG ou PNG.'
+
+
+def tamanho_maximo():
+    return settings.PROVA_TAMANHO_MAXIMO_MB * 1024 * 1024
+
+
+def detectar_tipo(cabecalho):
+    """
+    Retorna (content_type, extensão) pelos bytes iniciais, ou None.
+    """
+    for assinatura, content_type, extensao in ASSINATURAS:
+        if cabecalho.startswith(assinatura):
+            return content_type, extensao
+    return None
+
+
+def caminho_do_conteudo(sha256, extensao):
+    """
+    Caminho no storage para o conteúdo com este hash (2 níveis de pastas).
+    """
+    return f'{PASTA_CONTEUDO}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao}'
+
+
+def original_da_prova(sha256, exceto=None):
+    """
+    Primeiro envio com exatamente este arquivo, ou None.
+    """
+    from .models import Ticket
+    
+    if not sha256:
+        return None
+    envios = Ticket.objects.filter(arquivo_sha256=sha256)
+    if exceto is not None:
+        envios = envios.exclude(pk=exceto)
+    return envios.order_by('criado_em', 'id').first()
+
+
+def indexar_arquivos_antigos(lote=200):
+    """
+    Calcula o SHA-256 das provas gravadas antes do endereçamento por
+    conteúdo e marca as duplicatas. Os arquivos continuam onde estão.
+    
+    Returns:
+        dict: {'indexados', 'duplicados', 'ausentes'}
+    """
+    from .models import Ticket
+    
+    resultado = {'indexados': 0, 'duplicados': 0, 'ausentes': 0}
+    pendentes = (
+        Ticket.objects.filter(arquivo_sha256='')
+        .exclude(arquivo_prova='').exclude(arquivo_prova__isnull=True)
+        .only('id', 'arquivo_prova')
+        .order_by('id')
+    )
+    # Por chave: arquivos ausentes continuam sem hash e não podem voltar ao lote
+    ultimo_id = 0
+    while True:
+        tickets = list(pendentes.filter(id__gt=ultimo_id)[:lote])
+        if not tickets:
+            return resultado
+        for ticket in tickets:
+            try:
+                with default_storage.open(ticket.arquivo_prova.name, 'rb') as arquivo:
+                    resumo = hashlib.sha256()
+                    for pedaco in arquivo.chunks():
+                        resumo.update(pedaco)
+            except FileNotFoundError:
+                resultado['ausentes'] += 1
+                continue
+            sha256 = resumo.hexdigest()
+            original = original_da_prova(sha256, exceto=ticket.pk)
+            Ticket.objects.filter(pk=ticket.pk).update(arquivo_sha256=sha256, arquivo_duplicado_de=original)
+            resultado['indexados'] += 1
+            resultado['duplicados'] += original is not None
+        ultimo_id = tickets[-1].id
+
+
+class ProvaRecebida(UploadedFile):
+    """
+    Prova recebida pelo handler, ainda no arquivo temporário (.part).
+    
+    A view chama promover() ao aceitar o envio e atribui o caminho
+    retornado ao FileField (não o objeto), assim o arquivo não é copiado de
+    novo no save(). Sem promoção, receber_prova chama descartar().
+    """
+    
+    def __init__(self, parcial, content_type, tamanho, sha256, extensao):
+        self.caminho = caminho_do_conteudo(sha256, extensao)
+        super().__init__(None, os.path.basename(self.caminho), content_type, tamanho)
+        self.parcial = parcial
+        self.sha256 = sha256
+        self.promovida = False
+    
+    def open(self, mode='rb'):
+        self.file = default_storage.open(self.caminho if self.promovida else self.parcial, mode)
+        return self
+    
+    def promover(self):
+        """
+        Move o .part para o endereço do conteúdo e retorna esse caminho.
+        Se o conteúdo já estava guardado, só remove o .part.
+        """
+        if not self.promovida:
+            if default_storage.exists(self.caminho):
+                default_storage.delete(self.parcial)
+            else:
+                final = default_storage.path(self.caminho)
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                # Dois uploads simultâneos do mesmo conteúdo gravam bytes iguais
+                os.replace(default_storage.path(self.parcial), final)
+            self.promovida = True
+        return self.caminho
+    
+    def descartar(self):
+        """
+        Remove o .part de um envio recusado. Não mexe no endereço do
+        conteúdo, que pode ser usado por outros envios.
+        """
+        if not self.promovida:
+            default_storage.delete(self.parcial)
+
+
+class ProvaUploadHandler(FileUploadHandler):
+    """
+    Upload handler do campo arquivo_prova (ver docstring do módulo).
+    
+    Os demais campos de arquivo seguem para os handlers padrão.
+    """
+    
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.erro = None
+        self.ativo = False
+        self.prova = None
+    
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.ativo = field_name == CAMPO_PROVA
+        if not self.ativo:
+            return
+        
+        self.erro = None
+        self.cabecalho = b''
+        self.tipo = None
+        self.hash = hashlib.sha256()
+        self.parcial = None
+        # Não é `self.file`: o parser fecha handler.file por conta própria
+        self.destino = None
+        raise StopFutureHandlers()
+    
+    def receive_data_chunk(self, raw_data, start):
+        if not self.ativo:
+            return raw_data
+        
+        if start + len(raw_data) > tamanho_maximo():
+            self._rejeitar(
+                f'Arquivo muito grande. Tamanho máximo: {settings.PROVA_TAMANHO_MAXIMO_MB}MB.',
+                interromper=True
+            )
+        
+        if self.destino is None:
+            # Pedaços muito pequenos: junta até ter bytes para comparar
+            self.cabecalho += raw_data
+            if len(self.cabecalho) < BYTES_ASSINATURA:
+                return None
+            self._abrir_destino(self.cabecalho)
+            raw_data, self.cabecalho = self.cabecalho, b''
+        
+        self.hash.update(raw_data)
+        self.destino.write(raw_data)
+        return None
+    
+    def file_complete(self, file_size):
+        if not self.ativo:
+            return None
+        self.ativo = False
+        
+        if self.destino is None:
+            # Terminou antes de completar a assinatura (vazio ou minúsculo)
+            if not self.cabecalho or not detectar_tipo(self.cabecalho):
+                self.erro = ERRO_TIPO
+                return None
+            self._abrir_destino(self.cabecalho)
+            self.hash.update(self.cabecalho)
+            self.destino.write(self.cabecalho)
+        
+        self.destino.close()
+        content_type, extensao = self.tipo
+        self.prova = ProvaRecebida(self.parcial, content_type, file_size, self.hash.hexdigest(), extensao)
+        return self.prova
+    
+    def upload_interrupted(self):
+        # Conexão caiu no meio do arquivo
+        if self.ativo:
+            self._remover_parcial()
+            self.ativo = False
+    
+    def _abrir_destino(self, cabecalho):
+        self.tipo = detectar_tipo(cabecalho)
+        if self.tipo is None:
+            self._rejeitar(ERRO_TIPO)
+        
+        self.parcial = f'{PASTA_PARCIAIS}/{uuid.uuid4().hex}.part'
+        caminho = default_storage.path(self.parcial)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.destino = open(caminho, 'xb')
+    
+    def _rejeitar(self, erro, interromper=False):
+        """
+        Descarta o arquivo. Com `interromper`, para de ler o corpo do request
+        em vez de ler e jogar fora o resto do arquivo.
+        """
+        self.erro = erro
+        self._remover_parcial()
+        self.ativo = False
+        if interromper:
+            raise StopUpload(connection_reset=True)
+        raise SkipFile()
+    
+    def _remover_parcial(self):
+        if self.destino is not None:
+            self.destino.close()
+            default_storage.delete(self.parcial)
+
+
+def receber_prova(view):
+    """
+    Instala o ProvaUploadHandler antes de o corpo do POST ser lido.
+    
+    O CsrfViewMiddleware lê request.POST antes da view, o que fixaria os
+    handlers padrão; por isso a checagem de CSRF passa para dentro daqui.
+    Ao fim do request, a prova que a view não promoveu é descartada.
+    """
+    protegida = csrf_protect(view)
+    
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return protegida(request, *args, **kwargs)
+        
+        handler = ProvaUploadHandler(request)
+        request.upload_handlers.insert(0, handler)
+        try:
+            return protegida(request, *args, **kwargs)
+        finally:
+            if handler.prova is not None:
+                handler.prova.descartar()
+    
+    return wrapper
+
+
+def erro_da_prova(request):
+    """
+    Motivo da rejeição do arquivo_prova neste request, ou None.
+    """
+    for handler in request.upload_handlers:
+        if isinstance(handler, ProvaUploadHandler):
+            return handler.erro
+    return None
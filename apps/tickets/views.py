@@ -3,11 +3,19 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
+from apps.concursos.cache import versao_atual
+from apps.concursos.condicional import RespostaCondicionalMixin
+from apps.concursos.paginacao import PaginacaoApi
+from .exportacao import FORMATOS, FiltroInvalido, filtrar_tickets, resposta_exportacao
 from .models import Ticket
+from apps.concursos.serializers import campos_pedidos
 from .serializers import TicketSerializer, TicketCreateSerializer
 
+# Campos da resposta que mudam sem alterar Ticket.atualizado_em
+CAMPOS_FORA_DO_TICKET = {'sequencia_fila', 'posicao_fila', 'demanda_detalhes'}
 
-class TicketViewSet(viewsets.ModelViewSet):
+
+class TicketViewSet(RespostaCondicionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD completo de Tickets.
     
@@ -18,13 +26,74 @@ class TicketViewSet(viewsets.ModelViewSet):
     PATCH /api/tickets/{id}/ - Atualização parcial
     DELETE /api/tickets/{id}/ - Remove ticket
     POST /api/tickets/{id}/finalizar/ - Finaliza ticket
+    GET /api/tickets/exportar/ - Exporta tickets em CSV ou NDJSON
+    
+    Listagem e detalhe respondem 304 a GETs condicionais (ETag/Last-Modified).
     """
     queryset = Ticket.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacaoApi
     filterset_fields = ['demanda', 'status']
     search_fields = ['codigo_ticket', 'cliente_nome']
     ordering_fields = ['criado_em', 'status']
     
+    def get_queryset(self):
+        """
+        Carrega só o que o serializer vai usar: JOIN com a demanda quando
+        posicao_fila ou ?expand=demanda pedem, e apenas as colunas dos
+        campos escolhidos em ?fields= nas leituras.
+        """
+        queryset = Ticket.objects.all()
+        serializer_class = self.get_serializer_class()
+        if serializer_class is not TicketSerializer:
+            return queryset
+        
+        # criado_em: chave da paginação por cursor; atualizado_em: validadores
+        colunas = {'id', 'criado_em', 'atualizado_em'}
+        for campo in self._campos():
+            colunas.update(serializer_class.colunas.get(campo, [campo]))
+        
+        if any(coluna.startswith('demanda__') for coluna in colunas):
+            queryset = queryset.select_related('demanda')
+            colunas.add('demanda')
+        
+        if self.request.method == 'GET':
+            queryset = queryset.only(*colunas)
+        return queryset
+    
+    def _campos(self):
+        if self.request.method == 'GET':
+            return campos_pedidos(TicketSerializer, self.request)
+        return set(TicketSerializer.Meta.fields)
+    
+    def _muda_sem_atualizado_em(self):
+        # A fila anda (e é renumerada) por UPDATE, e a demanda tem o próprio
+        # atualizado_em: nada disso toca o atualizado_em do ticket
+        return bool(self._campos() & CAMPOS_FORA_DO_TICKET)
+    
+    def _com_versao(self, estado):
+        if self._muda_sem_atualizado_em():
+            estado['versao'] = versao_atual()
+        return estado
+    
+    def estado_lista(self, queryset):
+        return self._com_versao(super().estado_lista(queryset))
+    
+    def estado_pagina(self, itens):
+        return self._com_versao(super().estado_pagina(itens))
+    
+    def estado_objeto(self, obj):
+        estado = super().estado_objeto(obj)
+        campos = self._campos()
+        if campos & {'sequencia_fila', 'posicao_fila'}:
+            estado['fila'] = (obj.sequencia_fila, obj.posicao_fila)
+        if 'demanda_detalhes' in campos:
+            estado['ultima_demanda'] = obj.demanda.atualizado_em
+        return estado
+    
+    def last_modified_confiavel(self):
+        return not self._muda_sem_atualizado_em()
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return TicketCreateSerializer
@@ -67,10 +136,37 @@ class TicketViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        tickets = Ticket.objects.filter(
+        tickets = self.get_queryset().filter(
             demanda_id=demanda_id,
             status='aguardando'
         ).order_by('criado_em')
         
         serializer = self.get_serializer(tickets, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta tickets em streaming (CSV ou NDJSON).
+        
+        GET /api/tickets/exportar/?formato=csv&status=aprovado,pago&banca=FGV&de=2025-01-01&ate=2025-01-31
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response(
+                {'error': f"formato deve ser {' ou '.join(FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            tickets = filtrar_tickets(
+                Ticket.objects.all(),
+                status=request.query_params.get('status'),
+                banca=request.query_params.get('banca'),
+                de=request.query_params.get('de'),
+                ate=request.query_params.get('ate'),
+            )
+        except FiltroInvalido as erro:
+            return Response({'error': str(erro)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return resposta_exportacao(tickets, formato)
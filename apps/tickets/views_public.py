@@ -1,10 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
+from django.db import transaction
 from django.http import HttpResponse
 from apps.concursos.models import Demanda
 from apps.tickets.models import Ticket
 from apps.tickets.notifications import enviar_email_fila, gerar_link_whatsapp_fila
-import urllib.parse
+from apps.tickets.mensagens import renderizar_ticket, link_whatsapp
+from apps.concursos.condicional import gerar_etag, responder_condicional
+from apps.tickets.uploads import erro_da_prova, original_da_prova, receber_prova
+from apps.tickets.semelhanca import registrar_semelhanca
+from apps.tickets.sequencia import SequenciaEsgotada, gerar_codigo_ticket
 import logging
 import pytz
 import os
@@ -27,29 +32,11 @@ def enviar_mensagem_whatsapp(numero, ticket):
     Gera link do WhatsApp para enviar mensagem automática.
     Retorna URL que pode ser usada para redirecionar ou abrir em nova aba.
     """
-    mensagem = f"""🎯 *COMCURSANDO*
-
-Olá! Recebemos sua prova do concurso *{ticket.demanda.concurso}*.
-
-📋 *Código do envio:* {ticket.codigo_ticket}
-✅ *Status:* Aguardando análise
-
-Estamos analisando sua prova. Caso seja aprovada, entraremos em contato e enviaremos o pagamento via PIX.
-
-Qualquer dúvida, responda esta mensagem!
-
-Obrigado! 🚀"""
-    
-    # Número da empresa
-    numero_empresa = "5511966149003"
-    mensagem_encoded = urllib.parse.quote(mensagem)
-    
     # Link do WhatsApp Web (não envia automaticamente, só abre conversa)
-    whatsapp_url = f"https://wa.me/{numero}?text={mensagem_encoded}"
-    
-    return whatsapp_url
+    return link_whatsapp(numero, renderizar_ticket(ticket, 'recebida').whatsapp)
 
 
+@receber_prova
 def ticket_novo_view(request, demanda_id):
     """
     View para enviar prova de concurso ou entrar na fila.
@@ -72,16 +59,10 @@ def ticket_novo_view(request, demanda_id):
         })
     
     # Verificar se existe alguém já enviando prova (em análise ou aguardando)
-    tem_prova_em_analise = Ticket.objects.filter(
-        demanda=demanda,
-        status__in=['aguardando', 'em_analise']
-    ).exists()
+    tem_prova_em_analise = demanda.envios_pendentes > 0
     
     # Verificar total na fila
-    total_na_fila = Ticket.objects.filter(
-        demanda=demanda,
-        status__in=['na_fila', 'notificado', 'aguardando', 'em_analise']
-    ).count()
+    total_na_fila = demanda.total_na_fila
     
     if request.method == 'POST':
         cliente_nome = request.POST.get('cliente_nome', '').strip()
@@ -118,21 +99,18 @@ def ticket_novo_view(request, demanda_id):
                 errors.append('WhatsApp inválido. Formato esperado: +5511966149003 (código país + DDD + número)')
             
             # VERIFICAR SE JÁ EXISTE ENVIO DESTE WHATSAPP PARA ESTA DEMANDA
-            envio_existente = Ticket.objects.filter(
+            envio_existente = Ticket.objects.select_related('demanda').filter(
                 demanda=demanda,
                 cliente_whatsapp=cliente_whatsapp,
                 status__in=['na_fila', 'notificado', 'aguardando', 'em_analise', 'aprovado']
             ).first()
             
             if envio_existente:
-                # Calcular posição na fila
-                posicao = Ticket.objects.filter(
-                    demanda=demanda,
-                    status__in=['na_fila', 'notificado', 'aguardando', 'em_analise'],
-                    criado_em__lt=envio_existente.criado_em
-                ).count() + 1
-                
-                errors.append(f'Você já enviou uma prova para este concurso! Código: {envio_existente.codigo_ticket}. Posição na fila: {posicao}º')
+                mensagem = f'Você já enviou uma prova para este concurso! Código: {envio_existente.codigo_ticket}.'
+                posicao = envio_existente.posicao_fila
+                if posicao:
+                    mensagem += f' Posição na fila: {posicao}º'
+                errors.append(mensagem)
         
         if not cliente_pix:
             errors.append('Por favor, informe sua chave PIX.')
@@ -142,20 +120,23 @@ def ticket_novo_view(request, demanda_id):
         if not aceito_termos:
             errors.append('Você precisa aceitar os termos de consentimento para continuar.')
         
-        # Validar arquivo apenas se for enviar agora
-        if pode_enviar_agora and not arquivo_prova:
+        # Tipo (pelos bytes iniciais) e tamanho já validados no upload handler
+        erro_arquivo = erro_da_prova(request)
+        if erro_arquivo:
+            errors.append(erro_arquivo)
+        elif pode_enviar_agora and not arquivo_prova:
             errors.append('Por favor, envie o arquivo da prova.')
         
-        # Validar tipo de arquivo
-        if arquivo_prova:
-            allowed_types = ['application/pdf', 'image/jpeg', 'image/jpg', 'image/png']
-            if arquivo_prova.content_type not in allowed_types:
-                errors.append('Tipo de arquivo inválido. Envie PDF, JPG ou PNG.')
-            
-            # Validar tamanho (10MB)
-            if arquivo_prova.size > 10 * 1024 * 1024:
-                errors.append('Arquivo muito grande. Tamanho máximo: 10MB.')
+        # Código reservado antes de promover o arquivo ou gravar o ticket: com o
+        # limite do dia atingido nada é criado e o formulário volta com o erro
+        if not errors:
+            try:
+                codigo_ticket = gerar_codigo_ticket()
+            except SequenciaEsgotada as e:
+                logger.error(f"Envio recusado para demanda {demanda.id}: {e}")
+                errors.append('O limite de envios de hoje foi atingido. Por favor, tente novamente amanhã.')
         
+        # Arquivo não promovido (erro ou entrada na fila) é descartado por receber_prova
         if errors:
             return render(request, 'public/ticket_form.html', {
                 'demanda': demanda,
@@ -169,13 +150,18 @@ def ticket_novo_view(request, demanda_id):
             # 1ª pessoa: Envia prova diretamente e vai para análise
             ticket = Ticket.objects.create(
                 demanda=demanda,
+                codigo_ticket=codigo_ticket,
                 cliente_nome=cliente_nome,
                 cliente_email=cliente_email,
                 cliente_whatsapp=cliente_whatsapp,
                 cliente_pix=cliente_pix,
-                arquivo_prova=arquivo_prova,
+                arquivo_prova=arquivo_prova.promover(),
+                arquivo_sha256=arquivo_prova.sha256,
+                arquivo_duplicado_de=original_da_prova(arquivo_prova.sha256),
                 status='em_analise'  # Já vai direto para análise
             )
+            # Marca reenvio de foto recomprimida/recortada de outra prova
+            registrar_semelhanca(ticket)
             
             # Atualizar demanda para em_analise
             demanda.status = 'em_analise'
@@ -185,18 +171,21 @@ def ticket_novo_view(request, demanda_id):
             enviar_mensagem_whatsapp(cliente_whatsapp, ticket)
         else:
             # Demais pessoas: Entram na fila de espera
-            ticket = Ticket.objects.create(
-                demanda=demanda,
-                cliente_nome=cliente_nome,
-                cliente_email=cliente_email,
-                cliente_whatsapp=cliente_whatsapp,
-                cliente_pix=cliente_pix,
-                status='na_fila'  # Entra na fila
-            )
+            # O email de entrada na fila é gravado na mesma transação do ticket
+            with transaction.atomic():
+                ticket = Ticket.objects.create(
+                    demanda=demanda,
+                    codigo_ticket=codigo_ticket,
+                    cliente_nome=cliente_nome,
+                    cliente_email=cliente_email,
+                    cliente_whatsapp=cliente_whatsapp,
+                    cliente_pix=cliente_pix,
+                    status='na_fila'  # Entra na fila
+                )
+                enviar_email_fila(ticket)
             
-            # Enviar notificações de entrada na fila
+            # Gerar link de WhatsApp de entrada na fila
             try:
-                enviar_email_fila(ticket)
                 whatsapp_link = gerar_link_whatsapp_fila(ticket)
                 logger.info(f"Cliente entrou na fila - Ticket: {ticket.codigo_ticket}, WhatsApp: {whatsapp_link}")
             except Exception as e:
@@ -218,27 +207,26 @@ def ticket_success_view(request, ticket_id):
     View de sucesso após enviar prova.
     Mostra a posição do ticket na fila.
     """
-    ticket = get_object_or_404(Ticket, id=ticket_id)
+    ticket = get_object_or_404(Ticket.objects.select_related('demanda'), id=ticket_id)
+    demanda = ticket.demanda
     
-    # Calcular posição na fila (incluindo todos os status ativos)
-    posicao_fila = Ticket.objects.filter(
-        demanda=ticket.demanda,
-        status__in=['na_fila', 'notificado', 'aguardando', 'em_analise'],
-        criado_em__lt=ticket.criado_em
-    ).count() + 1
+    # Posição na fila (sequência do ticket menos a cabeça da fila da demanda)
+    posicao_fila = ticket.posicao_fila or 1
     
-    total_fila = Ticket.objects.filter(
-        demanda=ticket.demanda,
-        status__in=['na_fila', 'notificado', 'aguardando', 'em_analise']
-    ).count()
+    total_fila = demanda.total_na_fila
     
-    return render(request, 'public/ticket_success.html', {
+    # A página é reconsultada enquanto o participante espera: sem mudança no
+    # ticket, na demanda ou na fila, responde 304 sem renderizar o template.
+    # Sem Last-Modified: a fila anda sem alterar atualizado_em.
+    etag = gerar_etag(ticket.pk, ticket.atualizado_em, demanda.atualizado_em, posicao_fila, total_fila)
+    return responder_condicional(request, etag, None, lambda: render(request, 'public/ticket_success.html', {
         'ticket': ticket,
         'posicao_fila': posicao_fila,
         'total_fila': total_fila
-    })
+    }))
 
 
+@receber_prova
 def ticket_upload_view(request, ticket_id):
     """
     View para upload de prova quando o participante é notificado.
@@ -275,18 +263,12 @@ def ticket_upload_view(request, ticket_id):
         
         errors = []
         
-        # Validar arquivo
-        if not arquivo_prova:
+        # Tipo (pelos bytes iniciais) e tamanho já validados no upload handler
+        erro_arquivo = erro_da_prova(request)
+        if erro_arquivo:
+            errors.append(erro_arquivo)
+        elif not arquivo_prova:
             errors.append('Por favor, envie o arquivo da prova.')
-        else:
-            # Validar tipo
-            allowed_types = ['application/pdf', 'image/jpeg', 'image/jpg', 'image/png']
-            if arquivo_prova.content_type not in allowed_types:
-                errors.append('Tipo de arquivo inválido. Envie PDF, JPG ou PNG.')
-            
-            # Validar tamanho (10MB)
-            if arquivo_prova.size > 10 * 1024 * 1024:
-                errors.append('Arquivo muito grande. Tamanho máximo: 10MB.')
         
         if errors:
             return render(request, 'public/ticket_upload.html', {
@@ -295,9 +277,12 @@ def ticket_upload_view(request, ticket_id):
             })
         
         # Atualizar ticket
-        ticket.arquivo_prova = arquivo_prova
+        ticket.arquivo_prova = arquivo_prova.promover()
+        ticket.arquivo_sha256 = arquivo_prova.sha256
+        ticket.arquivo_duplicado_de = original_da_prova(arquivo_prova.sha256, exceto=ticket.pk)
         ticket.status = 'em_analise'
         ticket.save()
+        registrar_semelhanca(ticket)
         
         # Atualizar demanda
         ticket.demanda.status = 'em_analise'
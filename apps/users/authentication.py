@@ -1,8 +1,114 @@
+"""
+Autenticação JWT da API.
+
+O usuário resolvido a partir do token fica em cache no processo por
+JWT_USER_CACHE_SECONDS, evitando a consulta ao banco a cada requisição.
+Cada usuário tem uma versão de token (AdminUser.versao_token), publicada no
+cache compartilhado sempre que o usuário é salvo (ver signals.py): se a
+versão publicada diverge da versão em cache local, o usuário é relido do
+banco; se diverge da versão gravada no token, o token foi revogado.
+
+O login emite um access token curto (JWT_ACCESS_TOKEN_MINUTES) e um refresh
+token longo (JWT_REFRESH_TOKEN_DAYS). A renovação (/api/auth/refresh) valida
+a assinatura do refresh token e consulta sua linha em RefreshToken pelo jti,
+sem recalcular o hash da senha; o token usado é revogado e outro da mesma
+família é emitido (rotação).
+"""
+import copy
 import jwt
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import authentication, exceptions
-from .models import AdminUser
+from .models import AdminUser, RefreshToken
+
+# Versão publicada para usuários excluídos (nunca coincide com a de um token)
+VERSAO_REMOVIDO = -1
+
+# user_id -> (AdminUser, expira_em em time.monotonic())
+_usuarios = {}
+_lock = threading.Lock()
+
+
+def _chave_versao(user_id):
+    return f'jwt:versao:{user_id}'
+
+
+def publicar_versao_token(user_id, versao):
+    """
+    Grava a versão do token do usuário no cache compartilhado e descarta o
+    usuário do cache deste processo.
+    """
+    cache.set(_chave_versao(user_id), versao, None)
+    with _lock:
+        _usuarios.pop(user_id, None)
+
+
+def obter_usuario(user_id):
+    """
+    Retorna o usuário do token, do cache do processo quando ainda válido.
+    
+    Raises:
+        AdminUser.DoesNotExist: usuário não existe mais
+    """
+    versao = cache.get(_chave_versao(user_id))
+    entrada = _usuarios.get(user_id)
+    
+    if entrada:
+        user, expira_em = entrada
+        if expira_em > time.monotonic() and versao in (None, user.versao_token):
+            # Cópia para que alterações feitas durante um request não vazem para outros
+            return copy.copy(user)
+    
+    user = AdminUser.objects.get(id=user_id)
+    if versao is None:
+        cache.add(_chave_versao(user_id), user.versao_token, None)
+    
+    with _lock:
+        _usuarios[user_id] = (user, time.monotonic() + settings.JWT_USER_CACHE_SECONDS)
+    return copy.copy(user)
+
+
+def _decodificar(token, tipo):
+    """
+    Valida a assinatura e a validade do token e confere o tipo (access/refresh).
+    Tokens emitidos antes dos refresh tokens não têm 'tipo' e valem como access.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.JWT_SECRET_KEY,
+            algorithms=['HS256']
+        )
+    except jwt.ExpiredSignatureError:
+        raise exceptions.AuthenticationFailed('Token expirado')
+    except jwt.InvalidTokenError:
+        raise exceptions.AuthenticationFailed('Token inválido')
+    
+    if payload.get('tipo', 'access') != tipo:
+        raise exceptions.AuthenticationFailed('Token inválido')
+    return payload
+
+
+def _usuario_do_token(payload):
+    try:
+        user = obter_usuario(payload['user_id'])
+    except AdminUser.DoesNotExist:
+        raise exceptions.AuthenticationFailed('Usuário não encontrado')
+    
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('Usuário inativo')
+    
+    # Senha trocada ou usuário desativado depois da emissão do token
+    if payload.get('ver', 0) != user.versao_token:
+        raise exceptions.AuthenticationFailed('Token revogado')
+    
+    return user
 
 
 class JWTAuthentication(authentication.BaseAuthentication):
@@ -17,32 +123,19 @@ class JWTAuthentication(authentication.BaseAuthentication):
         if not auth_header or not auth_header.startswith('Bearer '):
             return None
         
-        try:
-            token = auth_header.split(' ')[1]
-            payload = jwt.decode(
-                token, 
-                settings.JWT_SECRET_KEY, 
-                algorithms=['HS256']
-            )
-        except jwt.ExpiredSignatureError:
-            raise exceptions.AuthenticationFailed('Token expirado')
-        except jwt.InvalidTokenError:
-            raise exceptions.AuthenticationFailed('Token inválido')
-        
-        try:
-            user = AdminUser.objects.get(id=payload['user_id'])
-        except AdminUser.DoesNotExist:
-            raise exceptions.AuthenticationFailed('Usuário não encontrado')
-        
-        if not user.is_active:
-            raise exceptions.AuthenticationFailed('Usuário inativo')
+        token = auth_header.split(' ')[1]
+        user = _usuario_do_token(_decodificar(token, 'access'))
         
         return (user, token)
+    
+    def authenticate_header(self, request):
+        # Faz o DRF responder 401 (e não 403) para token ausente ou inválido
+        return 'Bearer'
 
 
 def generate_jwt_token(user):
     """
-    Gera um token JWT para o usuário.
+    Gera um access token JWT (curta duração) para o usuário.
     
     Args:
         user: Instância do modelo AdminUser
@@ -50,11 +143,13 @@ def generate_jwt_token(user):
     Returns:
         str: Token JWT codificado
     """
-    expiration = datetime.utcnow() + timedelta(hours=settings.JWT_EXPIRATION_HOURS)
+    expiration = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_MINUTES)
     
     payload = {
         'user_id': user.id,
         'username': user.username,
+        'tipo': 'access',
+        'ver': user.versao_token,
         'exp': expiration,
         'iat': datetime.utcnow()
     }
@@ -66,3 +161,98 @@ def generate_jwt_token(user):
     )
     
     return token
+
+
+def generate_refresh_token(user, familia=None):
+    """
+    Emite um refresh token e registra seu jti em RefreshToken.
+    
+    Args:
+        user: Instância do modelo AdminUser
+        familia: família do token renovado (None inicia uma nova, no login)
+    
+    Returns:
+        str: Refresh token JWT codificado
+    """
+    jti = uuid.uuid4().hex
+    expiracao = timezone.now() + timedelta(days=settings.JWT_REFRESH_TOKEN_DAYS)
+    
+    RefreshToken.objects.create(
+        user=user,
+        jti=jti,
+        familia=familia or jti,
+        expira_em=expiracao,
+    )
+    
+    payload = {
+        'user_id': user.id,
+        'tipo': 'refresh',
+        'jti': jti,
+        'ver': user.versao_token,
+        'exp': expiracao,
+        'iat': datetime.utcnow()
+    }
+    
+    return jwt.encode(
+        payload,
+        settings.JWT_SECRET_KEY,
+        algorithm='HS256'
+    )
+
+
+def renovar_tokens(refresh_token):
+    """
+    Troca um refresh token válido por um novo par (access, refresh).
+    
+    O refresh token usado é revogado. Se ele já tinha sido revogado (token
+    reutilizado, possivelmente vazado), toda a família é revogada.
+    
+    Returns:
+        tuple: (user, access_token, refresh_token)
+    
+    Raises:
+        AuthenticationFailed: token inválido, expirado ou revogado
+    """
+    payload = _decodificar(refresh_token, 'refresh')
+    user = _usuario_do_token(payload)
+    agora = timezone.now()
+    
+    with transaction.atomic():
+        registro = RefreshToken.objects.select_for_update().filter(jti=payload.get('jti'), user=user).first()
+        if registro is None:
+            raise exceptions.AuthenticationFailed('Token inválido')
+        
+        reutilizado = registro.revogado_em is not None
+        if not reutilizado:
+            registro.revogado_em = agora
+            registro.save(update_fields=['revogado_em'])
+            novo_refresh = generate_refresh_token(user, familia=registro.familia)
+    
+    if reutilizado:
+        RefreshToken.objects.filter(familia=registro.familia, revogado_em__isnull=True).update(revogado_em=agora)
+        raise exceptions.AuthenticationFailed('Token revogado')
+    
+    return user, generate_jwt_token(user), novo_refresh
+
+
+def revogar_refresh_token(refresh_token):
+    """
+    Revoga a família do refresh token (logout). Tokens inválidos são ignorados.
+    
+    Returns:
+        int: número de refresh tokens revogados
+    """
+    try:
+        payload = jwt.decode(
+            refresh_token,
+            settings.JWT_SECRET_KEY,
+            algorithms=['HS256'],
+            options={'verify_exp': False}
+        )
+    except jwt.InvalidTokenError:
+        return 0
+    
+    familia = RefreshToken.objects.filter(jti=payload.get('jti')).values_list('familia', flat=True).first()
+    if familia is None:
+        return 0
+    return RefreshToken.objects.filter(familia=familia, revogado_em__isnull=True).update(revogado_em=timezone.now())
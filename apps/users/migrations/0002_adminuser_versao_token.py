@@ -0,0 +1,18 @@
+# Generated manually for the JWT user cache
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminuser',
+            name='versao_token',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão do Token'),
+        ),
+    ]
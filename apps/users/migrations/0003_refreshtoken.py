@@ -0,0 +1,33 @@
+# Generated manually for API refresh tokens
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_adminuser_versao_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=32, unique=True, verbose_name='Identificador')),
+                ('familia', models.CharField(db_index=True, max_length=32, verbose_name='Família')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('expira_em', models.DateTimeField(verbose_name='Expira em')),
+                ('revogado_em', models.DateTimeField(blank=True, null=True, verbose_name='Revogado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refresh_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Refresh Token',
+                'verbose_name_plural': 'Refresh Tokens',
+                'db_table': 'admin_refresh_tokens',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
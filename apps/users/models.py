@@ -8,6 +8,10 @@ class AdminUser(AbstractUser):
     Estende o AbstractUser do Django para aproveitar toda funcionalidade de autenticação.
     """
     
+    # Incrementada ao trocar a senha ou desativar o usuário: tokens JWT
+    # emitidos com a versão anterior deixam de valer (ver authentication.py)
+    versao_token = models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão do Token')
+    
     class Meta:
         db_table = 'admin_users'
         verbose_name = 'Usuário Administrador'
@@ -16,3 +20,58 @@ class AdminUser(AbstractUser):
     
     def __str__(self):
         return self.username
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._is_active_salvo = instance.__dict__.get('is_active')
+        return instance
+    
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self._senha_alterada = True
+    
+    def save(self, *args, **kwargs):
+        """
+        Revoga os tokens emitidos (incrementa versao_token) quando a senha muda
+        ou o usuário é ativado/desativado.
+        """
+        desativacao = getattr(self, '_is_active_salvo', self.is_active) != self.is_active
+        if self.pk and (getattr(self, '_senha_alterada', False) or desativacao):
+            self.versao_token += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'versao_token'}
+        
+        super().save(*args, **kwargs)
+        self._senha_alterada = False
+        self._is_active_salvo = self.is_active
+
+
+class RefreshToken(models.Model):
+    """
+    Refresh token emitido no login (ver authentication.py).
+    Cada renovação revoga o token usado e emite outro da mesma família;
+    reutilizar um token já trocado revoga a família inteira.
+    """
+    
+    user = models.ForeignKey(
+        AdminUser,
+        on_delete=models.CASCADE,
+        related_name='refresh_tokens',
+        verbose_name='Usuário'
+    )
+    jti = models.CharField(max_length=32, unique=True, verbose_name='Identificador')
+    familia = models.CharField(max_length=32, db_index=True, verbose_name='Família')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    expira_em = models.DateTimeField(verbose_name='Expira em')
+    revogado_em = models.DateTimeField(null=True, blank=True, verbose_name='Revogado em')
+    
+    class Meta:
+        db_table = 'admin_refresh_tokens'
+        verbose_name = 'Refresh Token'
+        verbose_name_plural = 'Refresh Tokens'
+        ordering = ['-criado_em']
+    
+    def __str__(self):
+        return f"{self.user} - {self.jti}"
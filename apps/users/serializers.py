@@ -20,3 +20,10 @@ class LoginSerializer(serializers.Serializer):
     """
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
+
+
+class RefreshSerializer(serializers.Serializer):
+    """
+    Serializer para renovação e revogação de tokens.
+    """
+    refresh = serializers.CharField(required=True, write_only=True)
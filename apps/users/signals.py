@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import publicar_versao_token, VERSAO_REMOVIDO
+from .models import AdminUser
+
+
+@receiver(post_save, sender=AdminUser)
+def atualizar_versao_token(sender, instance, **kwargs):
+    """Propaga a versão do token para o cache de usuários de todos os processos."""
+    publicar_versao_token(instance.pk, instance.versao_token)
+
+
+@receiver(post_delete, sender=AdminUser)
+def revogar_usuario_removido(sender, instance, **kwargs):
+    """Usuário excluído: nenhuma versão de token volta a ser aceita."""
+    publicar_versao_token(instance.pk, VERSAO_REMOVIDO)
@@ -1,3 +1,106 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework import exceptions
+from rest_framework.test import APIClient
+from apps.users import authentication
+from apps.users.authentication import JWTAuthentication, generate_jwt_token
+from apps.users.models import AdminUser, RefreshToken
 
-# Create your tests here.
+
+class JWTAuthenticationCacheTests(TestCase):
+    """
+    Testes do cache de usuários da autenticação JWT.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        authentication._usuarios.clear()
+        self.user = AdminUser.objects.create_user('admin', 'admin@exemplo.com', 'senha-antiga')
+        self.token = generate_jwt_token(self.user)
+    
+    def _autenticar(self, token):
+        request = RequestFactory().get('/api/demandas/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return JWTAuthentication().authenticate(request)
+    
+    def test_usuario_em_cache_dispensa_consulta(self):
+        self._autenticar(self.token)
+        with self.assertNumQueries(0):
+            user, _ = self._autenticar(self.token)
+        self.assertEqual(user.pk, self.user.pk)
+    
+    def test_troca_de_senha_revoga_token(self):
+        self._autenticar(self.token)
+        
+        self.user.set_password('senha-nova')
+        self.user.save()
+        
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Token revogado'):
+            self._autenticar(self.token)
+        user, _ = self._autenticar(generate_jwt_token(self.user))
+        self.assertEqual(user.versao_token, 1)
+    
+    def test_desativacao_invalida_cache(self):
+        self._autenticar(self.token)
+        
+        user = AdminUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'Usuário inativo'):
+            self._autenticar(self.token)
+    
+    def test_outras_alteracoes_mantem_token(self):
+        self.user.first_name = 'Maria'
+        self.user.save()
+        user, _ = self._autenticar(self.token)
+        self.assertEqual(user.first_name, 'Maria')
+
+
+class RefreshTokenTests(TestCase):
+    """
+    Testes da renovação e revogação de tokens da API.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        authentication._usuarios.clear()
+        self.user = AdminUser.objects.create_user('admin', 'admin@exemplo.com', 'senha')
+        self.client = APIClient()
+        response = self.client.post('/api/auth/login', {'username': 'admin', 'password': 'senha'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.refresh = response.data['refresh']
+    
+    def _renovar(self, refresh):
+        return self.client.post('/api/auth/refresh', {'refresh': refresh}, format='json')
+    
+    def test_renovacao_rotaciona_refresh_token(self):
+        response = self._renovar(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['token']}")
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+        
+        # O refresh token usado não vale mais
+        self.client.credentials()
+        self.assertEqual(self._renovar(self.refresh).status_code, 401)
+    
+    def test_reuso_revoga_a_familia(self):
+        novo = self._renovar(self.refresh).data['refresh']
+        self._renovar(self.refresh)
+        
+        self.assertEqual(self._renovar(novo).status_code, 401)
+        self.assertFalse(RefreshToken.objects.filter(revogado_em__isnull=True).exists())
+    
+    def test_access_token_nao_renova(self):
+        token = generate_jwt_token(self.user)
+        self.assertEqual(self._renovar(token).status_code, 401)
+    
+    def test_logout_revoga(self):
+        response = self.client.post('/api/auth/logout', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self._renovar(self.refresh).status_code, 401)
+    
+    def test_troca_de_senha_invalida_refresh(self):
+        self.user.set_password('outra')
+        self.user.save()
+        self.assertEqual(self._renovar(self.refresh).status_code, 401)
@@ -4,8 +4,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from .models import AdminUser
-from .serializers import AdminUserSerializer, LoginSerializer
-from .authentication import generate_jwt_token
+from .serializers import AdminUserSerializer, LoginSerializer, RefreshSerializer
+from .authentication import generate_jwt_token, generate_refresh_token, renovar_tokens, revogar_refresh_token
 
 
 @api_view(['POST'])
@@ -38,13 +38,53 @@ def login_view(request):
         )
     
     token = generate_jwt_token(user)
+    refresh = generate_refresh_token(user)
     
     return Response({
         'token': token,
+        'refresh': refresh,
         'user': AdminUserSerializer(user).data
     })
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_view(request):
+    """
+    Troca o refresh token por um novo access token e um novo refresh token.
+    O refresh token enviado deixa de valer (rotação).
+    
+    POST /api/auth/refresh
+    Body: {"refresh": "..."}
+    """
+    serializer = RefreshSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    user, token, refresh = renovar_tokens(serializer.validated_data['refresh'])
+    
+    return Response({
+        'token': token,
+        'refresh': refresh,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def logout_view(request):
+    """
+    Revoga o refresh token (e os renovados a partir dele) no servidor.
+    
+    POST /api/auth/logout
+    Body: {"refresh": "..."}
+    """
+    serializer = RefreshSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    revogar_refresh_token(serializer.validated_data['refresh'])
+    
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class AdminUserViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para listar usuários administradores.
@@ -0,0 +1,133 @@
+"""
+Estatísticas do dashboard do admin (CustomAdminSite.index).
+
+Os totais por status vêm de uma única consulta com agregação condicional
+sobre Ticket.STATUS_CHOICES. O resultado fica em cache como um retrato
+(snapshot) com validade curta; quando vence, só o processo que obtém a trava
+recalcula, e os demais continuam servindo o retrato anterior até a troca.
+
+A trava é de melhor esforço: ela usa cache.add, que só é atômico entre
+processos em backends como Memcached e Redis (CACHE_BACKEND). No
+FileBasedCache (o padrão) o add confere e grava o arquivo em passos
+separados, então dois processos podem, raramente, recalcular ao mesmo tempo.
+O custo é só uma agregação a mais; o retrato gravado por último vale para todos.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Window
+from django.utils import timezone
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'dashboard:snapshot'
+TRAVA_KEY = 'dashboard:trava'
+
+# Classes do badge e da barra do gráfico para cada status de ticket
+CORES_STATUS = {
+    'na_fila': ('primary', 'blue'),
+    'notificado': ('primary', 'blue'),
+    'aguardando': ('info', 'cyan'),
+    'em_analise': ('warning', 'yellow'),
+    'aprovado': ('success', 'green'),
+    'pago': ('success', 'green'),
+    'recusado': ('danger', 'red'),
+    'expirado': ('danger', 'red'),
+}
+
+
+def calcular_estatisticas():
+    """
+    Calcula as estatísticas do dashboard direto no banco.
+    
+    Returns:
+        dict: contexto do template admin/index.html
+    """
+    from apps.tickets.models import Ticket
+    from apps.concursos.models import Demanda
+    from apps.users.models import AdminUser
+    
+    hoje = timezone.localdate()
+    
+    # Todos os totais de tickets em uma consulta
+    totais = Ticket.objects.aggregate(
+        total=Count('id'),
+        hoje=Count('id', filter=Q(criado_em__date=hoje)),
+        **{
+            status: Count('id', filter=Q(status=status))
+            for status, _ in Ticket.STATUS_CHOICES
+        }
+    )
+    total_tickets = totais['total']
+    
+    distribuicao_status = []
+    for status, rotulo in Ticket.STATUS_CHOICES:
+        badge, barra = CORES_STATUS.get(status, ('primary', 'blue'))
+        distribuicao_status.append({
+            'status': status,
+            'rotulo': rotulo,
+            'total': totais[status],
+            'percentual': round(totais[status] / total_tickets * 100, 1) if total_tickets else 0,
+            'badge': badge,
+            'barra': barra,
+        })
+    
+    # Concursos em destaque pelos contadores desnormalizados da demanda, sem
+    # join com tickets (total_pendentes já está contido em total_na_fila). O
+    # total de concursos abertos vem na mesma consulta, como janela sobre
+    # todas as demandas; sem demandas, não há abertos.
+    top_demandas = list(Demanda.objects.annotate(
+        total_tickets=F('total_na_fila') + F('total_aprovadas'),
+        concursos_abertos=Window(Count('id', filter=Q(status='aberto'))),
+    ).order_by('-total_tickets', '-criado_em')[:5])
+    
+    return {
+        'total_tickets': total_tickets,
+        'tickets_hoje': totais['hoje'],
+        'tickets_aguardando': totais['aguardando'] + totais['em_analise'],
+        'distribuicao_status': distribuicao_status,
+        'concursos_abertos': top_demandas[0].concursos_abertos if top_demandas else 0,
+        'usuarios_ativos': AdminUser.objects.filter(is_active=True).count(),
+        'ultimos_tickets': list(Ticket.objects.select_related('demanda').order_by('-criado_em')[:5]),
+        'top_demandas': top_demandas,
+        'atualizado_em': timezone.now(),
+    }
+
+
+def obter_estatisticas(espera=2.0):
+    """
+    Retorna as estatísticas do dashboard a partir do retrato em cache.
+    
+    Com o retrato vencido, apenas quem obtém a trava (de melhor esforço, ver
+    acima) recalcula; os demais recebem o retrato anterior. Sem retrato algum
+    (cache vazio), aguarda até `espera` segundos pelo cálculo em andamento
+    antes de calcular por conta própria.
+    """
+    validade = settings.DASHBOARD_CACHE_TIMEOUT
+    snapshot = cache.get(SNAPSHOT_KEY)
+    agora = time.time()
+    
+    if snapshot and snapshot['expira_em'] > agora:
+        return snapshot['dados']
+    
+    if not cache.add(TRAVA_KEY, 1, timeout=30):
+        # Outro processo está recalculando
+        if snapshot:
+            return snapshot['dados']
+        limite = agora + espera
+        while time.time() < limite:
+            time.sleep(0.05)
+            snapshot = cache.get(SNAPSHOT_KEY)
+            if snapshot:
+                return snapshot['dados']
+        return calcular_estatisticas()
+    
+    try:
+        dados = calcular_estatisticas()
+        # O retrato vencido continua disponível por mais tempo para servir
+        # os demais processos enquanto um deles recalcula
+        cache.set(SNAPSHOT_KEY, {'dados': dados, 'expira_em': time.time() + validade}, validade * 10)
+        return dados
+    finally:
+        cache.delete(TRAVA_KEY)
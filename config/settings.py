@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 from decouple import config
+import sys
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -145,6 +146,33 @@ STATICFILES_DIRS = []
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Arquivo da prova: tamanho máximo aceito pelo upload handler (apps/tickets/uploads.py)
+PROVA_TAMANHO_MAXIMO_MB = config('PROVA_TAMANHO_MAXIMO_MB', default=10, cast=int)
+# Provas quase idênticas: distância de Hamming máxima entre dHashes (de 64 bits)
+PROVA_SEMELHANCA_DISTANCIA = config('PROVA_SEMELHANCA_DISTANCIA', default=8, cast=int)
+
+# Cache
+# Compartilhado entre os workers do gunicorn (a home pública fica em cache)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+    }
+}
+
+# Os testes limpam o cache (cache.clear()): usam um em memória, nunca o do servidor
+if sys.argv[1:2] == ['test']:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Tempo (segundos) que a página pública de concursos fica em cache
+HOME_CACHE_TIMEOUT = config('HOME_CACHE_TIMEOUT', default=300, cast=int)
+
+# Concursos por página na home (as demais são carregadas sob demanda)
+HOME_PAGE_SIZE = config('HOME_PAGE_SIZE', default=20, cast=int)
+
+# Validade (segundos) do retrato de estatísticas do dashboard do admin
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -181,7 +209,15 @@ CORS_ALLOW_CREDENTIALS = True
 
 # JWT Settings
 JWT_SECRET_KEY = config('JWT_SECRET_KEY', default=SECRET_KEY)
-JWT_EXPIRATION_HOURS = config('JWT_EXPIRATION_HOURS', default=8, cast=int)
+# Access token curto; renovado em /api/auth/refresh com o refresh token
+JWT_ACCESS_TOKEN_MINUTES = config('JWT_ACCESS_TOKEN_MINUTES', default=15, cast=int)
+JWT_REFRESH_TOKEN_DAYS = config('JWT_REFRESH_TOKEN_DAYS', default=14, cast=int)
+# Segundos que o usuário autenticado fica em cache no processo
+JWT_USER_CACHE_SECONDS = config('JWT_USER_CACHE_SECONDS', default=60, cast=int)
+
+# Tickets
+# Sequenciais de código reservados por processo a cada ida ao banco (1 = sem lacunas)
+TICKET_CODIGO_BLOCO = config('TICKET_CODIGO_BLOCO', default=1, cast=int)
 
 # Jazzmin Settings (Admin Theme)
 JAZZMIN_SETTINGS = {
@@ -241,7 +277,7 @@ JAZZMIN_SETTINGS = {
     "custom_links": {
         "tickets": [{
             "name": "Relatórios",
-            "url": "admin:tickets_ticket_changelist",
+            "url": "admin:tickets_relatorios",
             "icon": "fas fa-chart-bar",
             "permissions": ["tickets.view_ticket"]
         }]
@@ -255,6 +291,7 @@ JAZZMIN_SETTINGS = {
         "users.AdminUser": "fas fa-user-shield",
         "concursos.Demanda": "fas fa-graduation-cap",
         "tickets.Ticket": "fas fa-ticket-alt",
+        "tickets.Notificacao": "fas fa-envelope",
     },
     
     # Ícones padrão
@@ -363,6 +400,10 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='COMCURSANDO <noreply@comcursando.com.br>')
 
+# Caixa de saída de notificações (python manage.py dispatch_notifications)
+NOTIFICACAO_MAX_TENTATIVAS = config('NOTIFICACAO_MAX_TENTATIVAS', default=5, cast=int)
+NOTIFICACAO_BACKOFF_SEGUNDOS = config('NOTIFICACAO_BACKOFF_SEGUNDOS', default=60, cast=int)
+
 # Projeto: contato padrão do WhatsApp
 # Formato: +5511940780218 (código do país + DDD + número, sem espaços)
 WHATSAPP_CONTACT = config('WHATSAPP_CONTACT', default='+5511940780218')
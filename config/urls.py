@@ -19,9 +19,9 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
-from apps.users.views import login_view, AdminUserViewSet
+from apps.users.views import login_view, refresh_view, logout_view, AdminUserViewSet
 from apps.concursos.views import DemandaViewSet
-from apps.concursos.views_public import home_view
+from apps.concursos.views_public import home_view, home_mais_view
 from apps.tickets.views import TicketViewSet
 from apps.tickets.views_public import ticket_novo_view, ticket_success_view, ticket_upload_view, termos_view
 from config.admin import admin_site
@@ -29,14 +29,15 @@ from config.admin import admin_site
 # Registrar modelos no admin customizado
 from apps.users.admin import AdminUserAdmin
 from apps.concursos.admin import DemandaAdmin
-from apps.tickets.admin import TicketAdmin
+from apps.tickets.admin import TicketAdmin, NotificacaoAdmin
 from apps.users.models import AdminUser
 from apps.concursos.models import Demanda
-from apps.tickets.models import Ticket
+from apps.tickets.models import Ticket, Notificacao
 
 admin_site.register(AdminUser, AdminUserAdmin)
 admin_site.register(Demanda, DemandaAdmin)
 admin_site.register(Ticket, TicketAdmin)
+admin_site.register(Notificacao, NotificacaoAdmin)
 
 # Router do Django REST Framework
 router = DefaultRouter()
@@ -46,12 +47,15 @@ router.register(r'tickets', TicketViewSet, basename='ticket')
 
 urlpatterns = [
     path('', home_view, name='home'),  # Página pública
+    path('concursos/mais/', home_mais_view, name='home_mais'),  # Próxima página da home (fragmento)
     path('termos/', termos_view, name='termos'),  # Termos de consentimento
     path('ticket/novo/<int:demanda_id>/', ticket_novo_view, name='ticket_novo'),
     path('ticket/sucesso/<int:ticket_id>/', ticket_success_view, name='ticket_success'),
     path('ticket/upload/<int:ticket_id>/', ticket_upload_view, name='ticket_upload'),
     path('admin/', admin_site.urls),  # Usando admin customizado
     path('api/auth/login', login_view, name='login'),
+    path('api/auth/refresh', refresh_view, name='refresh'),
+    path('api/auth/logout', logout_view, name='logout'),
     path('api/', include(router.urls)),
 ]
 